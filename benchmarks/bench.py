@@ -0,0 +1,250 @@
+"""Time the stages of phmutest on a synthetic Markdown corpus.
+
+Each stage is timed on its own with its inputs prepared ahead of time.
+The end to end time is for phmutest.main.command() with output suppressed.
+
+Save a baseline then compare a later run against it:
+
+    python -m benchmarks.bench --json baseline.json
+    python -m benchmarks.bench --baseline baseline.json --tolerance 0.25
+
+The exit status is 1 when a stage is slower than the baseline by more than
+the tolerance.
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import phmutest
+import phmutest.cases
+import phmutest.config
+import phmutest.fcb
+import phmutest.main
+import phmutest.reader
+import phmutest.select
+from benchmarks.corpus import CorpusShape, write_corpus
+
+
+@dataclass
+class Pipeline:
+    """Inputs for each stage. Built once before timing starts."""
+
+    paths: List[Path]
+    args: argparse.Namespace
+    block_store: phmutest.select.BlockStore
+    testfile_lines: List[str]
+    block_methods_text: str
+    """Generated testfile with a test method for each block."""
+
+
+@dataclass
+class StageTiming:
+    """Seconds to run a stage once, for each repetition."""
+
+    name: str
+    seconds: List[float] = field(default_factory=list)
+
+    @property
+    def best(self) -> float:
+        return min(self.seconds)
+
+    @property
+    def mean(self) -> float:
+        return sum(self.seconds) / len(self.seconds)
+
+
+def make_pipeline(paths: List[Path]) -> Pipeline:
+    """Run the pipeline once to create the inputs for each stage."""
+    parser = phmutest.main.main_argparser()
+    known_args = parser.parse_known_args([str(p) for p in paths])
+    settings = phmutest.config.get_settings(known_args)
+    block_store = phmutest.select.BlockStore(settings.args)
+    text, _ = phmutest.cases.testfile(settings.args, block_store)
+    block_methods_args = copy.copy(settings.args)
+    block_methods_args.block_methods = True
+    block_methods_text, _ = phmutest.cases.testfile(block_methods_args, block_store)
+    return Pipeline(
+        paths, settings.args, block_store, text.splitlines(), block_methods_text
+    )
+
+
+def read_markdown(pipeline: Pipeline) -> None:
+    for path in pipeline.paths:
+        phmutest.reader.read_markdown(path)
+
+
+def block_store(pipeline: Pipeline) -> None:
+    phmutest.select.BlockStore(pipeline.args)
+
+
+def testfile(pipeline: Pipeline) -> None:
+    phmutest.cases.testfile(pipeline.args, pipeline.block_store)
+
+
+def make_markdown_map(pipeline: Pipeline) -> None:
+    phmutest.fcb.make_markdown_map(pipeline.testfile_lines, pipeline.block_store)
+
+
+def compile_testfile(pipeline: Pipeline) -> None:
+    compile("\n".join(pipeline.testfile_lines), "<testfile>", "exec")
+
+
+def compile_block_methods(pipeline: Pipeline) -> None:
+    compile(pipeline.block_methods_text, "<testfile>", "exec")
+
+
+def end_to_end(pipeline: Pipeline) -> None:
+    line = " ".join(str(p) for p in pipeline.paths)
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            phmresult = phmutest.main.command(line)
+    assert phmresult is not None and phmresult.is_success, "corpus must pass"
+
+
+STAGES: Dict[str, Callable[[Pipeline], None]] = {
+    "phmutest.reader.read_markdown": read_markdown,
+    "phmutest.select.BlockStore": block_store,
+    "phmutest.cases.testfile": testfile,
+    "phmutest.fcb.make_markdown_map": make_markdown_map,
+    "compile testfile": compile_testfile,
+    "compile testfile --block-methods": compile_block_methods,
+    "phmutest.main.command": end_to_end,
+}
+"""Stage name and function that runs the stage once over the whole corpus."""
+
+
+def time_stages(pipeline: Pipeline, repeat: int) -> List[StageTiming]:
+    """Run each stage repeat times. Record the elapsed time of each run."""
+    timings = []
+    for name, function in STAGES.items():
+        timing = StageTiming(name)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function(pipeline)
+            timing.seconds.append(time.perf_counter() - start)
+        timings.append(timing)
+    return timings
+
+
+def run(shape: CorpusShape, repeat: int) -> Dict[str, Any]:
+    """Write the corpus to a temporary directory and time the stages."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = write_corpus(shape, Path(tmpdir))
+        pipeline = make_pipeline(paths)
+        timings = time_stages(pipeline, repeat)
+    return {
+        "phmutest": phmutest.__version__,
+        "python": platform.python_version(),
+        "corpus": asdict(shape),
+        "repeat": repeat,
+        "stages": {
+            t.name: {"best": t.best, "mean": t.mean, "seconds": t.seconds}
+            for t in timings
+        },
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Return descriptions of stages slower than baseline by more than tolerance.
+
+    The best times are compared. Stages missing from the baseline are ignored.
+    """
+    regressions = []
+    for name, stage in results["stages"].items():
+        if name not in baseline["stages"]:
+            continue
+        was = baseline["stages"][name]["best"]
+        now = stage["best"]
+        if now > was * (1.0 + tolerance):
+            regressions.append(f"{name} {was:.6f}s -> {now:.6f}s ({now / was:.2f}x)")
+    return regressions
+
+
+def show(results: Dict[str, Any]) -> None:
+    """Print a table of the best and mean times for each stage."""
+    print(f"corpus: {results['corpus']}")
+    width = max(len(name) for name in results["stages"])
+    print(f"{'stage':<{width}}  {'best':>10}  {'mean':>10}")
+    for name, stage in results["stages"].items():
+        print(f"{name:<{width}}  {stage['best']:10.6f}  {stage['mean']:10.6f}")
+
+
+def bench_argparser() -> argparse.ArgumentParser:
+    """Create argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench",
+        description="Time phmutest pipeline stages on a synthetic Markdown corpus.",
+    )
+    defaults = CorpusShape()
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--blocks", type=int, default=defaults.blocks)
+    parser.add_argument("--block-lines", type=int, default=defaults.block_lines)
+    parser.add_argument(
+        "--comment-density", type=float, default=defaults.comment_density
+    )
+    parser.add_argument(
+        "--directive-density", type=float, default=defaults.directive_density
+    )
+    parser.add_argument("--output-density", type=float, default=defaults.output_density)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--repeat", help="Times to run each stage.", type=int, default=5
+    )
+    parser.add_argument(
+        "--json", help="Write the results as JSON to OUTFILE.", metavar="OUTFILE"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Compare with results in JSONFILE written earlier by --json.",
+        metavar="JSONFILE",
+    )
+    parser.add_argument(
+        "--tolerance",
+        help="Allowed fractional slowdown versus --baseline.",
+        type=float,
+        default=0.25,
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks. Return 1 if there is a regression, otherwise 0."""
+    args = bench_argparser().parse_args(argv)
+    shape = CorpusShape(
+        files=args.files,
+        blocks=args.blocks,
+        block_lines=args.block_lines,
+        comment_density=args.comment_density,
+        directive_density=args.directive_density,
+        output_density=args.output_density,
+        seed=args.seed,
+    )
+    results = run(shape, args.repeat)
+    show(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if baseline["corpus"] != results["corpus"]:
+            print("warning: baseline corpus differs from this corpus.")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
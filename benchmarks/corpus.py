@@ -0,0 +1,72 @@
+"""Generate synthetic Markdown files with Python code blocks for benchmarks."""
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+
+@dataclass
+class CorpusShape:
+    """Size and make up of the synthetic Markdown corpus."""
+
+    files: int = 10
+    """Number of Markdown files."""
+    blocks: int = 20
+    """Python code blocks per file."""
+    block_lines: int = 5
+    """Lines of Python per code block."""
+    comment_density: float = 0.2
+    """Fraction of code blocks preceded by a plain HTML comment."""
+    directive_density: float = 0.1
+    """Fraction of code blocks preceded by phmutest directives."""
+    output_density: float = 0.5
+    """Fraction of code blocks followed by an expected output block."""
+    seed: int = 0
+    """Seed for the random number generator. The same seed makes the same corpus."""
+
+
+def code_block(file_number: int, block_number: int, lines: int) -> List[str]:
+    """Python code block that assigns names and prints one line."""
+    name = f"value_{block_number}"
+    code = ["```python", f"{name} = {block_number}"]
+    for i in range(1, max(lines - 1, 1)):
+        code.append(f"{name} = {name} + {i}  # file {file_number} line {i}")
+    code.append(f'print("block {block_number}", {name} >= {block_number})')
+    code.append("```")
+    return code
+
+
+def markdown_text(shape: CorpusShape, file_number: int, rng: random.Random) -> str:
+    """Create the Markdown for one file of the corpus."""
+    lines = [f"# Synthetic benchmark file {file_number}", ""]
+    for block_number in range(shape.blocks):
+        lines.append(f"## Example {block_number}")
+        lines.append("")
+        lines.append("Some prose that describes the example that follows.")
+        lines.append("It has two lines.")
+        lines.append("")
+        if rng.random() < shape.comment_density:
+            lines.append(f"<!-- editor note for example {block_number} -->")
+        if rng.random() < shape.directive_density:
+            lines.append(f"<!--phmutest-label f{file_number}b{block_number}-->")
+            lines.append("<!--phmutest-group synthetic-->")
+        lines.extend(code_block(file_number, block_number, shape.block_lines))
+        lines.append("")
+        if rng.random() < shape.output_density:
+            lines.append("```")
+            lines.append(f"block {block_number} True")
+            lines.append("```")
+            lines.append("")
+    return "\n".join(lines)
+
+
+def write_corpus(shape: CorpusShape, directory: Path) -> List[Path]:
+    """Write the Markdown files to directory. Return the paths in file order."""
+    rng = random.Random(shape.seed)
+    paths = []
+    for file_number in range(shape.files):
+        path = directory / f"synthetic{file_number:04d}.md"
+        path.write_text(markdown_text(shape, file_number, rng), encoding="utf-8")
+        paths.append(path)
+    return paths
@@ -0,0 +1,130 @@
+"""Measure peak memory to read Markdown blocks of a synthetic corpus.
+
+Compares BlockStore construction, which scans the Markdown line by line,
+to the whole text read_markdown() pipeline it replaced. Also shows the
+peak memory of the markdown map that translates testfile line numbers and
+the bytes allocated per DocNode, FencedBlock, and Directive instance.
+
+    python -m benchmarks.memory --files 20 --blocks 200
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import phmutest.direct
+import phmutest.fcb
+import phmutest.fenced
+import phmutest.reader
+import phmutest.select
+from benchmarks.bench import make_pipeline
+from benchmarks.corpus import CorpusShape, write_corpus
+
+
+def peak_bytes(function: Callable[[], Any]) -> int:
+    """Return peak bytes allocated while calling function and holding its result."""
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def bytes_per_instance(function: Callable[[], Any], count: int = 10_000) -> int:
+    """Return bytes allocated per object created by function."""
+    return peak_bytes(lambda: [function() for _ in range(count)]) // count
+
+
+def read_markdown_blocks(paths: List[Path]) -> List[phmutest.fenced.FencedBlock]:
+    """Create FencedBlocks the way BlockStore did before scan_markdown()."""
+    blocks = []
+    for path in paths:
+        blocks.extend(phmutest.fenced.convert(phmutest.reader.read_markdown(path)))
+    return blocks
+
+
+def instance_sizes(paths: List[Path]) -> Dict[str, int]:
+    """Bytes allocated for one instance of each class that holds parse results."""
+    nodes = phmutest.reader.scan_markdown(paths[0])
+    fcb = next(
+        n for n in nodes if n.ntype == phmutest.reader.NodeType.FENCED_CODE_BLOCK
+    )
+    directive = phmutest.direct.Directive(phmutest.direct.Marker.LABEL, "x", 1, "")
+    return {
+        "phmutest.reader.DocNode": bytes_per_instance(
+            lambda: phmutest.reader.DocNode.from_scan(
+                fcb.ntype, fcb.startpos, fcb.endpos, fcb.line, fcb.end_line
+            )
+        ),
+        "phmutest.fenced.FencedBlock": bytes_per_instance(
+            lambda: phmutest.fenced.FencedBlock(fcb)
+        ),
+        "phmutest.direct.Directive": bytes_per_instance(
+            lambda: phmutest.direct.Directive(
+                directive.type, directive.value, directive.line, directive.literal
+            )
+        ),
+    }
+
+
+def run(shape: CorpusShape) -> Dict[str, Any]:
+    """Write the corpus to a temporary directory and measure peak memory."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = write_corpus(shape, Path(tmpdir))
+        pipeline = make_pipeline(paths)
+        args = pipeline.args
+        peaks = {
+            "phmutest.select.BlockStore": peak_bytes(
+                lambda: phmutest.select.BlockStore(args)
+            ),
+            "read_markdown + fenced.convert": peak_bytes(
+                lambda: read_markdown_blocks(paths)
+            ),
+            "phmutest.fcb.make_markdown_map": peak_bytes(
+                lambda: phmutest.fcb.make_markdown_map(
+                    pipeline.testfile_lines, pipeline.block_store
+                )
+            ),
+        }
+        sizes = instance_sizes(paths)
+    return {"corpus": asdict(shape), "peak_bytes": peaks, "instance_bytes": sizes}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print the peak memory and instance sizes. Optionally write JSON."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.memory",
+        description="Measure peak memory to read blocks from a synthetic corpus.",
+    )
+    defaults = CorpusShape()
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--blocks", type=int, default=defaults.blocks)
+    parser.add_argument("--block-lines", type=int, default=defaults.block_lines)
+    parser.add_argument(
+        "--json", help="Write the results as JSON to OUTFILE.", metavar="OUTFILE"
+    )
+    args = parser.parse_args(argv)
+    shape = CorpusShape(
+        files=args.files, blocks=args.blocks, block_lines=args.block_lines
+    )
+    results = run(shape)
+    print(f"corpus: {results['corpus']}")
+    for name, value in results["peak_bytes"].items():
+        print(f"peak bytes {name:<34} {value:>12}")
+    for name, value in results["instance_bytes"].items():
+        print(f"bytes per  {name:<34} {value:>12}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
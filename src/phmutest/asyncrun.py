@@ -0,0 +1,43 @@
+"""Run the code blocks of a Markdown file with async blocks on an event loop."""
+
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_thread_loops = threading.local()
+"""Event loop used by all files when names are shared across files.
+
+Each thread has its own since an event loop runs in one thread.
+The loop is the attribute shared_loop.
+"""
+
+
+def get_shared_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Return the calling thread's shared event loop or None."""
+    return getattr(_thread_loops, "shared_loop", None)
+
+
+def run(coroutine: Coroutine[Any, Any, None], shared: bool) -> None:
+    """Run the test method coroutine of a file with async blocks.
+
+    Each file gets a new event loop unless shared is true. When names are
+    shared across files all the files use one event loop so objects bound
+    to the loop, like tasks and futures, can be used by blocks in later files.
+    """
+    if not shared:
+        asyncio.run(coroutine)
+        return
+    shared_loop = get_shared_loop()
+    if shared_loop is None or shared_loop.is_closed():
+        shared_loop = asyncio.new_event_loop()
+        _thread_loops.shared_loop = shared_loop
+    shared_loop.run_until_complete(coroutine)
+
+
+def close_shared_loop() -> None:
+    """Close the event loop used when sharing across files. Called after a run."""
+    shared_loop = get_shared_loop()
+    if shared_loop is not None:
+        shared_loop.run_until_complete(shared_loop.shutdown_asyncgens())
+        shared_loop.close()
+        _thread_loops.shared_loop = None
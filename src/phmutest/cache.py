@@ -0,0 +1,218 @@
+"""Remember failed blocks between runs in the .phmutest_cache directory.
+
+Supports the --last-failed and --failed-first options.
+With --bytecode-cache also keeps the compiled code of generated test classes.
+--cache-dir DIR changes the directory. Nothing is written without these options.
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import sys
+from pathlib import Path
+from types import CodeType
+from typing import Dict, List, MutableMapping, Optional
+
+import phmutest.printer
+import phmutest.subtest
+from phmutest.printer import DOC_LOCATION, RESULT
+
+CACHE_DIR = Path(".phmutest_cache")
+"""Default cache directory. It is relative to the current working directory."""
+
+LAST_FAILED = "lastfailed.json"
+"""Maps Markdown file to line numbers of blocks that failed or had an error."""
+
+BYTECODE = "bytecode"
+"""Subdirectory with a marshalled code object for each generated test class."""
+
+BYTECODE_ENTRIES = 1000
+"""Most code objects kept. The least recently used are removed."""
+
+
+def get_cache_dir(args: argparse.Namespace) -> Path:
+    """Return the --cache-dir directory or the default."""
+    directory: Path = args.cache_dir or CACHE_DIR
+    return directory
+
+
+def cache_path(directory: Path, name: str) -> Path:
+    """Return path to file in the cache directory. Create the directory if needed."""
+    if not directory.exists():
+        directory.mkdir(parents=True)
+        # Keep the cache out of version control without editing .gitignore.
+        (directory / ".gitignore").write_text("*\n", encoding="utf-8")
+    return directory / name
+
+
+def read_last_failed(directory: Path) -> Dict[str, List[int]]:
+    """Return failed block line numbers from the last run keyed by Markdown file."""
+    path = directory / LAST_FAILED
+    if not path.exists():
+        return {}
+    try:
+        failures: Dict[str, List[int]] = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}  # Ignore a corrupt cache file.
+    return failures
+
+
+def save_last_failed(args: argparse.Namespace, log: phmutest.printer.Log) -> None:
+    """Save failed and error block locations for files tested in this run.
+
+    Only runs with --last-failed or --failed-first save. Failures for files
+    not tested in this run are kept. Nothing is written when nothing failed
+    and there are no saved failures. The tests have already run, so a cache
+    that can't be written only gets a warning.
+    """
+    if not (args.last_failed or args.failed_first):
+        return
+    directory = get_cache_dir(args)
+    failures = read_last_failed(directory)
+    if not failures and not any(is_failure(entry) for entry in log):
+        return
+    for path in args.files:
+        failures.pop(path.as_posix(), None)
+    for entry in log:
+        if not is_failure(entry):
+            continue
+        location = entry[DOC_LOCATION]
+        if ":" not in location:
+            continue  # For example a --fixture error.
+        built_from, line = phmutest.subtest.decode_location_string(location)
+        lines = failures.setdefault(built_from, [])
+        if line not in lines:
+            lines.append(line)
+    text = json.dumps(failures, indent=2, sort_keys=True)
+    try:
+        cache_path(directory, LAST_FAILED).write_text(text + "\n", encoding="utf-8")
+    except OSError as exc:
+        print(f"Failed blocks not saved for --last-failed. {exc}", file=sys.stderr)
+
+
+def is_failure(entry: phmutest.printer.LogEntry) -> bool:
+    """Return True if the log entry is a block that failed or had an error."""
+    return len(entry) >= 3 and entry[RESULT] in ("failed", "error")
+
+
+def select_files(args: argparse.Namespace) -> MutableMapping[Path, int]:
+    """Apply --last-failed and --failed-first to args.files.
+
+    Return the line of the last failed block for each file that had failures
+    when --last-failed. Blocks after that line are not needed.
+    """
+    last_lines: MutableMapping[Path, int] = {}
+    if not (args.last_failed or args.failed_first):
+        return last_lines
+    failures = read_last_failed(get_cache_dir(args))
+    failed = [p for p in args.files if p.as_posix() in failures]
+    if not failed:
+        return last_lines
+    if args.last_failed:
+        # Keep files that share names with or provide setup for later files.
+        keep = set(failed) | set(args.setup_across_files)
+        last_failed_file = max(args.files.index(p) for p in failed)
+        for path in args.share_across_files:
+            if args.files.index(path) < last_failed_file:
+                keep.add(path)
+        args.files = [p for p in args.files if p in keep]
+        args.share_across_files = [p for p in args.share_across_files if p in keep]
+        for path in failed:
+            last_lines[path] = max(failures[path.as_posix()])
+    if args.failed_first and not (args.share_across_files or args.setup_across_files):
+        # Files that depend on names or setup from earlier files keep their order.
+        others = [p for p in args.files if p not in failed]
+        args.files = [p for p in args.files if p in failed] + others
+    return last_lines
+
+
+def with_filename(code: CodeType, filename: str) -> CodeType:
+    """Return code and its nested code objects with co_filename set to filename."""
+    consts = tuple(
+        with_filename(c, filename) if isinstance(c, CodeType) else c
+        for c in code.co_consts
+    )
+    return code.replace(co_filename=filename, co_consts=consts)
+
+
+class BytecodeCache:
+    """Compiled code of generated test classes saved in a directory.
+
+    Each code object is marshalled to a file named by a hash of the source.
+    Entries are touched when loaded. Saving does not scan the directory.
+    prune() removes the least recently used entries over BYTECODE_ENTRIES
+    once when the run is done. If directory is None nothing is cached.
+    """
+
+    def __init__(self, directory: Optional[Path]) -> None:
+        self.directory = directory
+        self.saved = 0
+        """Number of entries saved since the last prune()."""
+
+    def compile(self, source: str, filename: str) -> CodeType:
+        """Compile source or load the code saved when the same source was compiled.
+
+        The generated testfile is in a new temporary directory each run
+        so filename is set in the loaded code.
+        """
+        if self.directory is None:
+            return compile(source, filename, "exec")
+        key = hashlib.sha256(importlib.util.MAGIC_NUMBER + source.encode("utf-8"))
+        path = self.directory / (key.hexdigest() + ".bin")
+        code = load_code(path)
+        if code is not None:
+            return with_filename(code, filename)
+        code = compile(source, filename, "exec")
+        self.save(path, code)
+        return code
+
+    def save(self, path: Path, code: CodeType) -> None:
+        """Save code to path. Stop caching if the directory can't be written."""
+        assert self.directory is not None, "sanity check"
+        try:
+            if not self.saved:
+                cache_path(self.directory.parent, BYTECODE).mkdir(exist_ok=True)
+            # Replace to avoid a partial file if another process reads it.
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_bytes(marshal.dumps(code))
+            os.replace(temporary, path)
+        except OSError:
+            self.directory = None
+            return
+        self.saved += 1
+
+    def prune(self) -> None:
+        """Remove the least recently used code over the limit if any was saved."""
+        if self.directory is None or not self.saved:
+            return
+        self.saved = 0
+        entries = [(p.stat().st_mtime, p) for p in self.directory.glob("*.bin")]
+        if len(entries) > BYTECODE_ENTRIES:
+            entries.sort()
+            for _, entry in entries[: len(entries) - BYTECODE_ENTRIES]:
+                entry.unlink(missing_ok=True)
+
+
+def load_code(path: Path) -> Optional[CodeType]:
+    """Return the code saved at path or None if it is missing or corrupt."""
+    try:
+        code = marshal.loads(path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(code, CodeType):
+        return None
+    try:
+        os.utime(path)  # Mark as recently used.
+    except OSError:
+        pass
+    return code
+
+
+def bytecode_cache(args: argparse.Namespace) -> BytecodeCache:
+    """Return the bytecode cache for the run. Its directory is None if disabled."""
+    if not args.bytecode_cache:
+        return BytecodeCache(None)
+    return BytecodeCache(get_cache_dir(args) / BYTECODE)
@@ -0,0 +1,91 @@
+"""Capture what a thread prints to stdout and stderr.
+
+contextlib.redirect_stdout() replaces sys.stdout for the whole process so
+only one thread at a time can capture. installed() replaces sys.stdout and
+sys.stderr once for the run with a ThreadStream. A ThreadStream writes to
+the innermost capture of the calling thread, or to the stream it replaced
+when the thread is not capturing. redirect() starts a capture.
+"""
+
+import contextlib
+import sys
+import threading
+from typing import Any, Iterator, List, TextIO
+
+
+class ThreadStream:
+    """Dispatch writes to the innermost capture stream of the calling thread.
+
+    Other attributes, like encoding and fileno(), come from the same stream.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        """The replaced stream. Used when the thread is not capturing."""
+        self.local = threading.local()
+
+    def targets(self) -> List[TextIO]:
+        """Return the calling thread's capture streams, innermost last."""
+        try:
+            targets: List[TextIO] = self.local.targets
+        except AttributeError:
+            targets = []
+            self.local.targets = targets
+        return targets
+
+    def target(self) -> TextIO:
+        """Return the stream that the calling thread writes to."""
+        targets = self.targets()
+        return targets[-1] if targets else self.stream
+
+    def write(self, text: str) -> int:
+        return self.target().write(text)
+
+    def flush(self) -> None:
+        self.target().flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.target(), name)
+
+
+def is_installed() -> bool:
+    """Return True if sys.stdout and sys.stderr are ThreadStreams."""
+    return isinstance(sys.stdout, ThreadStream) and isinstance(sys.stderr, ThreadStream)
+
+
+@contextlib.contextmanager
+def installed() -> Iterator[None]:
+    """Replace sys.stdout and sys.stderr with ThreadStreams in the with suite."""
+    if is_installed():
+        yield
+        return
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = ThreadStream(stdout)
+    sys.stderr = ThreadStream(stderr)
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+@contextlib.contextmanager
+def redirect(stdout: TextIO, stderr: TextIO) -> Iterator[None]:
+    """Send what the calling thread prints in the with suite to stdout and stderr.
+
+    When the ThreadStreams are not installed, for example when a generated
+    testfile is run by unittest, redirect sys.stdout and sys.stderr instead.
+    """
+    out, err = sys.stdout, sys.stderr
+    if not (isinstance(out, ThreadStream) and isinstance(err, ThreadStream)):
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            yield
+        return
+    stdout_targets = out.targets()
+    stderr_targets = err.targets()
+    stdout_targets.append(stdout)
+    stderr_targets.append(stderr)
+    try:
+        yield
+    finally:
+        stdout_targets.pop()
+        stderr_targets.pop()
@@ -1,13 +1,16 @@
 """Generate test cases as a unittest test file."""
 
 import argparse
+import io
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, List, TextIO, Tuple
 
 import phmutest.fcb
 import phmutest.fillin
 import phmutest.select
 import phmutest.subtest
+from phmutest.direct import Marker
+from phmutest.fenced import FencedBlock
 
 # Uses Python template string substitution to generate custom code from
 # templates strings and key mappings.  The forms are filled in by Python
@@ -130,7 +133,7 @@ with ExitStack() as _phm_stack:
 
 
 fixture_globs_update_code = """\
-_phm_fixture = _phm_user_setup_function(log=_phm_log, is_replmode=False)
+_phm_fixture = _phm_fixture_scope.setup(log=_phm_log, module_globals=_phm_globals)
 if _phm_fixture is not None:
     if _phm_fixture.globs is not None:
         _phm_globals.update(additions=_phm_fixture.globs)"""
@@ -265,11 +268,195 @@ $teardownclass
 
     def tests(self):
 
+        $closeloop
 $subtests
         $sharenames
 
 '''
 
+
+def has_async_blocks(fileblocks: phmutest.select.FileBlocks) -> bool:
+    """Return True if a selected code block has the async directive."""
+    return any(
+        block.has_directive(Marker.ASYNC)
+        and not block.has_directive(Marker.SETUP)
+        and not block.has_directive(Marker.TEARDOWN)
+        for block in fileblocks.selected
+    )
+
+
+IMPORT_ASYNCRUN = (
+    "from phmutest.asyncrun import run as _phm_async_run\n"
+    "from phmutest.asyncrun import close_shared_loop as _phm_async_close"
+)
+"""Import lines for testfiles with blocks that have the async directive."""
+
+
+def close_loop_code(
+    args: argparse.Namespace, fileblocks: phmutest.select.FileBlocks, code: str
+) -> str:
+    """Return code to close the file's event loop or "" if it is not closed.
+
+    The async blocks of a file run on one event loop so objects bound to
+    the loop, like tasks and futures, can be used by the later blocks.
+    When names are shared across files all the files use the loop.
+    """
+    shared = bool(args.share_across_files or args.setup_across_files)
+    if has_async_blocks(fileblocks) and not shared:
+        return code
+    return ""
+
+
+def has_referenced_outputs(fileblocks: phmutest.select.FileBlocks) -> bool:
+    """Return True if a selected block's expected output is loaded by reference."""
+    return any(
+        phmutest.subtest.has_referenced_output(block) for block in fileblocks.selected
+    )
+
+
+IMPORT_EXPECTED = (
+    "from phmutest.expected import expected_output as _phm_expected_output"
+)
+"""Import line for testfiles that load expected output by reference."""
+
+
+# With --block-methods each code block is rendered as its own test method.
+# The method names end with the block line number zero filled to the same
+# width so unittest runs them in Markdown file order.
+# Local variables don't carry over from one method to the next. So the names
+# a block assigns are declared global and kept track of by the class namespace
+# cls.global_names which removes them when the class is done. If the file
+# shares names across files they are kept track of by _phm_globals instead.
+block_methods_class_form = '''\
+class Test$filenum(unittest.TestCase):
+    """Test cases generated from $mdfile."""
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.global_names = _phmGlobals(__name__, shareid=$shareid)
+$setupblocks
+        cls.global_names.update(additions=locals(), built_from=$built_from)
+
+    @classmethod
+    def tearDownClass(cls):
+
+$teardownblocks
+        cls.global_names.clear()
+        $closeloop
+$methods
+
+'''
+
+block_method_form = """\
+
+    def test_$methodid(self):
+        $globalnames
+$codeblock
+        $updatenames
+"""
+
+# The method of a block with <!--phmutest-async--> runs its coroutine
+# on the file's event loop so objects bound to the loop outlive the block.
+async_block_method_form = """\
+
+    def test_$methodid(self):
+        _phm_async_run(self._phm_async_$methodid(), shared=True)
+
+    async def _phm_async_$methodid(self):
+        $globalnames
+$codeblock
+        $updatenames
+"""
+
+no_block_methods_form = """\
+
+    def tests(self):
+$subtests
+"""
+
+
+def block_names_owner(
+    args: argparse.Namespace, fileblocks: phmutest.select.FileBlocks, path: Path
+) -> str:
+    """Statement that keeps track of the $names assigned by a block method."""
+    from_arg = f'built_from="{fileblocks.built_from}"'
+    if path in args.share_across_files:
+        existing_names = "existing_names=self.global_names.get_names()"
+        return f"_phm_globals.update_assigned([$names], {from_arg}, {existing_names})"
+    if args.setup_across_files or args.fixture:
+        existing_names = "existing_names=_phm_globals.get_names()"
+        return (
+            f"self.global_names.update_assigned([$names], {from_arg}, {existing_names})"
+        )
+    return f"self.global_names.update_assigned([$names], {from_arg})"
+
+
+def render_block_method(
+    args: argparse.Namespace,
+    fileblocks: phmutest.select.FileBlocks,
+    block: FencedBlock,
+    methodid: str,
+    names_owner: str,
+) -> str:
+    """Generate the test method for a code block."""
+    code = phmutest.subtest.format_code_block(
+        args, fileblocks, block, in_coroutine=True
+    )
+    replacements = dict(methodid=methodid, codeblock=code)
+    names = phmutest.subtest.assigned_names(block.contents)
+    if names:
+        replacements["globalnames"] = "global " + ", ".join(names)
+        quoted = ", ".join(f'"{name}"' for name in names)
+        replacements["updatenames"] = names_owner.replace("$names", quoted)
+    form = block_method_form
+    if block.has_directive(Marker.ASYNC):
+        form = async_block_method_form
+    return phmutest.fillin.fill_in(form, replacements)
+
+
+def render_block_methods(
+    args: argparse.Namespace, fileblocks: phmutest.select.FileBlocks, path: Path
+) -> str:
+    """Generate a test method for each code block in the file."""
+    code_blocks = [b for b in fileblocks.selected if phmutest.subtest.is_code_block(b)]
+    if not code_blocks:
+        if fileblocks.selected:
+            subtests = no_log_form
+        else:
+            subtests = no_blocks_form.replace("$builtfrom", fileblocks.built_from)
+        return phmutest.fillin.fill_in(no_block_methods_form, {"subtests": subtests})
+    width = len(str(code_blocks[-1].line))
+    owner = block_names_owner(args, fileblocks, path)
+    methods = [
+        render_block_method(args, fileblocks, b, str(b.line).zfill(width), owner)
+        for b in code_blocks
+    ]
+    return "\n".join(methods)
+
+
+def render_block_methods_class(
+    args: argparse.Namespace,
+    fileblocks: phmutest.select.FileBlocks,
+    path: Path,
+    replacements: Dict[str, str],
+    shareid: str,
+) -> str:
+    """Generate the test class for --block-methods."""
+    if path not in args.setup_across_files:
+        replacements["setupblocks"] = phmutest.subtest.format_setup_blocks(
+            args, fileblocks
+        )
+        replacements["teardownblocks"] = phmutest.subtest.format_teardown_blocks(
+            args, fileblocks
+        )
+    replacements["shareid"] = f'"{shareid}"'
+    replacements["built_from"] = f'"{fileblocks.built_from}"'
+    replacements["closeloop"] = close_loop_code(args, fileblocks, "_phm_async_close()")
+    replacements["methods"] = render_block_methods(args, fileblocks, path)
+    return phmutest.fillin.fill_in(block_methods_class_form, replacements)
+
+
 no_blocks_form = """\
         # no python blocks to test
         _phm_log.append(["$builtfrom", "noblocks", ""])
@@ -299,6 +486,9 @@ def markdown_file(
     else:
         shareid = ""
 
+    if args.block_methods:
+        return render_block_methods_class(args, fileblocks, path, replacements, shareid)
+
     if path not in args.setup_across_files:
         replacements["setupclass"] = render_setup_class(
             args,
@@ -345,6 +535,9 @@ def markdown_file(
             f"_phm_globals.update(additions=locals(), {from_arg}, {existing_names})"
         )
         replacements["sharenames"] = statement
+    replacements["closeloop"] = close_loop_code(
+        args, fileblocks, "self.addCleanup(_phm_async_close)"
+    )
     return phmutest.fillin.fill_in(
         class_form,
         replacements,
@@ -356,14 +549,16 @@ testfile_form = '''\
 import unittest
 
 from phmutest.globs import Globals as _phmGlobals
+from phmutest.outputcheck import OutputChecker as _phmOutputChecker
 from phmutest.printer import Printer as _phmPrinter
 from phmutest.systool import sys_tool as _phm_sys
+$importasyncrun
+$importexpected
 $importimporter
 
 $importfunction
 _phm_globals = None
-_phm_testcase = unittest.TestCase()
-_phm_testcase.maxDiff = None
+_phm_testcase = _phmOutputChecker()
 _phm_log = []
 _phmPrinter.testfile_name = None
 $setupmodule
@@ -372,21 +567,27 @@ $testclasses
 '''
 
 
-def testfile(
+def testfile_replacements(
     args: argparse.Namespace,
     block_store: phmutest.select.BlockStore,
-) -> Tuple[str, phmutest.fcb.FcbLineMap]:
-    """Generate the unittest module source as directed by command line args args."""
-    test_classes = ""
+) -> Dict[str, str]:
+    """Replacements for the testfile_form keys other than $testclasses."""
     replacements = {}
+    if any(has_async_blocks(block_store.get_blocks(path)) for path in args.files):
+        replacements["importasyncrun"] = IMPORT_ASYNCRUN
+    if any(has_referenced_outputs(block_store.get_blocks(p)) for p in args.files):
+        replacements["importexpected"] = IMPORT_EXPECTED
     if args.fixture:
         replacements["importimporter"] = (
+            "from phmutest.fixturescope import FixtureScope as _phmFixtureScope\n"
             "from phmutest.importer import fixture_function_importer "
             "as _phm_fixture_function_importer"
         )
         replacements["importfunction"] = (
             f"_phm_user_setup_function = "
-            f'_phm_fixture_function_importer("{args.fixture}")'
+            f'_phm_fixture_function_importer("{args.fixture}")\n'
+            f"_phm_fixture_scope = _phmFixtureScope("
+            f'"{args.fixture}", _phm_user_setup_function)'
         )
 
     if args.setup_across_files or args.share_across_files or args.fixture:
@@ -394,31 +595,105 @@ def testfile(
         replacements["setupmodule"] = "\n\n" + setupcode
         teardown_code = render_teardown_module(args, block_store)
         replacements["teardownmodule"] = "\n\n" + teardown_code
+    return replacements
 
-    for sequence_number, path in enumerate(args.files, start=1):
-        test_classes += "\n\n" + markdown_file(args, block_store, path, sequence_number)
-    if not test_classes.endswith("\n"):
-        test_classes += "\n"
-    replacements["testclasses"] = test_classes
 
-    testfile = phmutest.fillin.fill_in(
-        testfile_form,
-        replacements,
-    )
+def class_name(sequence_number: int) -> str:
+    """Name of the test class generated for the Markdown file at sequence_number."""
+    return f"Test{str(sequence_number).zfill(3)}"
+
 
-    # Rewrite placeholders 'testfile_lineno=0' with the testfile line number.
+def render_test_class(
+    args: argparse.Namespace,
+    block_store: phmutest.select.BlockStore,
+    sequence_number: int,
+) -> str:
+    """Generate the test class for a Markdown file and the blank lines before it."""
+    path = args.files[sequence_number - 1]
+    return "\n\n" + markdown_file(args, block_store, path, sequence_number)
+
+
+def number_lines(text: str, first_lineno: int) -> List[str]:
+    """Split text into lines. Fill in the testfile line number placeholders.
+
+    first_lineno is the testfile line number of the first line of text.
+    """
     lines = []
-    for testfile_lineno, line in enumerate(testfile.splitlines(), start=1):
+    for testfile_lineno, line in enumerate(text.splitlines(), start=first_lineno):
         # The testfile 'with _phmPrinter' lines are generated by subtest.py.
         if "with _phmPrinter(" in line:
             line = line.replace(
                 "testfile_lineno=0", f"testfile_lineno={testfile_lineno}"
             )
         lines.append(line)
-    testfile = "\n".join(lines)
+    return lines
 
-    # Save map relating testfile lines to FCBs from the Markdown.
-    markdown_map = phmutest.fcb.make_markdown_map(
-        testfile_lines=lines, block_store=block_store
-    )
-    return testfile, markdown_map
+
+def write_testfile(
+    args: argparse.Namespace,
+    block_store: phmutest.select.BlockStore,
+    dest: TextIO,
+) -> phmutest.fcb.FcbLineMap:
+    """Write the unittest module source to dest one test class at a time.
+
+    Only the module level code or one test class is held in memory
+    while it is written. Return the map relating testfile lines to FCBs.
+    """
+    lazy = LazyTestfile(args, block_store)
+    pending = lazy.header
+    for name in lazy.class_names:
+        _, text = lazy.render_class(name)
+        _ = dest.write(pending)
+        pending = text
+    # The testfile ends with a single newline.
+    _ = dest.write(pending.rstrip() + "\n")
+    return lazy.markdown_map
+
+
+def testfile(
+    args: argparse.Namespace,
+    block_store: phmutest.select.BlockStore,
+) -> Tuple[str, phmutest.fcb.FcbLineMap]:
+    """Generate the unittest module source as directed by command line args args."""
+    buffer = io.StringIO()
+    markdown_map = write_testfile(args, block_store, buffer)
+    return buffer.getvalue(), markdown_map
+
+
+class LazyTestfile:
+    """Generate the testfile one test class at a time.
+
+    The module level code is generated when the instance is created.
+    Each test class is generated when the test runner gets to it, so
+    classes not reached when unittest -f stops early are never generated.
+    The classes are numbered in the testfile in the order they are generated.
+    """
+
+    def __init__(
+        self, args: argparse.Namespace, block_store: phmutest.select.BlockStore
+    ) -> None:
+        self.args = args
+        self.block_store = block_store
+        header = phmutest.fillin.fill_in(
+            testfile_form, testfile_replacements(args, block_store)
+        )
+        # fill_in() chops the newline that ends the line before $testclasses.
+        self.header = header + "\n"
+        self.next_lineno = self.header.count("\n") + 1
+        """Testfile line number of the first line of the next test class."""
+        self.class_names = [class_name(n) for n in range(1, len(args.files) + 1)]
+        self.sequence_numbers = {n: i for i, n in enumerate(self.class_names, start=1)}
+        self.markdown_map = phmutest.fcb.FcbLineMap(block_store)
+
+    def render_class(self, name: str) -> Tuple[int, str]:
+        """Generate test class name. Return its first testfile line number and text.
+
+        The markdown_map is extended with the FCBs in the class.
+        """
+        sequence_number = self.sequence_numbers[name]
+        text = render_test_class(self.args, self.block_store, sequence_number)
+        first_lineno = self.next_lineno
+        lines = number_lines(text, first_lineno)
+        self.next_lineno += len(lines)
+        phmutest.fcb.add_testfile_lines(self.markdown_map, lines, first_lineno)
+        return first_lineno, "\n".join(lines) + "\n"
@@ -3,23 +3,109 @@
 import copy
 import importlib
 import itertools
+import linecache
 import sys
+import types
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import Any, Dict, Iterator, List, Optional
 
+import phmutest.asyncrun
+import phmutest.cache
+import phmutest.cases
 import phmutest.config
+import phmutest.expected
 import phmutest.fcb
+import phmutest.printer
+import phmutest.profiling
 import phmutest.summary
 
 gen_file_counter = itertools.count(1)
 
 
+class LazyClasses:
+    """Generate, compile, and define test classes in the generated module on demand.
+
+    Each class's text is appended to the testfile before it is compiled
+    so tracebacks show the testfile lines.
+    """
+
+    def __init__(
+        self,
+        module: types.ModuleType,
+        testfile: phmutest.cases.LazyTestfile,
+        dest: Path,
+        bytecode: phmutest.cache.BytecodeCache,
+    ) -> None:
+        self.module = module
+        self.testfile = testfile
+        self.dest = dest
+        self.bytecode = bytecode
+        self.classes: Dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        """Return the test class. Generate and compile it the first time."""
+        if name not in self.classes:
+            profiler = phmutest.printer.Printer.profiler
+            with phmutest.profiling.stage(profiler, "phmutest.cases.testfile"):
+                first_lineno, text = self.testfile.render_class(name)
+            with open(self.dest, "a", encoding="utf-8") as f:
+                f.write(text)
+            linecache.checkcache(str(self.dest))
+            # Blank lines put the class at its testfile line numbers.
+            source = "\n" * (first_lineno - 1) + text
+            code = self.bytecode.compile(source, str(self.dest))
+            exec(code, self.module.__dict__)
+            # The class is not left as a module global so that phmutest.globs.Globals
+            # sees the same module attributes before and after a class is defined.
+            self.classes[name] = self.module.__dict__.pop(name)
+        return self.classes[name]
+
+
+class LazySuite(unittest.TestSuite):
+    """Load each test class when the runner gets to it.
+
+    When unittest -f stops the run, the remaining classes are not generated.
+    """
+
+    def __init__(self, loader: unittest.TestLoader, test_classes: LazyClasses):
+        super().__init__()
+        self.loader = loader
+        self.test_classes = test_classes
+        self.names: List[str] = list(test_classes.testfile.class_names)
+        self.result: Optional[unittest.TestResult] = None
+
+    def run(
+        self, result: unittest.TestResult, debug: bool = False
+    ) -> unittest.TestResult:
+        self.result = result
+        return super().run(result, debug)
+
+    def __iter__(self) -> Iterator[Any]:
+        index = 0
+        while index < len(self._tests) or self.load_next_class():
+            yield self._tests[index]
+            index += 1
+
+    def load_next_class(self) -> bool:
+        """Add the tests of the next class. Return False if no class is added."""
+        if not self.names or (self.result is not None and self.result.shouldStop):
+            return False
+        test_class = self.test_classes.get(self.names.pop(0))
+        self.addTest(self.loader.loadTestsFromTestCase(test_class))
+        return True
+
+
 def run_code(
     settings: phmutest.config.Settings,
-    testfile: str,
+    testfile: phmutest.cases.LazyTestfile,
 ) -> phmutest.summary.PhmResult:
-    """Run the generated testfile with unittest."""
+    """Run the generated testfile with unittest.
+
+    The module level code is written and imported first.
+    The test classes are generated as unittest runs them.
+    """
     args = settings.args  # rename
     # When phmutest is imported and called from a user Python script
     # consider the following:
@@ -35,21 +121,35 @@ def run_code(
     with TemporaryDirectory() as tmpdir:
         dest = Path(tmpdir) / genfilename
         # Tell the Printer class the generated testfile name.
-        testfile = testfile.replace(
+        header = testfile.header.replace(
             "_phmPrinter.testfile_name = None", f'_phmPrinter.testfile_name = r"{dest}"'
         )
-        _ = dest.write_text(testfile, encoding="utf-8")
-        # unittest is the default test runner. Run unittest now.
+        _ = dest.write_text(header, encoding="utf-8")
         sys.path.append(tmpdir)
+        phmgen = importlib.import_module(genmodulename)
+        bytecode = phmutest.cache.bytecode_cache(args)
+        test_classes = LazyClasses(phmgen, testfile, dest, bytecode)
+        phmgen.__dict__["load_tests"] = lambda loader, tests, pattern: LazySuite(
+            loader, test_classes
+        )
+        # unittest is the default test runner. Run unittest now.
         unittest_args = ["unittest.main"]
         if settings.extra_args:
             unittest_args.extend(settings.extra_args)
         # Run the testfile
-        testprog: unittest.TestProgram = unittest.main(
-            module=genmodulename, argv=unittest_args, exit=False
-        )
-        # Note: unittest should have already imported genmodulename.
-        phmgen = importlib.import_module(genmodulename)
+        # Expected output referred to by the testfile is looked up in the blocks.
+        phmutest.expected.block_store = testfile.block_store
+        try:
+            testprog: unittest.TestProgram = unittest.main(
+                module=phmgen, argv=unittest_args, exit=False
+            )
+        finally:
+            phmutest.expected.block_store = None
+            phmutest.asyncrun.close_shared_loop()
+            bytecode.prune()
+        if phmutest.printer.Printer.stream is not None:
+            # Write the skipped blocks logged after the last code block ran.
+            phmutest.printer.Printer.stream.catch_up(phmgen._phm_log)
         log = copy.copy(phmgen._phm_log)
         metrics = phmutest.summary.compute_metrics(
             num_files=len(args.files),
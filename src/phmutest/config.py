@@ -16,16 +16,22 @@ Read values from [tool.phmuttest] table in a .toml document.
     For all other keys, if also present as command line options
     the command line options take precedence.
     These cannot be configured:
-          --replmode,
-          --generate, --progress, --sharing,
-          --log, --summary, --stdout, --report
+          --replmode, --engine, --block-methods, --threads,
+          --generate, --generate-dir, --progress, --sharing,
+          --log, --summary, --stdout, --diff-lines,
+          --full-diff, --trace-memory,
+          --profile, --jsonl, --junitxml, --last-failed,
+          --failed-first, --cache-dir, --bytecode-cache,
+          --report
 """
 
 import argparse
+import os
+import re
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Pattern, Set, Tuple
 
 import phmutest.syntax
 
@@ -37,6 +43,33 @@ else:
 
 KnownArgs = Tuple[argparse.Namespace, List[str]]
 
+GLOB_CHARACTERS = "*?["
+"""A glob pattern segment with one of these is not a literal name."""
+
+
+@dataclass
+class FileWalk:
+    """Files selected by a walk of the current directory and the walked directories.
+
+    The walk is still valid while none of the directories have been modified.
+    """
+
+    files: List[Path]
+    directories: Dict[str, int] = field(default_factory=dict)  # path: st_mtime_ns
+
+    def is_current(self) -> bool:
+        """Return True if no files were added, removed, or renamed since the walk."""
+        try:
+            return all(
+                os.stat(d).st_mtime_ns == mtime for d, mtime in self.directories.items()
+            )
+        except OSError:
+            return False
+
+
+walks: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...]], FileWalk] = {}
+"""Recorded walks keyed by working directory, include globs, and exclude globs."""
+
 
 @dataclass
 class Settings:
@@ -77,11 +110,112 @@ def check_across_files(args: argparse.Namespace) -> None:
 
 def remove_duplicate_files(args: argparse.Namespace) -> None:
     """Remove duplicate positional args files. Modifies in place."""
-    unique_files = []
-    for f in args.files:
-        if f not in unique_files:
-            unique_files.append(f)
-    args.files = unique_files
+    args.files = list(dict.fromkeys(args.files))
+
+
+def glob_segments(glob: str) -> List[str]:
+    """Split glob into path segments leaving out empty and . segments."""
+    return [segment for segment in glob.split("/") if segment not in ("", ".")]
+
+
+def ignore_case() -> bool:
+    """Return True if the file system compares file names case insensitively."""
+    return os.path.normcase("A") == "a"
+
+
+def glob_regex(glob: str) -> Pattern[str]:
+    """Return regex that matches relative POSIX file paths that Path.glob() finds.
+
+    Like Path.glob() the match is case insensitive on Windows.
+    """
+    parts = []
+    for segment in glob_segments(glob):
+        if segment == "**":
+            parts.append("(?:[^/]+/)*")  # zero or more directories
+            continue
+        translated = re.sub(r"\[!?[^]]+\]|\*|\?|[^*?[]+|\[", glob_token, segment)
+        parts.append(translated + "/")
+    flags = re.IGNORECASE if ignore_case() else 0
+    return re.compile("".join(parts).rstrip("/"), flags)
+
+
+def glob_token(match: "re.Match[str]") -> str:
+    """Translate a wildcard, character set, or literal text in a glob to regex."""
+    token = match.group()
+    if token == "*":
+        return "[^/]*"
+    if token == "?":
+        return "[^/]"
+    if len(token) > 2 and token.startswith("[") and token.endswith("]"):
+        negate = token.startswith("[!")
+        characters = token[2:-1] if negate else token[1:-1]
+        return ("[^/" if negate else "[") + characters.replace("\\", "\\\\") + "]"
+    return re.escape(token)
+
+
+def can_walk(glob: str) -> bool:
+    """Return True if the files matching glob are below the current directory."""
+    return not glob.startswith("/") and ".." not in glob_segments(glob)
+
+
+def literal_prefix(glob: str) -> Optional[str]:
+    """Return the directories before the first wildcard. None if it is the first.
+
+    Empty string if glob has no directories.
+    """
+    directories = glob_segments(glob)[:-1]
+    for position, segment in enumerate(directories):
+        if any(c in segment for c in GLOB_CHARACTERS):
+            if position == 0:
+                return None
+            directories = directories[:position]
+            break
+    return "/".join(directories)
+
+
+def walk_globs(include_globs: List[str], exclude_globs: List[str]) -> FileWalk:
+    """Select files matching include_globs and not exclude_globs in a single walk.
+
+    Files are ordered by the first include glob they match and then by walk order.
+    Directories that cannot hold a matching file are not walked.
+    Directories excluded by a glob ending in /**/* are not walked.
+    """
+    includes = [glob_regex(g) for g in include_globs]
+    excludes = [glob_regex(g) for g in exclude_globs]
+    fold = str.lower if ignore_case() else str
+    prefixes = [literal_prefix(fold(g)) for g in include_globs]
+    suffix = "/**/*"
+    pruned = [
+        glob_regex(g[: -len(suffix)]) for g in exclude_globs if g.endswith(suffix)
+    ]
+
+    def is_walked(directory: str) -> bool:
+        if any(p.fullmatch(directory) for p in pruned):
+            return False
+        directory = fold(directory)
+        for prefix in prefixes:
+            if prefix is None or directory == prefix:
+                return True
+            if not prefix:
+                continue  # Only files in the current directory.
+            if directory.startswith(prefix + "/") or prefix.startswith(directory + "/"):
+                return True
+        return False
+
+    walk = FileWalk(files=[])
+    found: List[Tuple[int, int, Path]] = []
+    for root, dirnames, filenames in os.walk("."):
+        walk.directories[root] = os.stat(root).st_mtime_ns
+        relative = os.path.relpath(root).replace(os.sep, "/")
+        base = "" if relative == "." else relative + "/"
+        dirnames[:] = sorted(d for d in dirnames if is_walked(base + d))
+        for name in sorted(filenames):
+            path = base + name
+            matches = [n for n, r in enumerate(includes) if r.fullmatch(path)]
+            if matches and not any(r.fullmatch(path) for r in excludes):
+                found.append((matches[0], len(found), Path(path)))
+    walk.files = [path for _, _, path in sorted(found)]
+    return walk
 
 
 class ConfigSection:
@@ -106,23 +240,35 @@ class ConfigSection:
             return None
 
     def select_files(self) -> List[Path]:
-        """Resolve globs into a list of existing paths."""
+        """Resolve globs into a list of existing paths.
+
+        Globs below the current directory are resolved by one walk which
+        is recorded and reused until a walked directory is modified.
+        """
         include_globs = self.section.get("include-globs", [])
         exclude_globs = self.section.get("exclude-globs", [])
-        working_directory = Path(".")  # current working directory
-        included: List[Path] = []
-        for glob in include_globs:
-            included.extend(working_directory.glob(glob))
+        walked = [g for g in include_globs if can_walk(g)]
+        key = (os.getcwd(), tuple(walked), tuple(exclude_globs))
+        walk = walks.get(key)
+        if walked and (walk is None or not walk.is_current()):
+            walk = walks[key] = walk_globs(walked, exclude_globs)
+        selected = list(walk.files) if walked and walk else []
+        others = [g for g in include_globs if not can_walk(g)]
+        if others:
+            selected.extend(self.glob_files(others, exclude_globs))
+        return selected
 
-        excluded: List[Path] = []
+    @staticmethod
+    def glob_files(include_globs: List[str], exclude_globs: List[str]) -> List[Path]:
+        """Resolve globs that reach above the current directory with Path.glob()."""
+        working_directory = Path(".")  # current working directory
+        excluded: Set[Path] = set()
         for glob in exclude_globs:
-            excluded.extend(working_directory.glob(glob))
-
+            excluded.update(working_directory.glob(glob))
         selected: List[Path] = []
-        for keeper in included:
-            if keeper in excluded:
-                continue
-            selected.append(keeper)
+        for glob in include_globs:
+            paths = working_directory.glob(glob)
+            selected.extend(p for p in paths if p not in excluded)
         return selected
 
     def get_paths(self, key: str) -> List[Path]:
@@ -18,6 +18,7 @@ class Marker(Enum):
     SETUP = auto()
     TEARDOWN = auto()
     TEST_GROUP = auto()
+    ASYNC = auto()
 
 
 @dataclass
@@ -68,6 +69,7 @@ directive_finders = [
     MarkerPattern(Marker.SETUP, r"(<!--phmutest-setup-->)$"),
     MarkerPattern(Marker.TEARDOWN, r"(<!--phmutest-teardown-->)$"),
     MarkerPattern(Marker.TEST_GROUP, r"(<!--phmutest-group (?P<value>.*?)-->)$"),
+    MarkerPattern(Marker.ASYNC, r"(<!--phmutest-async-->)$"),
 ]
 
 
@@ -75,6 +77,9 @@ directive_finders = [
 class Directive:
     """A phmutest directive taken from a HTML comment."""
 
+    # A slotted dataclass without dataclass(slots=True) which needs Python 3.10.
+    __slots__ = ("type", "value", "line", "literal")
+
     type: Marker
     value: str  # String value. Empty string if no value.
     line: int  # line number in file
@@ -0,0 +1,502 @@
+"""Run Python FCBs with exec() instead of generating a unittest testfile.
+
+Selected by --engine direct. Each block is compiled with its Markdown
+filename and blank lines before it, so tracebacks show Markdown line numbers.
+The blocks of a Markdown file run in one namespace. Setup and teardown blocks,
+the --fixture, and names shared across files work the same as in the
+generated testfile. With --threads independent files run on a thread pool.
+"""
+
+import argparse
+import ast
+import concurrent.futures
+import inspect
+import io
+import itertools
+import sys
+import textwrap
+import traceback
+import types
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, List, Optional
+
+import phmutest.asyncrun
+import phmutest.capture
+import phmutest.cases
+import phmutest.config
+import phmutest.fixturescope
+import phmutest.importer
+import phmutest.outputcheck
+import phmutest.printer
+import phmutest.select
+import phmutest.subtest
+import phmutest.summary
+from phmutest.direct import Marker
+from phmutest.fenced import FencedBlock
+from phmutest.printer import FRAME
+from phmutest.skip import skip_reason
+
+ENGINES = ["unittest", "direct", "interpreters"]
+"""Choices for the --engine option. unittest is used when --engine is not given."""
+
+module_counter = itertools.count(1)
+"""Makes the name of the module created for each Markdown file unique."""
+
+_testcase = phmutest.outputcheck.OutputChecker()
+
+
+class BlockPrinter(phmutest.printer.Printer):
+    """Printer that logs exception line numbers in the Markdown file.
+
+    The with statement line number is the FCB open fence line.
+    """
+
+    def __init__(
+        self,
+        log: phmutest.printer.Log,
+        location: str,
+        flags: int,
+        block: FencedBlock,
+        fileblocks: phmutest.select.FileBlocks,
+    ):
+        super().__init__(log, location, flags=flags, testfile_lineno=block.line)
+        self.fileblocks = fileblocks
+        self.filename = str(fileblocks.path)
+        self.end_line = block.end_line
+
+    def exception_lineno(self, exc_traceback: TracebackType) -> int:
+        """Return the Markdown line where the exception propagates out of the block.
+
+        Return the FCB close fence line when the expected output check raised it.
+        """
+        tb: Optional[TracebackType] = exc_traceback
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename == self.filename:
+                return tb.tb_lineno
+            tb = tb.tb_next
+        return self.end_line
+
+    def log_frames(self, exc_traceback: TracebackType) -> None:
+        """Add a FRAME log entry for each deeper frame in a block of the file.
+
+        The entry has the location of the block the frame is in, for example
+        a function defined by an earlier block.
+        """
+        is_deeper = False  # The first frame in the file is the block's own frame.
+        tb = exc_traceback
+        while tb.tb_next:
+            tb = tb.tb_next
+            if tb.tb_frame.f_code.co_filename != self.filename:
+                continue
+            if not is_deeper:
+                is_deeper = True
+                continue
+            for block in self.fileblocks.all_blocks:
+                if block.line < tb.tb_lineno < block.end_line:
+                    location = phmutest.subtest.make_location_string(
+                        block, self.fileblocks.built_from
+                    )
+                    frame = [location, FRAME, "", str(block.line), str(tb.tb_lineno)]
+                    self.log.append(frame)
+                    break
+
+
+def print_exception(title: str) -> None:
+    """Print the exception being handled to stderr like unittest does.
+
+    The traceback starts below the frame in this module.
+    """
+    exc_type, exc_value, exc_traceback = sys.exc_info()
+    tb = exc_traceback.tb_next if exc_traceback is not None else None
+    print("=" * 70, file=sys.stderr)
+    print(title, file=sys.stderr)
+    print("-" * 70, file=sys.stderr)
+    traceback.print_exception(exc_type, exc_value, tb, file=sys.stderr)
+
+
+def check_args(args: argparse.Namespace) -> None:
+    """Raise ValueError if an option is given that the engine doesn't use."""
+    engine = args.engine or "unittest"
+    if args.threads is not None and engine == "unittest":
+        raise ValueError(
+            "--threads can't be used with the unittest engine."
+            " Use --engine direct or --engine interpreters."
+        )
+    if args.block_methods and engine != "unittest":
+        raise ValueError(f"--block-methods can't be used with --engine {engine}.")
+
+
+def is_setup_or_teardown(block: FencedBlock) -> bool:
+    """Return True if the block has a setup or teardown directive."""
+    return block.has_directive(Marker.SETUP) or block.has_directive(Marker.TEARDOWN)
+
+
+@dataclass
+class FileRun:
+    """Log entries, error count, and captured printing of a file run on a thread."""
+
+    log: phmutest.printer.Log
+    errors: int
+    stdout: str
+    stderr: str
+    should_stop: bool = False  # failfast stopped the run
+
+
+class DirectRunner:
+    """Run the selected blocks of the Markdown files in order.
+
+    A block that fails or raises does not stop the later blocks
+    in the file unless failfast.
+    A setup block that fails or raises stops its file.
+    """
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        block_store: phmutest.select.BlockStore,
+        failfast: bool,
+    ) -> None:
+        self.args = args
+        self.block_store = block_store
+        self.failfast = failfast
+        self.flags = phmutest.subtest.printer_flags(args)
+        self.log: phmutest.printer.Log = []
+        self.errors = 0
+        """Counts errors and failures in setup and teardown like unittest does."""
+        self.should_stop = False
+        self.shared: Dict[str, Any] = {}
+        """Names from the fixture, setup across files, and share across files."""
+        self.fixture_scope: Optional[phmutest.fixturescope.FixtureScope] = None
+        self.shared_loop = bool(args.share_across_files or args.setup_across_files)
+        """Files use one event loop since shared names may be bound to it."""
+
+    def run_block(
+        self,
+        block: FencedBlock,
+        fileblocks: phmutest.select.FileBlocks,
+        namespace: Dict[str, Any],
+        suffix: str = "",
+        allow_await: bool = False,
+    ) -> str:
+        """Run block in namespace. Return pass, failed, error, or skip."""
+        location = phmutest.subtest.make_location_string(block, fileblocks.built_from)
+        location += suffix
+        reason = skip_reason(block)
+        if reason is not None:
+            self.log.append([location, "skip", reason])
+            if self.args.progress:
+                print(f"{location} ... skip   {reason}", file=sys.stderr)
+            return "skip"
+
+        filename = str(fileblocks.path)
+        # Like the generated testfile, allow a block indented as a whole.
+        source = "\n" * block.line + textwrap.dedent(block.contents)
+        flags = ast.PyCF_ALLOW_TOP_LEVEL_AWAIT if allow_await else 0
+        want = phmutest.subtest.expected_output(block)
+        printer = BlockPrinter(self.log, location, self.flags, block, fileblocks)
+        try:
+            with printer:
+                code = compile(source, filename, "exec", flags=flags)
+                if code.co_flags & inspect.CO_COROUTINE:
+                    phmutest.asyncrun.run(eval(code, namespace), shared=True)
+                else:
+                    exec(code, namespace)
+                if want is not None:
+                    printer.cancel_print_capture_on_error()
+                    _testcase.assertEqual(want, printer.stdout())
+        except AssertionError:
+            print_exception(f"FAIL: {location}")
+            return "failed"
+        except Exception:
+            print_exception(f"ERROR: {location}")
+            return "error"
+        return "pass"
+
+    def refresh_fixture(self, scope: str, namespace: Dict[str, Any]) -> bool:
+        """Call the fixture function again if its scope is scope. Return success."""
+        if self.fixture_scope is None:
+            return True
+        try:
+            fixture = self.fixture_scope.call_again(scope)
+        except Exception:
+            print_exception(f"ERROR: --fixture {self.args.fixture}")
+            self.errors += 1
+            return False
+        if fixture is not None and fixture.globs is not None:
+            namespace.update(fixture.globs)
+            self.shared.update(fixture.globs)
+        return True
+
+    def run_setup_or_teardown(
+        self,
+        blocks: List[FencedBlock],
+        fileblocks: phmutest.select.FileBlocks,
+        namespace: Dict[str, Any],
+        suffix: str,
+    ) -> bool:
+        """Run setup or teardown blocks until one fails or raises. Return success."""
+        for block in blocks:
+            result = self.run_block(block, fileblocks, namespace, suffix)
+            if result in ("failed", "error"):
+                self.errors += 1
+                if self.failfast:
+                    self.should_stop = True
+                return False
+        return True
+
+    def run_code_blocks(
+        self,
+        fileblocks: phmutest.select.FileBlocks,
+        namespace: Dict[str, Any],
+    ) -> None:
+        """Run the blocks that are not setup or teardown blocks."""
+        for block in fileblocks.selected:
+            if self.should_stop:
+                break
+            if is_setup_or_teardown(block):
+                continue
+            if not self.refresh_fixture(phmutest.fixturescope.BLOCK, namespace):
+                break
+            allow_await = block.has_directive(Marker.ASYNC)
+            result = self.run_block(block, fileblocks, namespace, "", allow_await)
+            if result == "error":
+                self.errors += 1
+            if result in ("failed", "error") and self.failfast:
+                self.should_stop = True
+
+    def run_file(self, path: Path) -> None:
+        """Run the blocks of a Markdown file in a new module namespace."""
+        fileblocks = self.block_store.get_blocks(path)
+        if not fileblocks.selected:
+            self.log.append([fileblocks.built_from, "noblocks", ""])
+            return
+        module = types.ModuleType(f"_phm_direct{next(module_counter)}")
+        module.__file__ = str(path)
+        namespace = module.__dict__
+        namespace.update(self.shared)
+        sys.modules[module.__name__] = module
+        try:
+            self.run_file_blocks(path, fileblocks, namespace)
+        finally:
+            sys.modules.pop(module.__name__, None)
+            if not self.shared_loop:
+                phmutest.asyncrun.close_shared_loop()
+
+    def run_file_blocks(
+        self,
+        path: Path,
+        fileblocks: phmutest.select.FileBlocks,
+        namespace: Dict[str, Any],
+    ) -> None:
+        """Run setup, code, and teardown blocks. Share the names if requested."""
+        # Setup and teardown blocks of --setup-across-files files run once
+        # for all the files.
+        is_across = path in self.args.setup_across_files
+        setup_blocks = [b for b in fileblocks.selected if b.has_directive(Marker.SETUP)]
+        teardown_blocks = [
+            b for b in fileblocks.selected if b.has_directive(Marker.TEARDOWN)
+        ]
+        before_setup = set(namespace)
+        if not is_across and not self.run_setup_or_teardown(
+            setup_blocks, fileblocks, namespace, phmutest.subtest.SETUP_SUFFIX
+        ):
+            return
+        setup_names = set(namespace) - before_setup
+        before_code = dict(namespace)
+        if self.refresh_fixture(phmutest.fixturescope.FILE, namespace):
+            self.run_code_blocks(fileblocks, namespace)
+        if not is_across:
+            self.run_setup_or_teardown(
+                teardown_blocks, fileblocks, namespace, phmutest.subtest.TEARDOWN_SUFFIX
+            )
+
+        # Like the generated testfile, names assigned by setup blocks are not shared.
+        if path in self.args.share_across_files:
+            names = [
+                name
+                for name, value in namespace.items()
+                if name not in setup_names
+                and (name not in before_code or before_code[name] is not value)
+            ]
+            self.shared.update((name, namespace[name]) for name in names)
+            if phmutest.cases.is_verbose_sharing(self.args, path):
+                shared_names = ", ".join(names)
+                print(f"{fileblocks.built_from} is sharing: {shared_names}")
+
+    def set_up_module(self) -> bool:
+        """Call the fixture and run --setup-across-files setup blocks."""
+        args = self.args
+        if args.fixture:
+            function = phmutest.importer.fixture_function_importer(str(args.fixture))
+            self.fixture_scope = phmutest.fixturescope.FixtureScope(
+                str(args.fixture), function
+            )
+            try:
+                fixture = self.fixture_scope.setup(log=self.log)
+            except Exception:
+                print_exception(f"ERROR: --fixture {args.fixture}")
+                self.errors += 1
+                return False
+            if fixture is not None and fixture.globs is not None:
+                self.shared.update(fixture.globs)
+        for path in args.setup_across_files:
+            fileblocks = self.block_store.get_blocks(path)
+            blocks = [b for b in fileblocks.selected if b.has_directive(Marker.SETUP)]
+            if not self.run_setup_or_teardown(
+                blocks, fileblocks, self.shared, phmutest.subtest.SETUP_SUFFIX
+            ):
+                return False
+        return True
+
+    def tear_down_module(self) -> None:
+        """Run --setup-across-files teardown blocks."""
+        for path in self.args.setup_across_files:
+            fileblocks = self.block_store.get_blocks(path)
+            blocks = [
+                b for b in fileblocks.selected if b.has_directive(Marker.TEARDOWN)
+            ]
+            self.run_setup_or_teardown(
+                blocks, fileblocks, self.shared, phmutest.subtest.TEARDOWN_SUFFIX
+            )
+
+    def first_on_threads(self) -> int:
+        """Return index of the first file that may run on a thread.
+
+        Return the number of files if the files run one after another.
+        Files get names from the --share-across-files files before them so
+        those files run first. Per block --profile and --trace-memory
+        measurements can't tell threads apart. A --fixture with file or
+        block scope is called again and cleaned up between blocks.
+        """
+        args = self.args
+        if not args.threads or args.threads < 2 or args.profile or args.trace_memory:
+            return len(args.files)
+        if self.fixture_scope is not None:
+            if self.fixture_scope.scope != phmutest.fixturescope.SESSION:
+                return len(args.files)
+        first = 0
+        for index, path in enumerate(args.files):
+            if path in args.share_across_files:
+                first = index + 1
+        return first
+
+    def is_independent(self, path: Path) -> bool:
+        """Return True if the file can run on a pool thread.
+
+        When names are shared across files async blocks run on the event
+        loop of the main thread since shared names may be bound to it.
+        """
+        if not self.shared_loop:
+            return True
+        return not phmutest.cases.has_async_blocks(self.block_store.get_blocks(path))
+
+    def run_files_on_threads(self, paths: List[Path]) -> None:
+        """Run the independent files on a thread pool and the others on this thread.
+
+        The log entries and printing of each file are added in file order.
+        With failfast the files after the first file that stopped are left out.
+        """
+        on_threads = [path for path in paths if self.is_independent(path)]
+        with concurrent.futures.ThreadPoolExecutor(self.args.threads) as executor:
+            futures = {
+                path: executor.submit(self.run_file_alone, path) for path in on_threads
+            }
+            for path in paths:
+                future = futures.get(path)
+                if future is not None:
+                    file_run = future.result()
+                else:
+                    file_run = self.run_file_alone(path)
+                stream = phmutest.printer.Printer.stream
+                if stream is not None:
+                    stream.catch_up(self.log)
+                self.log.extend(file_run.log)
+                if stream is not None:
+                    stream.skip_written(self.log)
+                self.errors += file_run.errors
+                print(file_run.stdout, end="")
+                print(file_run.stderr, end="", file=sys.stderr)
+                if file_run.should_stop:
+                    for pending in futures.values():
+                        _ = pending.cancel()
+                    break
+
+    def run_file_alone(self, path: Path) -> FileRun:
+        """Run the file with its own log and error count. Capture its printing.
+
+        The file is not run when failfast already stopped the run.
+        """
+        runner = DirectRunner(self.args, self.block_store, self.failfast)
+        runner.shared = self.shared
+        runner.fixture_scope = self.fixture_scope
+        stdout, stderr = io.StringIO(), io.StringIO()
+        if not self.should_stop:
+            with phmutest.capture.redirect(stdout, stderr):
+                runner.run_file(path)
+            if phmutest.printer.Printer.stream is not None:
+                # Write the skipped blocks logged after the last code block ran.
+                phmutest.printer.Printer.stream.finish(runner.log)
+        if runner.should_stop:
+            self.should_stop = True
+        return FileRun(
+            runner.log,
+            runner.errors,
+            stdout.getvalue(),
+            stderr.getvalue(),
+            runner.should_stop,
+        )
+
+    def run(self) -> None:
+        """Run all the files. Do the module cleanups like unittest does."""
+        args = self.args
+        has_module_fixture = bool(
+            args.setup_across_files or args.share_across_files or args.fixture
+        )
+        if has_module_fixture:
+            self.log.append(["setUpModule", "", ""])
+        try:
+            if not self.set_up_module():
+                return
+            first = self.first_on_threads()
+            for path in args.files[:first]:
+                if self.should_stop:
+                    break
+                self.run_file(path)
+            if first < len(args.files):
+                with phmutest.capture.installed():
+                    self.run_files_on_threads(args.files[first:])
+            if has_module_fixture:
+                self.log.append(["tearDownModule", "", ""])
+            self.tear_down_module()
+        finally:
+            unittest.case.doModuleCleanups()
+            phmutest.asyncrun.close_shared_loop()
+
+
+def run_direct(
+    settings: phmutest.config.Settings,
+    block_store: phmutest.select.BlockStore,
+) -> phmutest.summary.PhmResult:
+    """Run the Python code blocks of the Markdown files with exec()."""
+    args = settings.args  # rename
+    failfast = bool({"-f", "--failfast"} & set(settings.extra_args))
+    runner = DirectRunner(args, block_store, failfast)
+    runner.run()
+    if phmutest.printer.Printer.stream is not None:
+        # Write the skipped blocks logged after the last code block ran.
+        phmutest.printer.Printer.stream.catch_up(runner.log)
+    metrics = phmutest.summary.compute_metrics(
+        num_files=len(args.files),
+        suite_errors=runner.errors,
+        num_deselected=-1,  # fill in later in main:generate_and_run
+        log=runner.log,
+    )
+    return phmutest.summary.PhmResult(
+        test_program=None,
+        is_success=(metrics.failed == 0) and (runner.errors == 0),
+        metrics=metrics,
+        log=runner.log,
+    )
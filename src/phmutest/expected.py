@@ -0,0 +1,94 @@
+"""Load expected output that the generated testfile refers to by location.
+
+Expected output longer than INLINE_LIMIT characters is not written into
+the generated testfile as a string literal. The testfile calls
+expected_output() with the Markdown file and the output block line instead.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import phmutest.fillin
+import phmutest.reader
+import phmutest.select
+
+INLINE_LIMIT = 4096
+"""Longest expected output in characters written into the testfile."""
+
+block_store: Optional[phmutest.select.BlockStore] = None
+"""Blocks read by the current run. None when running a --generate testfile."""
+
+_stored_fcbs: Dict[str, Dict[int, str]] = {}
+"""FCB contents by open fence line for each file looked up in _stored_from."""
+
+_stored_from: Optional[phmutest.select.BlockStore] = None
+"""The block_store that _stored_fcbs was made from."""
+
+MARKDOWN_FILES = 32
+"""Most Markdown files kept in _markdown_fcbs. The first read is removed."""
+
+_markdown_fcbs: Dict[str, Tuple[int, Dict[int, str]]] = {}
+"""Modification time and FCB contents by open fence line for each file read."""
+
+
+def is_referenced(output: str) -> bool:
+    """Return True if the testfile refers to the expected output by location."""
+    return len(output) > INLINE_LIMIT
+
+
+def expected_output(built_from: str, line: int) -> str:
+    """Return the expected output of the output block whose open fence is at line.
+
+    The output is looked up in the block_store of the current run.
+    Otherwise the Markdown file built_from is read. The text is the same
+    as the string literal that would have been written into the testfile.
+    """
+    contents = stored_contents(built_from, line)
+    if contents is None:
+        contents = read_contents(built_from, line)
+    return phmutest.fillin.chop_final_newline(contents) + "\n"
+
+
+def stored_contents(built_from: str, line: int) -> Optional[str]:
+    """Contents of the FCB at line from the block_store. None if not there.
+
+    The FCB contents of a file are put in a dict the first time it is looked up.
+    """
+    global _stored_from
+    if block_store is None:
+        return None
+    if _stored_from is not block_store:
+        _stored_fcbs.clear()
+        _stored_from = block_store
+    if built_from not in _stored_fcbs:
+        try:
+            fileblocks = block_store.get_blocks(Path(built_from))
+        except KeyError:
+            return None
+        _stored_fcbs[built_from] = {b.line: b.contents for b in fileblocks.all_blocks}
+    return _stored_fcbs[built_from].get(line)
+
+
+def read_contents(built_from: str, line: int) -> str:
+    """Contents of the FCB at line read from the Markdown file built_from.
+
+    built_from is relative to the current directory. A file's FCBs are kept
+    for the other output blocks that refer to it. The file is read again
+    when its modification time changes.
+    """
+    mtime = Path(built_from).stat().st_mtime_ns
+    kept = _markdown_fcbs.get(built_from)
+    if kept is None or kept[0] != mtime:
+        _ = _markdown_fcbs.pop(built_from, None)
+        if len(_markdown_fcbs) >= MARKDOWN_FILES:
+            del _markdown_fcbs[next(iter(_markdown_fcbs))]
+        nodes = phmutest.reader.fcb_nodes(built_from)
+        kept = (mtime, {node.line: node.payload for node in nodes})
+        _markdown_fcbs[built_from] = kept
+    contents = kept[1].get(line)
+    if contents is None:
+        raise ValueError(
+            f"phmutest- {built_from}:{line} is not a fenced code block."
+            " Was the Markdown file changed after the testfile was generated?"
+        )
+    return contents
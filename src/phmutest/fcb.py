@@ -1,9 +1,11 @@
 """Print breakage in broken FCBs."""
 
+import array
 import ast
+import bisect
 import re
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import phmutest.select
 import phmutest.syntax
@@ -47,20 +49,73 @@ class FcbLineMap:
     # FCB line that was rendered at that testfile line.
     # The map entry for an expected output check will return an FCB
     # code_line = 0.
+
+    The map is stored as ranges of testfile lines in parallel arrays
+    sorted by the first testfile line of the range. Each FCB is one range
+    so the memory used grows with the number of FCBs, not the number of lines.
+    A range with length 0 is the single testfile line of an expected output check.
+    Markdown filenames are stored once and referred to by file id.
     """
 
     def __init__(self, block_store: phmutest.select.BlockStore) -> None:
         self.block_store = block_store
-        self.map: Dict[int, FcbCodeLine] = {}
+        self.starts = array.array("l")
+        """Testfile line number of the first line of each range."""
+        self.lengths = array.array("l")
+        self.file_ids = array.array("l")
+        self.open_fences = array.array("l")
+        self.filenames: List[str] = []
+        """Markdown filename for each file id."""
+        self.file_id_lookup: Dict[str, int] = {}
 
     def get(self, testfile_lineno: int) -> FcbCodeLine:
         """Return Markdown information for testfile line number."""
-        return self.map.get(testfile_lineno, FcbCodeLine("", 0, 0))
+        index = bisect.bisect_right(self.starts, testfile_lineno) - 1
+        if index >= 0:
+            offset = testfile_lineno - self.starts[index]
+            length = self.lengths[index]
+            if offset < max(length, 1):
+                open_fence = self.open_fences[index]
+                code_line = open_fence + 1 + offset if length else 0
+                return FcbCodeLine(
+                    built_from=self.filenames[self.file_ids[index]],
+                    open_fence=open_fence,
+                    code_line=code_line,
+                )
+        return FcbCodeLine("", 0, 0)
+
+    def ranges(self) -> List[Tuple[int, int, str, int]]:
+        """Return the (testfile_start, length, built_from, open_fence) ranges."""
+        return [
+            (start, length, self.filenames[file_id], open_fence)
+            for start, length, file_id, open_fence in zip(
+                self.starts, self.lengths, self.file_ids, self.open_fences
+            )
+        ]
+
+    def add_range(
+        self, testfile_start: int, length: int, built_from: str, open_fence: int
+    ) -> None:
+        """Insert a range keeping the ranges sorted by testfile_start."""
+        file_id = self.file_id_lookup.get(built_from)
+        if file_id is None:
+            file_id = len(self.filenames)
+            self.filenames.append(built_from)
+            self.file_id_lookup[built_from] = file_id
+        # The testfile is numbered top to bottom so ranges are usually appended.
+        if not self.starts or testfile_start > self.starts[-1]:
+            index = len(self.starts)
+        else:
+            index = bisect.bisect_left(self.starts, testfile_start)
+        self.starts.insert(index, testfile_start)
+        self.lengths.insert(index, length)
+        self.file_ids.insert(index, file_id)
+        self.open_fences.insert(index, open_fence)
 
     def add_fcb(
         self, built_from: str, open_fence: int, testfile_with_statement: int
     ) -> None:
-        """Add one line to the map for each line in the FCB.
+        """Add a range for the lines in the FCB.
 
         open_fence is the Markdown file line number of the FCB opening fence.
         testfile_with_statement is the generated testfile line number of the
@@ -70,15 +125,9 @@ class FcbLineMap:
             built_from=built_from, line=open_fence
         )
         if fcb_line_count:
-            fcb_line = open_fence + 1
-            testfile_line = testfile_with_statement + 1
-            for lineno in range(fcb_line, fcb_line + fcb_line_count):
-                self.map[testfile_line] = FcbCodeLine(
-                    built_from=built_from,
-                    open_fence=open_fence,
-                    code_line=lineno,
-                )
-                testfile_line += 1
+            self.add_range(
+                testfile_with_statement + 1, fcb_line_count, built_from, open_fence
+            )
 
     def add_expected_output_check(
         self, built_from: str, open_fence: int, testfile_lineno: int
@@ -86,11 +135,7 @@ class FcbLineMap:
         """Add one line for exception raised by expected output check."""
         # Note that the expected output check comes after the rendered FCB so
         # there is no code_line.
-        self.map[testfile_lineno] = FcbCodeLine(
-            built_from=built_from,
-            open_fence=open_fence,
-            code_line=0,
-        )
+        self.add_range(testfile_lineno, 0, built_from, open_fence)
 
 
 def show_broken_fcbs(
@@ -188,15 +233,26 @@ def make_markdown_map(
     testfile_lines: List[str], block_store: phmutest.select.BlockStore
 ) -> FcbLineMap:
     """Map testfile line number(s) to the rendered Markdown FCB."""
+    markdown_map = FcbLineMap(block_store)
+    add_testfile_lines(markdown_map, testfile_lines, first_lineno=1)
+    return markdown_map
+
+
+def add_testfile_lines(
+    markdown_map: FcbLineMap, testfile_lines: List[str], first_lineno: int
+) -> None:
+    """Add the FCBs rendered in testfile_lines to the markdown_map.
+
+    first_lineno is the testfile line number of the first line.
+    """
     # Create a map to lookup the markdown information for a given testfile line number.
     # The lookup typically happens when a line for the testfile appears in a
     # exception traceback frame.
     location_pattern = r"^\s*with _phmPrinter[(]_phm_log," r' "(?P<location>.*?)",'
-    markdown_map = FcbLineMap(block_store)
     location = ""
     built_from = ""
     open_fence = 0
-    for testfile_lineno, line in enumerate(testfile_lines, start=1):
+    for testfile_lineno, line in enumerate(testfile_lines, start=first_lineno):
         if "with _phmPrinter(" in line:
             # Add lines for an FCB to the markdown map.
             # Get the Markdown FCB location from the "with _phmPrinter(" line.
@@ -222,7 +278,6 @@ def make_markdown_map(
                 testfile_lineno=testfile_lineno,
             )
             location = ""  # done until next with _phmPrinter line
-    return markdown_map
 
 
 def find_end_of_statement(
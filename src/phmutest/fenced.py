@@ -66,6 +66,18 @@ class Role(Enum):
 class FencedBlock:
     """Markdown fenced code block, test role, and its HTML comment directives."""
 
+    __slots__ = (
+        "info_string",
+        "line",
+        "end_line",
+        "role",
+        "contents",
+        "output",
+        "skip_patterns",
+        "directives",
+        "_directive_markers",
+    )
+
     def __init__(self, node: phmutest.reader.DocNode) -> None:
         """Initialize from document fenced code block node."""
         self.info_string = node.info_string
@@ -41,10 +41,30 @@ class Fixture:
         Fixture function writer supplies this function to release resources acquired
         by the fixture function. This function is called after the final doctest
         completes or if the code running doctests raises an unhandled exception.
+
+    scope
+        One of the strings "session", "file", or "block".
+        "session" calls the fixture function once per run.
+        "file" calls the fixture function again before each Markdown file
+        after the first. "block" calls it again before each Python code block
+        after the first. In --replmode "block" is the same as "file".
+        Before calling it again, the cleanup functions registered by
+        unittest.addModuleCleanup() or repl_cleanup are called.
+        The returned globs replace the values of the globals.
+
+    reuse
+        Ignored unless scope is "session".
+        When True the Fixture is kept and the fixture function is not called
+        by later runs in the same Python process with the same --fixture.
+        The unittest.addModuleCleanup() cleanups it adds are called when
+        Python exits instead of at the end of the first run.
+        In --replmode repl_cleanup is called when Python exits.
     """
 
     globs: Optional[MutableMapping[str, object]] = None
     repl_cleanup: Optional[Callable[..., None]] = None
+    scope: str = "session"
+    reuse: bool = False
 
 
 FixtureFunction = Callable[..., Optional[Fixture]]
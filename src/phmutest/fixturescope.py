@@ -0,0 +1,185 @@
+"""Call the --fixture function again for each file or block as set by its scope."""
+
+import atexit
+import re
+import traceback
+import unittest
+from typing import Any, Dict, List, Optional, Tuple
+
+import phmutest.globs
+from phmutest.fixture import Fixture, FixtureFunction
+
+SESSION = "session"
+FILE = "file"
+BLOCK = "block"
+SCOPES = [SESSION, FILE, BLOCK]
+
+reused: Dict[str, Fixture] = {}
+"""Fixtures with reuse=True keyed by the --fixture dotted path."""
+
+attached: Optional[Tuple[List[List[str]], "FixtureScope"]] = None
+"""Generated testfile log and the FixtureScope called before its code blocks."""
+
+
+def call_fixture(
+    dotted_path: str,
+    function: FixtureFunction,
+    log: List[List[str]],
+    is_replmode: bool,
+) -> Optional[Fixture]:
+    """Call the fixture function unless an earlier run kept its Fixture."""
+    if dotted_path in reused:
+        log.append([dotted_path, "", "reused"])
+        return reused[dotted_path]
+    module_cleanups = len(registered_module_cleanups())
+    fixture = function(log=log, is_replmode=is_replmode)
+    if fixture is not None:
+        if fixture.scope not in SCOPES:
+            raise ValueError(
+                f"--fixture {dotted_path} scope must be one of {', '.join(SCOPES)}."
+            )
+        if fixture.reuse and fixture.scope == SESSION:
+            reused[dotted_path] = fixture
+            defer_module_cleanups(module_cleanups)
+            if is_replmode and fixture.repl_cleanup is not None:
+                atexit.register(fixture.repl_cleanup)
+    return fixture
+
+
+def registered_module_cleanups() -> List[Tuple[Any, Any, Any]]:
+    """The unittest list of (function, args, kwargs) added by addModuleCleanup()."""
+    cleanups: List[Tuple[Any, Any, Any]] = getattr(unittest.case, "_module_cleanups")
+    return cleanups
+
+
+def defer_module_cleanups(start: int) -> None:
+    """Run the module cleanups added after index start when Python exits.
+
+    They release the resources of a reused fixture. Otherwise unittest
+    would run them at the end of the first run.
+    """
+    cleanups = registered_module_cleanups()
+    deferred = cleanups[start:]
+    del cleanups[start:]
+    if deferred:
+        atexit.register(run_cleanups, deferred)
+
+
+def run_cleanups(cleanups: List[Tuple[Any, Any, Any]]) -> None:
+    """Call the cleanup functions last in first out. Print exceptions they raise."""
+    for function, args, kwargs in reversed(cleanups):
+        try:
+            function(*args, **kwargs)
+        except Exception:
+            traceback.print_exc()
+
+
+def enter_location(log: List[List[str]], location: str) -> None:
+    """Call the fixture function again before the code block at location.
+
+    Called by the Printer of each block of a generated testfile. Does
+    nothing unless the attached FixtureScope has file or block scope and
+    log is the log of its testfile.
+    """
+    if attached is None or attached[0] is not log:
+        return
+    attached[1].enter_location(location)
+
+
+def is_reused(dotted_path: str) -> bool:
+    """Return True if the fixture is kept for later runs."""
+    return dotted_path in reused
+
+
+class FixtureScope:
+    """Call the fixture function at the start of each file or block.
+
+    The generated testfile calls setup() in setUpModule(). When the scope
+    is not session the Printer of each code block calls enter_location().
+    """
+
+    def __init__(self, dotted_path: str, function: FixtureFunction) -> None:
+        self.dotted_path = dotted_path
+        self.function = function
+        self.fixture: Optional[Fixture] = None
+        self.scope = SESSION
+        self.log: List[List[str]] = []
+        self.is_fresh = False
+        """True until the Fixture from the last call is used by a file or block."""
+        self.module_globals: Optional[phmutest.globs.Globals] = None
+        self.built_from = ""
+        """Markdown file of the last code block entered."""
+
+    def setup(
+        self,
+        log: List[List[str]],
+        module_globals: Optional[phmutest.globs.Globals] = None,
+    ) -> Optional[Fixture]:
+        """First call of the fixture function. Return the Fixture.
+
+        A generated testfile passes its module_globals. They are set
+        by the calls before each file or block.
+        """
+        self.log = log
+        self.fixture = call_fixture(
+            self.dotted_path, self.function, log, is_replmode=False
+        )
+        if self.fixture is not None:
+            self.scope = self.fixture.scope
+        self.is_fresh = True
+        self.built_from = ""
+        if module_globals is not None:
+            self.attach(log, module_globals)
+        return self.fixture
+
+    def attach(
+        self, log: List[List[str]], module_globals: phmutest.globs.Globals
+    ) -> None:
+        """Call the fixture before the code blocks of the testfile that has log."""
+        global attached
+        self.module_globals = module_globals
+        if self.scope != SESSION:
+            attached = (log, self)
+
+    def call_again(self, scope: str) -> Optional[Fixture]:
+        """Call the fixture function again if its scope is scope. Return the Fixture.
+
+        Do the module cleanups registered by the last call first.
+        Return None if the function is not called.
+        """
+        if self.scope != scope:
+            return None
+        if self.is_fresh:
+            self.is_fresh = False
+            return None
+        unittest.case.doModuleCleanups()
+        self.fixture = self.function(log=self.log, is_replmode=False)
+        return self.fixture
+
+    def enter_location(self, location: str) -> None:
+        """Call the fixture function again for the code block at location.
+
+        Setup and teardown block locations, which end with the
+        phmutest.subtest SETUP_SUFFIX and TEARDOWN_SUFFIX, are ignored.
+        """
+        assert self.module_globals is not None, "sanity check"
+        if location.endswith((" setup", " teardown")):
+            return
+        match = re.match(r"(.*):\d+", location)
+        built_from = match.group(1) if match else location
+        if built_from != self.built_from:
+            self.built_from = built_from
+            self.enter(FILE, self.module_globals)
+        self.enter(BLOCK, self.module_globals)
+
+    def enter(self, scope: str, module_globals: phmutest.globs.Globals) -> None:
+        """Call the fixture function again if its scope is scope.
+
+        Set the module globals to the new globs.
+        """
+        fixture = self.call_again(scope)
+        if fixture is not None and fixture.globs is not None:
+            for name, value in fixture.globs.items():
+                module_globals.check_attribute_name(name)
+                setattr(module_globals.m, name, value)
+                module_globals.global_names.add(name)
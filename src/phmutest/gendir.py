@@ -0,0 +1,139 @@
+"""Write the generated testfile as one module for each Markdown file."""
+
+import argparse
+import re
+from pathlib import Path
+from typing import Dict, List
+
+import phmutest.cases
+import phmutest.fillin
+import phmutest.select
+
+SHARED_MODULE = "_phm_shared"
+"""Module with setUpModule() and tearDownModule() called by each test module."""
+
+GENERATED_DOCSTRING = phmutest.cases.testfile_form.splitlines()[0]
+"""First line of each generated module. Identifies modules left by an earlier run."""
+
+# The shared module has the --fixture function and the module fixtures
+# with the --setup-across-files setup and teardown blocks. The names they
+# add are globals of the shared module. Each test module calls the shared
+# setUpModule() and copies the names to its own globals.
+split_setup_module_form = """\
+def setUpModule():
+
+    global _phm_globals
+    _phm_shared.setUpModule()
+    _phm_globals = _phmGlobals(__name__)
+    _phm_globals.update(additions=_phm_shared._phm_globals.copy())
+"""
+
+split_teardown_module_form = """\
+def tearDownModule():
+    _phm_globals.clear()
+    _phm_shared.tearDownModule()
+"""
+
+
+def module_name(built_from: str) -> str:
+    """Name of the test module generated from the Markdown file built_from."""
+    stem = Path(built_from).with_suffix("").as_posix()
+    return "test_" + re.sub(r"\W", "_", stem.strip("./"))
+
+
+def has_shared_module(args: argparse.Namespace) -> bool:
+    """Return True if the test modules need the shared module."""
+    return bool(args.setup_across_files or args.fixture)
+
+
+def shared_module(
+    args: argparse.Namespace, block_store: phmutest.select.BlockStore
+) -> str:
+    """Generate the shared module."""
+    replacements = phmutest.cases.testfile_replacements(args, block_store)
+    replacements.pop("importasyncrun", None)
+    text = phmutest.fillin.fill_in(phmutest.cases.testfile_form, replacements)
+    return "\n".join(phmutest.cases.number_lines(text, first_lineno=1))
+
+
+def module_replacements(
+    args: argparse.Namespace, fileblocks: phmutest.select.FileBlocks
+) -> Dict[str, str]:
+    """Replacements for the testfile_form keys other than $testclasses."""
+    replacements = {}
+    if phmutest.cases.has_async_blocks(fileblocks):
+        replacements["importasyncrun"] = phmutest.cases.IMPORT_ASYNCRUN
+    if phmutest.cases.has_referenced_outputs(fileblocks):
+        replacements["importexpected"] = phmutest.cases.IMPORT_EXPECTED
+    if has_shared_module(args):
+        replacements["importimporter"] = f"import {SHARED_MODULE} as _phm_shared"
+        setup_module = split_setup_module_form
+        if args.fixture:
+            replacements["importfunction"] = (
+                "_phm_fixture_scope = _phm_shared._phm_fixture_scope"
+            )
+            setup_module += "    _phm_fixture_scope.attach(_phm_log, _phm_globals)\n"
+        replacements["setupmodule"] = "\n\n" + setup_module.rstrip()
+        replacements["teardownmodule"] = "\n\n" + split_teardown_module_form.rstrip()
+    return replacements
+
+
+def render_module(
+    args: argparse.Namespace, block_store: phmutest.select.BlockStore, path: Path
+) -> str:
+    """Generate the test module for the Markdown file at path.
+
+    The module does not depend on the other files so its text changes
+    only when its Markdown file or the command line changes.
+    """
+    fileblocks = block_store.get_blocks(path)
+    replacements = module_replacements(args, fileblocks)
+    test_class = phmutest.cases.markdown_file(args, block_store, path, 1)
+    replacements["testclasses"] = "\n\n" + test_class + "\n"
+    text = phmutest.fillin.fill_in(phmutest.cases.testfile_form, replacements)
+    return "\n".join(phmutest.cases.number_lines(text, first_lineno=1))
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """Write text to path unless the file already has text. Return True if written."""
+    if path.exists() and path.read_text(encoding="utf-8") == text:
+        return False
+    _ = path.write_text(text, encoding="utf-8")
+    return True
+
+
+def is_generated(path: Path) -> bool:
+    """Return True if the file is a module generated by phmutest."""
+    with open(path, encoding="utf-8") as f:
+        return f.readline().rstrip("\n") == GENERATED_DOCSTRING
+
+
+def write_modules(
+    args: argparse.Namespace, block_store: phmutest.select.BlockStore
+) -> List[Path]:
+    """Write a test module for each Markdown file to --generate-dir. Return written.
+
+    Modules whose text did not change are not written. Modules generated
+    by an earlier run for files that are no longer tested are removed.
+    """
+    if args.share_across_files:
+        raise ValueError("--generate-dir can't be used with --share-across-files.")
+    if args.replmode:
+        raise ValueError("--generate-dir can't be used with --replmode.")
+    directory: Path = args.generate_dir
+    directory.mkdir(parents=True, exist_ok=True)
+    modules: Dict[Path, str] = {}
+    if has_shared_module(args):
+        modules[directory / (SHARED_MODULE + ".py")] = shared_module(args, block_store)
+    for path in args.files:
+        built_from = block_store.get_blocks(path).built_from
+        module_path = directory / (module_name(built_from) + ".py")
+        if module_path in modules:
+            raise ValueError(f"{built_from} and another file generate {module_path}.")
+        modules[module_path] = render_module(args, block_store, path)
+
+    written = [p for p, text in modules.items() if write_if_changed(p, text + "\n")]
+    for stale in directory.glob("*.py"):
+        if stale not in modules and is_generated(stale):
+            stale.unlink()
+    return written
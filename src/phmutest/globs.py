@@ -141,6 +141,34 @@ class Globals:
         self.check_integrity(existing_names=existing_names)
         self.show_global_names(built_from)
 
+    def update_assigned(
+        self,
+        names: List[str],
+        built_from: str = "",
+        existing_names: Optional[Set[str]] = None,
+    ) -> None:
+        """Keep track of module globals assigned by a --block-methods test method.
+
+        The test method declares the names global so they are already
+        module attributes. Names that were module attributes when this
+        instance was created and existing_names are left alone.
+        A name the method deleted is no longer kept track of.
+        """
+        added_names = []
+        for name in names:
+            if name in self.original_attributes:
+                continue
+            if existing_names is not None and name in existing_names:
+                continue
+            if hasattr(self.m, name):
+                self.global_names.add(name)
+                added_names.append(name)
+            else:
+                self.global_names.discard(name)
+        self.print_sharing(built_from, ", ".join(added_names))
+        self.check_integrity(existing_names=existing_names)
+        self.show_global_names(built_from)
+
     def make_location(self, built_from: str) -> str:
         """Optionally append filename to the sharing debug message prefix."""
         if built_from:
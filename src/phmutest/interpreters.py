@@ -0,0 +1,236 @@
+"""Run the Python FCBs of each Markdown file in its own subinterpreter.
+
+Selected by --engine interpreters on Python 3.14 and later. A file's blocks
+run with exec() as in --engine direct, but in a new isolated subinterpreter
+that has its own GIL. Nothing a file does to modules or globals is seen by
+the other files. Up to --threads subinterpreters run at once on a thread pool.
+A subinterpreter is not reused for a later file. It would still have the
+modules and changes made by the earlier file.
+The file's blocks and the args are pickled and passed in. The log entries
+and the printing come back through a cross-interpreter queue.
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+import phmutest.config
+import phmutest.engine
+import phmutest.outputcheck
+import phmutest.printer
+import phmutest.select
+import phmutest.summary
+from phmutest.engine import FileRun
+
+if sys.version_info >= (3, 14):
+    from concurrent import interpreters
+
+NEEDS_PYTHON = "--engine interpreters needs Python 3.14 or later."
+
+SCRIPT = """\
+import sys
+sys.path[:] = paths.split("\\0")
+import phmutest.interpreters
+phmutest.interpreters.run_request(request, results)
+"""
+"""Runs in the subinterpreter. paths, request, and results are set in __main__."""
+
+MODULE_FIXTURE = ["setUpModule", "tearDownModule"]
+"""Each subinterpreter logs these. They are logged once for the run."""
+
+
+class Interpreter:
+    """An isolated subinterpreter and a queue for the results it sends back.
+
+    Uses the concurrent.interpreters module added in Python 3.14.
+    """
+
+    def __init__(self) -> None:
+        if sys.version_info >= (3, 14):
+            self.interp = interpreters.create()
+            self.results = interpreters.create_queue()
+        else:
+            raise ValueError(NEEDS_PYTHON)
+
+    def run(self, script: str, **names: Any) -> Optional[str]:
+        """Run script with names set in __main__. Return traceback if it raised."""
+        if sys.version_info >= (3, 14):
+            self.interp.prepare_main(results=self.results, **names)
+            try:
+                self.interp.exec(script)
+            except interpreters.ExecutionFailed as exc:
+                return str(exc)
+        return None
+
+    def get(self) -> str:
+        """Return the text the script put on the results queue."""
+        text = ""
+        if sys.version_info >= (3, 14):
+            text = str(self.results.get())
+        return text
+
+    def close(self) -> None:
+        """Destroy the subinterpreter and the queue."""
+        if sys.version_info >= (3, 14):
+            self.interp.close()
+
+
+def put_result(results: Any, text: str) -> None:
+    """Put text on the results queue. Called in the subinterpreter."""
+    if sys.version_info >= (3, 14):
+        results.put(text)
+
+
+def check_args(args: argparse.Namespace) -> None:
+    """Raise ValueError if --engine interpreters can't be used."""
+    if sys.version_info < (3, 14):
+        raise ValueError(NEEDS_PYTHON)
+    if args.share_across_files:
+        raise ValueError(
+            "--engine interpreters can't be used with --share-across-files."
+        )
+
+
+def make_request(
+    args: argparse.Namespace,
+    block_store: phmutest.select.BlockStore,
+    path: Path,
+    failfast: bool,
+) -> bytes:
+    """Pickle what the subinterpreter needs to run the file at path.
+
+    Open files, --profile, --trace-memory, and --full-diff are left out.
+    The subinterpreter can't write to them or load _tracemalloc.
+    """
+    file_args = argparse.Namespace(**vars(args))
+    file_args.files = [path]
+    file_args.generate = None
+    file_args.jsonl = None
+    file_args.junitxml = None
+    file_args.profile = None
+    file_args.trace_memory = False
+    file_args.full_diff = None
+    file_args.threads = None
+    store = block_store.subset([path] + list(args.setup_across_files))
+    return pickle.dumps((file_args, store, failfast))
+
+
+def run_request(request: bytes, results: Any) -> None:
+    """Run a Markdown file in this subinterpreter. Put the outcome on results.
+
+    The --fixture and --setup-across-files setup blocks run for each file.
+    """
+    args, block_store, failfast = pickle.loads(request)
+    phmutest.outputcheck.OutputChecker.configure(args)
+    runner = phmutest.engine.DirectRunner(args, block_store, failfast)
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        runner.run()
+    outcome = {
+        "log": runner.log,
+        "errors": runner.errors,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "should_stop": runner.should_stop,
+    }
+    put_result(results, json.dumps(outcome))
+
+
+def run_in_interpreter(request: bytes) -> FileRun:
+    """Run the request in a new subinterpreter. Return the outcome."""
+    interpreter = Interpreter()
+    try:
+        paths = "\0".join(sys.path)
+        failure = interpreter.run(SCRIPT, paths=paths, request=request)
+        if failure is not None:
+            return FileRun(log=[], errors=1, stdout="", stderr=failure + "\n")
+        outcome = json.loads(interpreter.get())
+    finally:
+        interpreter.close()
+    return FileRun(**outcome)
+
+
+def needs_interpreter(
+    args: argparse.Namespace, block_store: phmutest.select.BlockStore, path: Path
+) -> bool:
+    """Return False for a --setup-across-files file with only setup and teardown.
+
+    Those blocks run in the subinterpreters of the other files.
+    """
+    if path not in args.setup_across_files:
+        return True
+    fileblocks = block_store.get_blocks(path)
+    return not all(phmutest.engine.is_setup_or_teardown(b) for b in fileblocks.selected)
+
+
+def run_pool(
+    args: argparse.Namespace,
+    block_store: phmutest.select.BlockStore,
+    failfast: bool,
+    log: phmutest.printer.Log,
+) -> Tuple[int, bool]:
+    """Run the files in subinterpreters on a thread pool. Add outcomes in file order.
+
+    Return the number of errors and whether a file logged tearDownModule.
+    Each file gets a new subinterpreter. --threads is 1 or more.
+    """
+    errors = 0
+    is_torn_down = False
+    workers = args.threads or os.cpu_count()
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        futures: List["concurrent.futures.Future[FileRun]"] = [
+            executor.submit(
+                run_in_interpreter, make_request(args, block_store, path, failfast)
+            )
+            for path in args.files
+            if needs_interpreter(args, block_store, path)
+        ]
+        for future in futures:
+            file_run = future.result()
+            log.extend(e for e in file_run.log if e[0] not in MODULE_FIXTURE)
+            errors += file_run.errors
+            is_torn_down = is_torn_down or ["tearDownModule", "", ""] in file_run.log
+            print(file_run.stdout, end="")
+            print(file_run.stderr, end="", file=sys.stderr)
+            if file_run.should_stop:
+                for pending in futures:
+                    _ = pending.cancel()
+                break
+    return errors, is_torn_down
+
+
+def run_interpreters(
+    settings: phmutest.config.Settings,
+    block_store: phmutest.select.BlockStore,
+) -> phmutest.summary.PhmResult:
+    """Run the Python code blocks of each Markdown file in a subinterpreter."""
+    args = settings.args  # rename
+    check_args(args)
+    failfast = bool({"-f", "--failfast"} & set(settings.extra_args))
+    log: phmutest.printer.Log = []
+    if args.setup_across_files or args.fixture:
+        log.append(["setUpModule", "", ""])
+    errors, is_torn_down = run_pool(args, block_store, failfast, log)
+    if is_torn_down:
+        log.append(["tearDownModule", "", ""])
+    if phmutest.printer.Printer.stream is not None:
+        phmutest.printer.Printer.stream.catch_up(log)
+    metrics = phmutest.summary.compute_metrics(
+        num_files=len(args.files),
+        suite_errors=errors,
+        num_deselected=-1,  # fill in later in main:generate_and_run
+        log=log,
+    )
+    return phmutest.summary.PhmResult(
+        test_program=None,
+        is_success=(metrics.failed == 0) and (errors == 0),
+        metrics=metrics,
+        log=log,
+    )
@@ -6,11 +6,19 @@ import sys
 from pathlib import Path
 from typing import List, Optional, Tuple
 
+import phmutest.cache
 import phmutest.cases
 import phmutest.code
 import phmutest.config
+import phmutest.engine
+import phmutest.gendir
+import phmutest.interpreters
+import phmutest.outputcheck
+import phmutest.printer
+import phmutest.profiling
 import phmutest.select
 import phmutest.session
+import phmutest.stream
 import phmutest.summary
 
 KnownArgs = Tuple[argparse.Namespace, List[str]]
@@ -24,6 +32,28 @@ def existing_path(filename: str) -> Path:
     return path
 
 
+def positive_int(text: str) -> int:
+    """Return the int value of text, check that it is greater than zero."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{text}'") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{value} is less than 1.")
+    return value
+
+
+def non_negative_int(text: str) -> int:
+    """Return the int value of text, check that it is not negative."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{text}'") from None
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"{value} is negative.")
+    return value
+
+
 def main_argparser() -> argparse.ArgumentParser:
     """Create argument parser."""
     parser = argparse.ArgumentParser(
@@ -113,6 +143,27 @@ def main_argparser() -> argparse.ArgumentParser:
         action="store_true",
     )
 
+    parser.add_argument(
+        "--engine",
+        help="Run Python code blocks in a generated unittest testfile or with exec().",
+        choices=phmutest.engine.ENGINES,
+        default=None,
+    )
+
+    parser.add_argument(
+        "--block-methods",
+        help="Generate a test method for each block instead of one for each file.",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--threads",
+        help="Run independent files on N threads with --engine direct.",
+        metavar="N",
+        type=positive_int,
+    )
+
     parser.add_argument(
         "--color",
         "-c",
@@ -128,7 +179,8 @@ def main_argparser() -> argparse.ArgumentParser:
         default=None,
     )
 
-    parser.add_argument(
+    generate_group = parser.add_mutually_exclusive_group()
+    generate_group.add_argument(
         "-g",
         "--generate",
         help=("Write generated Python or docstring to output file or stdout."),
@@ -136,6 +188,13 @@ def main_argparser() -> argparse.ArgumentParser:
         type=argparse.FileType("w", encoding="utf-8"),
     )
 
+    generate_group.add_argument(
+        "--generate-dir",
+        help="Write a generated test module for each Markdown file to DIR.",
+        metavar="DIR",
+        type=pathlib.Path,
+    )
+
     parser.add_argument(
         "--progress",
         help="Print block by block test progress. File by file in --replmode.",
@@ -173,6 +232,76 @@ def main_argparser() -> argparse.ArgumentParser:
         action="store_true",
     )
 
+    parser.add_argument(
+        "--diff-lines",
+        help="Most differing lines shown for a long expected output mismatch.",
+        metavar="N",
+        type=non_negative_int,
+    )
+
+    parser.add_argument(
+        "--full-diff",
+        help="Write full diffs of long mismatched expected outputs to OUTFILE.",
+        metavar="OUTFILE",
+        type=pathlib.Path,
+    )
+
+    parser.add_argument(
+        "--trace-memory",
+        help="Log peak and net memory allocated by blocks. Shown by --summary.",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--profile",
+        help="Write cProfile stats of phmutest and each block to OUTFILE.",
+        metavar="OUTFILE",
+        type=pathlib.Path,
+    )
+
+    parser.add_argument(
+        "--jsonl",
+        help="Write a JSON line for each block result to OUTFILE while testing.",
+        metavar="OUTFILE",
+        type=argparse.FileType("w", encoding="utf-8"),
+    )
+
+    parser.add_argument(
+        "--junitxml",
+        help="Write a JUnit XML testcase for each block result to OUTFILE.",
+        metavar="OUTFILE",
+        type=argparse.FileType("w", encoding="utf-8"),
+    )
+
+    parser.add_argument(
+        "--last-failed",
+        help="Test only files with failed blocks in the last run. All if none failed.",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--failed-first",
+        help="Test files with failed blocks in the last run first.",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for --last-failed and compiled test classes.",
+        metavar="DIR",
+        type=pathlib.Path,
+    )
+
+    parser.add_argument(
+        "--bytecode-cache",
+        help="Keep the compiled generated test classes in the cache.",
+        default=False,
+        action="store_true",
+    )
+
     parser.add_argument(
         "--report",
         help="Print fenced code block configuration, deselected blocks.",
@@ -187,10 +316,42 @@ def generate_and_run(
 ) -> Optional[phmutest.summary.PhmResult]:
     """Check args, delete duplicate files, read FCBs, call a test runner."""
     settings = phmutest.config.get_settings(known_args)
+    phmutest.outputcheck.OutputChecker.configure(settings.args)
+    stream = phmutest.stream.open_stream(settings.args)
+    if not settings.args.profile and stream is None:
+        return process_files(settings, profiler=None)
+
+    # The Printer profiles each code block while the profiler is installed.
+    # The Printer writes each code block result while the stream is installed.
+    profiler = None
+    if settings.args.profile:
+        profiler = phmutest.profiling.PipelineProfiler()
+    phmutest.printer.Printer.profiler = profiler
+    phmutest.printer.Printer.stream = stream
+    try:
+        return process_files(settings, profiler)
+    finally:
+        phmutest.printer.Printer.profiler = None
+        phmutest.printer.Printer.stream = None
+        if stream is not None:
+            stream.close()
+        if profiler is not None:
+            profiler.write(settings.args.profile)
+            profiler.show_breakdown()
+
+
+def process_files(
+    settings: phmutest.config.Settings,
+    profiler: Optional[phmutest.profiling.PipelineProfiler],
+) -> Optional[phmutest.summary.PhmResult]:
+    """Read FCBs, call a test runner."""
     args = settings.args
+    phmutest.engine.check_args(args)
 
     # Find, process, and select/deselect Python fenced code blocks.
-    block_store = phmutest.select.BlockStore(settings.args)
+    last_lines = phmutest.cache.select_files(args)
+    with phmutest.profiling.stage(profiler, "phmutest.select.BlockStore"):
+        block_store = phmutest.select.BlockStore(settings.args, last_lines)
     markdown_map = None
     if args.report:
         print("Command line plus --config file args:")
@@ -207,30 +368,57 @@ def generate_and_run(
             print(location)
         return None
 
-    if args.generate:
-        if args.replmode:
-            _ = phmutest.session.run_repl(settings, block_store)
-        else:
-            text, markdown_map = phmutest.cases.testfile(args, block_store)
-            text = text.rstrip()
-            args.generate.write(text + "\n")
-            args.generate.close()
+    if args.generate or args.generate_dir:
+        generate(settings, block_store, profiler)
         return None
 
+    # Printer starts tracemalloc when --trace-memory. Stop it when done.
+    # Imported here since a subinterpreter can't load _tracemalloc.
+    import tracemalloc
+
+    was_tracing = tracemalloc.is_tracing()
     if args.replmode:
         phmresult = phmutest.session.run_repl(
             settings,
             block_store,
         )
+    elif args.engine == "direct":
+        # Exception line numbers are Markdown line numbers. No markdown_map needed.
+        phmresult = phmutest.engine.run_direct(settings, block_store)
+    elif args.engine == "interpreters":
+        phmresult = phmutest.interpreters.run_interpreters(settings, block_store)
     else:
-        text, markdown_map = phmutest.cases.testfile(args, block_store)
-        phmresult = phmutest.code.run_code(settings, text)
+        with phmutest.profiling.stage(profiler, "phmutest.cases.testfile"):
+            testfile = phmutest.cases.LazyTestfile(args, block_store)
+        phmresult = phmutest.code.run_code(settings, testfile)
+        markdown_map = testfile.markdown_map
+    if args.trace_memory and not was_tracing:
+        tracemalloc.stop()
 
     phmresult.metrics.number_of_deselected_blocks = len(block_store.deselected_names)
     phmutest.summary.show_results(settings, block_store, markdown_map, phmresult)
+    phmutest.cache.save_last_failed(args, phmresult.log)
     return phmresult
 
 
+def generate(
+    settings: phmutest.config.Settings,
+    block_store: phmutest.select.BlockStore,
+    profiler: Optional[phmutest.profiling.PipelineProfiler],
+) -> None:
+    """Write the generated testfile, test modules, or docstring."""
+    args = settings.args
+    if args.generate_dir:
+        with phmutest.profiling.stage(profiler, "phmutest.cases.testfile"):
+            _ = phmutest.gendir.write_modules(args, block_store)
+    elif args.replmode:
+        _ = phmutest.session.run_repl(settings, block_store)
+    else:
+        with phmutest.profiling.stage(profiler, "phmutest.cases.testfile"):
+            _ = phmutest.cases.write_testfile(args, block_store, args.generate)
+        args.generate.close()
+
+
 def main(argv: Optional[List[str]] = None) -> Optional[phmutest.summary.PhmResult]:
     """Library function that accepts command line args as a list of strings.
 
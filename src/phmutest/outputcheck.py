@@ -0,0 +1,192 @@
+"""Compare printed output to expected output and show a size capped diff."""
+
+import argparse
+import difflib
+import re
+import threading
+import unittest
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+SHORT_OUTPUT = 8192
+"""Outputs this many characters or less together get unittest's full diff."""
+
+DIFF_LINES = 40
+"""Default for the most differing lines shown from each output."""
+
+CONTEXT_LINES = 3
+"""Unchanged lines shown before and after the differing lines."""
+
+LINE_WIDTH = 500
+"""Longest line shown. Longer lines are clipped near the first difference."""
+
+_full_diff_lock = threading.Lock()
+"""Blocks run on --threads append to the full diff file one at a time."""
+
+
+def first_difference(first: Sequence[str], second: Sequence[str]) -> int:
+    """Return index of the first line that differs. Lines are compared once."""
+    for index, (line1, line2) in enumerate(zip(first, second)):
+        if line1 != line2:
+            return index
+    return min(len(first), len(second))
+
+
+def common_suffix(first: Sequence[str], second: Sequence[str], start: int) -> int:
+    """Return number of equal lines at the end of both that are after start."""
+    count = 0
+    most = min(len(first), len(second)) - start
+    while count < most and first[-1 - count] == second[-1 - count]:
+        count += 1
+    return count
+
+
+def first_column(line1: str, line2: str) -> int:
+    """Return index of the first character that differs."""
+    for column, (char1, char2) in enumerate(zip(line1, line2)):
+        if char1 != char2:
+            return column
+    return min(len(line1), len(line2))
+
+
+def clip(line: str, start: int) -> str:
+    """Clip line to LINE_WIDTH characters beginning at start."""
+    if len(line) <= LINE_WIDTH:
+        return line
+    text = line[start : start + LINE_WIDTH]
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if start + LINE_WIDTH < len(line) else ""
+    return prefix + text + suffix
+
+
+def capped_diff(expected: str, printed: str, max_lines: int) -> List[str]:
+    """Unified diff of at most max_lines differing lines from each string.
+
+    The first and last differing lines are found in linear time. Only the
+    lines between them, capped at max_lines, are passed to difflib.
+    """
+    # Compare with the line endings so a missing final newline is a difference.
+    first = expected.splitlines(keepends=True)
+    second = printed.splitlines(keepends=True)
+    start = first_difference(first, second)
+    suffix = common_suffix(first, second, start)
+    end1, end2 = len(first) - suffix, len(second) - suffix
+    line1 = first[start] if start < len(first) else ""
+    line2 = second[start] if start < len(second) else ""
+    column = first_column(line1, line2)
+    lines = [
+        f"Expected output and printed output differ at line {start + 1}"
+        f" column {column + 1}.",
+        f"Expected {len(first)} lines, printed {len(second)} lines.",
+    ]
+    window_start = max(0, start - CONTEXT_LINES)
+    stop1 = min(end1, start + max_lines)
+    stop2 = min(end2, start + max_lines)
+    clip_start = max(0, column - LINE_WIDTH // 5)
+
+    def shown(window: Sequence[str]) -> List[str]:
+        return [clip(s.rstrip("\r\n"), clip_start) for s in window]
+
+    hunk = difflib.unified_diff(
+        shown(first[window_start : stop1 + CONTEXT_LINES]),
+        shown(second[window_start : stop2 + CONTEXT_LINES]),
+        fromfile="expected",
+        tofile="printed",
+        lineterm="",
+        n=CONTEXT_LINES,
+    )
+    lines.extend(offset_hunk_header(line, window_start) for line in hunk)
+    if stop1 < end1 or stop2 < end2:
+        lines.append(
+            f"... {end1 - stop1} more differing expected lines and"
+            f" {end2 - stop2} more differing printed lines not shown."
+        )
+    return lines
+
+
+def offset_hunk_header(line: str, offset: int) -> str:
+    """Add offset to the line numbers of a unified diff hunk header."""
+    if not line.startswith("@@ "):
+        return line
+
+    def add_offset(match: "re.Match[str]") -> str:
+        return match.group(1) + str(int(match.group(2)) + offset)
+
+    return re.sub(r"([-+])(\d+)", add_offset, line)
+
+
+def full_diff(expected: str, printed: str) -> List[str]:
+    """Unified diff of all the lines."""
+    return list(
+        difflib.unified_diff(
+            expected.splitlines(),
+            printed.splitlines(),
+            fromfile="expected",
+            tofile="printed",
+            lineterm="",
+        )
+    )
+
+
+class OutputChecker(unittest.TestCase):
+    """TestCase that checks expected output of a code block with assertEqual().
+
+    Short outputs are compared by unittest with maxDiff = None.
+    For longer outputs the failure message is a unified diff that shows
+    at most max_lines differing lines from each output. Python's ndiff,
+    which unittest uses, takes quadratic time on large outputs.
+    The full diffs are optionally written to full_diff_path.
+    """
+
+    max_lines: int = DIFF_LINES
+    """Most differing lines shown from each output. Set by --diff-lines."""
+
+    full_diff_path: Optional[Path] = None
+    """File for the full diffs. Set by --full-diff."""
+
+    diff_count: int = 0
+    """Number of full diffs written to full_diff_path."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.maxDiff = None
+
+    @classmethod
+    def configure(cls, args: argparse.Namespace) -> None:
+        """Set the class attributes from the command line args."""
+        if args.diff_lines is None:
+            cls.max_lines = DIFF_LINES
+        else:
+            cls.max_lines = args.diff_lines
+        cls.full_diff_path = args.full_diff
+        cls.diff_count = 0
+        if cls.full_diff_path is not None:
+            _ = cls.full_diff_path.write_text("", encoding="utf-8")
+
+    def assertMultiLineEqual(  # noqa: N802
+        self, first: str, second: str, msg: Any = None
+    ) -> None:
+        """Assert that two strings are equal. Show a capped diff if they are long."""
+        if first == second:
+            return
+        if len(first) + len(second) <= SHORT_OUTPUT:
+            super().assertMultiLineEqual(first, second, msg)
+            return
+        lines = capped_diff(first, second, self.max_lines)
+        if self.full_diff_path is not None:
+            lines.append(self.write_full_diff(first, second))
+        self.fail(self._formatMessage(msg, "\n".join(lines)))
+
+    @classmethod
+    def write_full_diff(cls, first: str, second: str) -> str:
+        """Append the full diff to full_diff_path. Return where to find it."""
+        assert cls.full_diff_path is not None
+        lines = full_diff(first, second)
+        with _full_diff_lock:
+            cls.diff_count += 1
+            number = cls.diff_count
+            with open(cls.full_diff_path, "a", encoding="utf-8") as f:
+                _ = f.write(f"=== diff {number} ===\n")
+                for line in lines:
+                    _ = f.write(line + "\n")
+        return f"Full diff {number} is in {cls.full_diff_path}."
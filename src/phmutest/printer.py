@@ -3,8 +3,17 @@
 import contextlib
 import io
 import sys
+import time
 import traceback
-from typing import Callable, List, Optional
+from types import TracebackType
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+import phmutest.capture
+import phmutest.fixturescope
+
+if TYPE_CHECKING:
+    from phmutest.profiling import PipelineProfiler
+    from phmutest.stream import ResultStream
 
 LogEntry = List[str]
 Log = List[LogEntry]
@@ -18,16 +27,22 @@ TESTFILE_BLOCK_START_LINE = 3
 EXCEPTION_LINE = 4
 STDOUT = 5
 
+# Indexes to a MEMORY LogEntry. These replace the line number strings.
+PEAK_MEMORY = 3
+NET_MEMORY = 4
+
 
 # Flags
 SHOW_PROGRESS = 0x1  # Enable verbose per subtest case printing.
 SHOW_STDOUT = 0x2  # Save stdout printed by FCBs.
+TRACE_MEMORY = 0x4  # Log peak and net memory allocated by FCBs.
 
 
 # Additional log status values
 FRAME = "phmframe"
 TRACE = "phmtrace"
 DIFFS = "phmdiffs"
+MEMORY = "phmmemory"
 
 
 def get_exception_description(exc_type, exc_value) -> str:  # type: ignore
@@ -36,6 +51,31 @@ def get_exception_description(exc_type, exc_value) -> str:  # type: ignore
     return lines[-1].rstrip()
 
 
+def start_memory_trace() -> int:
+    """Start tracemalloc if needed, reset the peak, return the traced memory size.
+
+    Python 3.8 has no tracemalloc.reset_peak(). There the peak is the high
+    water mark since tracing started.
+    """
+    # Imported here since a subinterpreter can't load _tracemalloc.
+    import tracemalloc
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if sys.version_info >= (3, 9):
+        tracemalloc.reset_peak()
+    current, _ = tracemalloc.get_traced_memory()
+    return current
+
+
+def make_memory_entry(location: str, start: int) -> LogEntry:
+    """Log entry with peak and net bytes allocated since start_memory_trace()."""
+    import tracemalloc
+
+    current, peak = tracemalloc.get_traced_memory()
+    return [location, MEMORY, "", str(max(peak - start, 0)), str(current - start)]
+
+
 class Printer:
     """Context manager to print and log test status of a code block.
 
@@ -50,7 +90,9 @@ class Printer:
     - The line number of the with _phm_printer statement in the testfile.
     - The line number of the exception.
     The last entry is the captured stdout for the --stdout option.
-    Captures stdout and stderr streams
+    When the TRACE_MEMORY flag is set a MEMORY log entry follows. It has the
+    peak and net bytes allocated by the code block in place of the line numbers.
+    Captures stdout and stderr streams of the calling thread.
     Prints captured stdout and stderr if __exit__() is called with an exception.
     When stdout is expected and checked, call cancel_print_capture_on_error()
     to prevent captured stdout printing.
@@ -59,6 +101,12 @@ class Printer:
     testfile_name: Optional[str] = None
     """Full filename of the generated testfile ."""
 
+    profiler: Optional["PipelineProfiler"] = None
+    """Profiles each code block when --profile."""
+
+    stream: Optional["ResultStream"] = None
+    """Writes a record for each code block result when --jsonl or --junitxml."""
+
     def __init__(
         self,
         log: Log,
@@ -84,19 +132,29 @@ class Printer:
         self.capture_stderr = io.StringIO()
         self.cleanup_redirect: Optional[Callable[..., None]] = None
         self.is_print_capture_on_error = True
+        self.memory_start = 0
+        self.start_time = 0.0
 
     def __enter__(self):  # type: ignore
         """Optionally print location to stderr. Capture stdout/stderr for later."""
+        phmutest.fixturescope.enter_location(self.log, self.location)
         if self.flags & SHOW_PROGRESS:
             print(self.location, end="", file=sys.stderr)
         with contextlib.ExitStack() as stack:
-            stack.enter_context(contextlib.redirect_stdout(self.capture_stdout))
-            stack.enter_context(contextlib.redirect_stderr(self.capture_stderr))
+            stack.enter_context(
+                phmutest.capture.redirect(self.capture_stdout, self.capture_stderr)
+            )
             self.cleanup_redirect = stack.pop_all().close  # method to call later
+        if self.flags & TRACE_MEMORY:
+            self.memory_start = start_memory_trace()
+        if self.profiler is not None:
+            self.profiler.start(self.location)
+        self.start_time = time.perf_counter()
         return self
 
     def __exit__(self, exc_type, exc_value, exc_traceback):  # type: ignore
         """Restore redirected stdio, log+print status. All printing goes to stderr."""
+        memory_entry = self._stop_measurements()
         self.cleanup_redirect()  # type: ignore
         with_lineno_str = str(self.with_statement)
         if exc_type is None:
@@ -110,7 +168,7 @@ class Printer:
             # Show FCB line where exception propagates out of the FCB.
             # Show exception class name and value.
             reason = get_exception_description(exc_type, exc_value)
-            exc_lineno_str = str(exc_traceback.tb_lineno)
+            exc_lineno_str = str(self.exception_lineno(exc_traceback))
             if exc_type == AssertionError:
                 # The AssertionError is raised by either:
                 #   - An assert statement in the FCB or code called by the FCB.
@@ -155,18 +213,7 @@ class Printer:
                     exc_lineno_str=exc_lineno_str,
                 )
 
-            # This detects deeper frames in the traceback
-            # that are sourced from the testfile.
-            # The Printer class variable testfile_name provides the
-            # full filename of the imported testfile.
-            if self.testfile_name:
-                tb = exc_traceback
-                while tb.tb_next:
-                    tb = tb.tb_next
-                    if tb.tb_frame.f_code.co_filename == self.testfile_name:
-                        self.log.append(
-                            [self.location, FRAME, "", "0", str(tb.tb_lineno)]
-                        )
+            self.log_frames(exc_traceback)
 
             # No printing here.
             self.log_traceback(exc_type, exc_value, exc_traceback)  # type: ignore
@@ -175,10 +222,38 @@ class Printer:
                 self._print(self.capture_stdout, title="stdout")
                 self._print(self.capture_stderr, title="stderr")
 
+        if memory_entry is not None:
+            self.log.append(memory_entry)
         self.capture_stdout.close()
         self.capture_stderr.close()
         return False
 
+    def _stop_measurements(self) -> Optional[LogEntry]:
+        """Stop profiling the block. Return a MEMORY log entry if tracing memory."""
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.flags & TRACE_MEMORY:
+            return make_memory_entry(self.location, self.memory_start)
+        return None
+
+    def exception_lineno(self, exc_traceback: TracebackType) -> int:
+        """Return the line number where the exception propagates out of the block.
+
+        This is the line in the frame with the with Printer(...) statement.
+        """
+        return exc_traceback.tb_lineno
+
+    def log_frames(self, exc_traceback: TracebackType) -> None:
+        """Add a FRAME log entry for each deeper frame sourced from the testfile."""
+        # The Printer class variable testfile_name provides the
+        # full filename of the imported testfile.
+        if self.testfile_name:
+            tb = exc_traceback
+            while tb.tb_next:
+                tb = tb.tb_next
+                if tb.tb_frame.f_code.co_filename == self.testfile_name:
+                    self.log.append([self.location, FRAME, "", "0", str(tb.tb_lineno)])
+
     def log_traceback(self, exc_type, exc_value, exc_traceback):  # type: ignore
         """Add a stackprinter traceback of the exception to the log."""
         try:
@@ -227,6 +302,8 @@ class Printer:
         if self.flags & SHOW_STDOUT:
             log_entry.append(self.capture_stdout.getvalue())
         self.log.append(log_entry)
+        if self.stream is not None:
+            self.stream.catch_up(self.log, time.perf_counter() - self.start_time)
         if self.flags & SHOW_PROGRESS:
             print(f" ... {status}", file=sys.stderr)
 
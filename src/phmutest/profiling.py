@@ -0,0 +1,71 @@
+"""Profile the phmutest pipeline stages and each code block for --profile."""
+
+import contextlib
+import cProfile
+import pstats
+from pathlib import Path
+from typing import ContextManager, Dict, Iterator, Optional
+
+import phmutest.summary
+
+
+class PipelineProfiler:
+    """Keep a separate cProfile.Profile for each stage and each code block.
+
+    Stages and code blocks run one after another so only one
+    profile is enabled at a time.
+    """
+
+    def __init__(self) -> None:
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.active: Optional[cProfile.Profile] = None
+
+    def start(self, label: str) -> None:
+        """Enable the profile identified by label. Create it the first time."""
+        profile = self.profiles.get(label)
+        if profile is None:
+            profile = cProfile.Profile()
+            self.profiles[label] = profile
+        self.active = profile
+        profile.enable()
+
+    def stop(self) -> None:
+        """Disable the active profile."""
+        if self.active is not None:
+            self.active.disable()
+            self.active = None
+
+    @contextlib.contextmanager
+    def stage(self, label: str) -> Iterator[None]:
+        """Profile the statements in the with suite."""
+        self.start(label)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def write(self, filename: Path) -> None:
+        """Merge the profiles and write them as a .pstats file."""
+        self.stop()
+        stats = pstats.Stats(*self.profiles.values())
+        stats.dump_stats(filename)
+
+    def show_breakdown(self) -> None:
+        """Print table of time spent in each stage and code block, largest first."""
+        times = []
+        for label, profile in self.profiles.items():
+            total_time = pstats.Stats(profile).total_tt  # type: ignore[attr-defined]
+            times.append((total_time, label))
+        times.sort(key=lambda item: item[0], reverse=True)
+        cells = [["stage|location", "seconds"]]
+        cells.extend([[label, f"{seconds:.6f}"] for seconds, label in times])
+        print()
+        print("profile:")
+        phmutest.summary.show_table(cells)
+
+
+def stage(profiler: Optional[PipelineProfiler], label: str) -> ContextManager[None]:
+    """Profile the with suite when there is a profiler, otherwise do nothing."""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(label)
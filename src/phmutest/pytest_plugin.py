@@ -0,0 +1,231 @@
+"""pytest plugin that collects each Python FCB in a Markdown file as a test item.
+
+Enabled by the pytest command line option --phmutest.
+The blocks of a Markdown file run in one namespace shared by the file's blocks.
+"""
+
+import ast
+import asyncio
+import contextlib
+import inspect
+import io
+import re
+import sys
+import types
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+import pytest
+
+import phmutest.main
+import phmutest.outputcheck
+import phmutest.select
+import phmutest.subtest
+from phmutest.direct import Marker
+from phmutest.fenced import FencedBlock
+from phmutest.skip import skip_reason
+from phmutest.subtest import expected_output
+
+_testcase = phmutest.outputcheck.OutputChecker()
+
+
+class ExpectedOutputError(AssertionError):
+    """Printed output of a block is different than its expected output block."""
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the --phmutest command line option."""
+    group = parser.getgroup("phmutest")
+    group.addoption(
+        "--phmutest",
+        action="store_true",
+        default=False,
+        help="Collect Python fenced code blocks in Markdown files as tests.",
+    )
+
+
+def pytest_collect_file(
+    file_path: Path, parent: pytest.Collector
+) -> Optional["MarkdownFile"]:
+    """Collect Markdown files when --phmutest is on the command line."""
+    if parent.config.getoption("phmutest") and file_path.suffix == ".md":
+        markdown_file: MarkdownFile = MarkdownFile.from_parent(parent, path=file_path)
+        return markdown_file
+    return None
+
+
+class MarkdownFile(pytest.File):
+    """Markdown file. Holds the namespace shared by the file's blocks."""
+
+    def collect(self) -> Iterator["BlockItem"]:
+        """Make a BlockItem for each selected Python code block."""
+        args = phmutest.main.main_argparser().parse_args([str(self.path)])
+        block_store = phmutest.select.BlockStore(args)
+        fileblocks = block_store.get_blocks(args.files[0])
+        try:
+            self.built_from = self.path.relative_to(self.config.rootpath).as_posix()
+        except ValueError:
+            self.built_from = fileblocks.built_from
+        self.setup_blocks: List[FencedBlock] = []
+        self.teardown_blocks: List[FencedBlock] = []
+        self.code_blocks: List[FencedBlock] = []
+        for block in fileblocks.selected:
+            if block.has_directive(Marker.SETUP):
+                self.setup_blocks.append(block)
+            elif block.has_directive(Marker.TEARDOWN):
+                self.teardown_blocks.append(block)
+            else:
+                self.code_blocks.append(block)
+        for index, block in enumerate(self.code_blocks):
+            label = block.get_directive(Marker.LABEL)
+            name = label.value if label else f"line{block.line}"
+            item: BlockItem = BlockItem.from_parent(
+                self, name=name, block=block, index=index
+            )
+            reason = skip_reason(block)
+            if reason is not None:
+                item.add_marker(pytest.mark.skip(reason=reason))
+            yield item
+
+    def setup(self) -> None:
+        """Create the namespace and run the setup blocks in it.
+
+        The module name is made from the path in the node id so files with
+        the same name in different directories get different modules.
+        """
+        module_name = "_phm_" + re.sub(r"\W", "_", self.nodeid)
+        while module_name in sys.modules:
+            module_name += "_"
+        self.module = types.ModuleType(module_name)
+        self.module.__file__ = str(self.path)
+        sys.modules[module_name] = self.module
+        self.next_index = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        for block in self.setup_blocks:
+            if skip_reason(block) is None:
+                self.run_block(block)
+
+    def teardown(self) -> None:
+        """Run the teardown blocks, then discard the namespace."""
+        try:
+            for block in self.teardown_blocks:
+                if skip_reason(block) is None:
+                    self.run_block(block)
+        finally:
+            sys.modules.pop(self.module.__name__, None)
+            self.module.__dict__.clear()
+            if self.loop is not None:
+                self.loop.close()
+
+    def run_block(self, block: FencedBlock) -> str:
+        """Run the block in the file's namespace. Return what the block printed.
+
+        Blank lines pad the block so line numbers in tracebacks
+        are the Markdown file line numbers.
+        """
+        source = "\n" * block.line + block.contents
+        flags = 0
+        if block.has_directive(Marker.ASYNC) and block in self.code_blocks:
+            flags = ast.PyCF_ALLOW_TOP_LEVEL_AWAIT
+        code = compile(source, str(self.path), "exec", flags=flags)
+        printed = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(printed):
+                if code.co_flags & inspect.CO_COROUTINE:
+                    # The file's async blocks run on one event loop.
+                    if self.loop is None:
+                        self.loop = asyncio.new_event_loop()
+                    self.loop.run_until_complete(eval(code, self.module.__dict__))
+                else:
+                    exec(code, self.module.__dict__)
+        finally:
+            sys.stdout.write(printed.getvalue())
+        return printed.getvalue()
+
+    def run_before(self, index: int) -> None:
+        """Run the blocks before index that were not run yet.
+
+        They are run when they are deselected by -k or --lf so the block at
+        index sees the names assigned by the earlier blocks. If one raises,
+        fail with its location. pytest reports an error at setup of the
+        block at index.
+        """
+        while self.next_index < index:
+            block = self.code_blocks[self.next_index]
+            self.next_index += 1
+            if skip_reason(block) is not None:
+                continue
+            reason = ""
+            try:
+                _ = self.run_block(block)
+            except Exception as exc:
+                reason = f"{type(exc).__name__}: {exc}"
+            if reason:
+                # Outside the except clause so the exception is not chained.
+                location = phmutest.subtest.make_location_string(
+                    block, self.built_from
+                )
+                message = f"Block {location} run before this block raised {reason}"
+                pytest.fail(message, pytrace=False)
+
+    def run_at(self, index: int) -> str:
+        """Run the block at index. Return printed output."""
+        self.next_index = index + 1
+        return self.run_block(self.code_blocks[index])
+
+
+class BlockItem(pytest.Item):
+    """Python code block and its expected output block."""
+
+    def __init__(self, *, block: FencedBlock, index: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.block = block
+        self.index = index
+        assert isinstance(self.parent, MarkdownFile)
+        self.markdown_file: MarkdownFile = self.parent
+
+    def setup(self) -> None:
+        """Run the earlier blocks of the file that are not selected."""
+        self.markdown_file.run_before(self.index)
+
+    def runtest(self) -> None:
+        """Run the block and check its printed output."""
+        printed = self.markdown_file.run_at(self.index)
+        want = expected_output(self.block)
+        if want is not None:
+            try:
+                _testcase.assertEqual(want, printed)
+            except AssertionError as exc:
+                assert self.block.output is not None
+                message = (
+                    f"{self.location_string()} expected output at line"
+                    f" {self.block.output.line}\n{exc}"
+                )
+                raise ExpectedOutputError(message) from None
+
+    def location_string(self) -> str:
+        """Markdown file, line number, and directive label of the FCB."""
+        built_from = self.markdown_file.built_from
+        return phmutest.subtest.make_location_string(self.block, built_from)
+
+    def repr_failure(
+        self, excinfo: pytest.ExceptionInfo[BaseException], style: Any = None
+    ) -> Union[str, Any]:
+        """Show the traceback entries in the Markdown file.
+
+        The default short style shows just the broken line instead of
+        all the Markdown file above it.
+        """
+        if isinstance(excinfo.value, ExpectedOutputError):
+            return str(excinfo.value)
+        path = str(self.path)
+        traceback = excinfo.traceback.filter(lambda entry: str(entry.path) == path)
+        if traceback:
+            excinfo.traceback = traceback
+            if style is None and self.config.getoption("tbstyle", "auto") == "auto":
+                style = "short"
+        return super().repr_failure(excinfo, style)
+
+    def reportinfo(self) -> Tuple[Path, Optional[int], str]:
+        """Report the Markdown file and zero based line of the open fence."""
+        return self.path, self.block.line - 1, self.location_string()
@@ -2,12 +2,16 @@
 
 Produce a DocNode for each non-overlapping HTML comment, fenced code block,
 and blank line.
+
+scan_markdown() reads the Markdown line by line and skips the blank lines
+that do not separate HTML comments from a fenced code block.
 """
 
 import re
+from collections import deque
 from enum import Enum
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Tuple
 
 
 class NodeType(Enum):
@@ -21,6 +25,17 @@ class NodeType(Enum):
 class DocNode:
     """Information about a NodeType identified in the Markdown document."""
 
+    __slots__ = (
+        "payload",
+        "info_string",
+        "startpos",
+        "endpos",
+        "backlink",
+        "line",
+        "end_line",
+        "ntype",
+    )
+
     def __init__(self, match: Any):
         # Using Any annotation here since re.Match[str] does not work on Python 3.8.
         self.payload = ""
@@ -49,6 +64,29 @@ class DocNode:
             else:
                 self.payload = match["contents"]
 
+    @classmethod
+    def from_scan(
+        cls,
+        ntype: NodeType,
+        startpos: int,
+        endpos: int,
+        line: int,
+        end_line: int,
+        payload: str = "",
+        info_string: str = "",
+    ) -> "DocNode":
+        """Create a DocNode from the parts found by MarkdownScanner."""
+        node = cls.__new__(cls)
+        node.payload = payload
+        node.info_string = info_string
+        node.startpos = startpos
+        node.endpos = endpos
+        node.backlink = None
+        node.line = line
+        node.end_line = end_line
+        node.ntype = ntype
+        return node
+
     def set_backlink(self, other: "DocNode") -> None:
         """Set a link to a preceding DocNode."""
         self.backlink = other
@@ -150,10 +188,183 @@ def read_markdown(markdown_path: Path) -> List[DocNode]:
     return nodes
 
 
+# Line number, character position of start of line, and the line.
+ScanLine = Tuple[int, int, str]
+
+
+class LineReader:
+    """Iterate over lines of text. Lines can be pushed back to be read again."""
+
+    def __init__(self, lines: Iterable[str]):
+        self.lines = iter(lines)
+        self.pushed: Deque[ScanLine] = deque()
+        self.line_number = 0
+        """Line number of the last line read from lines."""
+        self.position = 0
+        """Character position of the end of the last line read from lines."""
+
+    def __iter__(self) -> Iterator[ScanLine]:
+        return self
+
+    def __next__(self) -> ScanLine:
+        if self.pushed:
+            return self.pushed.popleft()
+        text = next(self.lines)
+        self.line_number += 1
+        item = (self.line_number, self.position, text)
+        self.position += len(text)
+        return item
+
+    def push_back(self, items: List[ScanLine]) -> None:
+        """Read items again before reading the rest of the lines."""
+        self.pushed.extendleft(reversed(items))
+
+
+class MarkdownScanner:
+    """Find the same FCB and HTML comment nodes as read_markdown() line by line.
+
+    A blank line node is produced only when it directly follows an HTML comment.
+    These are the only blank lines that direct.get_directives() needs to
+    find the HTML comments that precede a fenced code block.
+    """
+
+    open_fence = re.compile(
+        r"(?P<indent> {0,3})(?P<fence>[\~]{3,}|[`]{3,})(?P<info_string>.*)\n"
+    )
+    open_comment = re.compile(r" {0,3}<!--")
+
+    def __init__(self, lines: Iterable[str]):
+        self.reader = LineReader(lines)
+        self.previous: Optional[DocNode] = None
+        self.comments_can_close = True
+
+    def scan(self) -> Iterator[DocNode]:
+        """Generate nodes in document order with backlinks installed."""
+        for line_number, position, line in self.reader:
+            node = (
+                self.html_comment(line_number, position, line)
+                or self.fenced_code_block(line_number, position, line)
+                or self.blank_line(line_number, position, line)
+            )
+            if node is not None:
+                previous = self.previous
+                if previous is not None and previous.endpos + 1 == node.startpos:
+                    node.set_backlink(previous)
+                self.previous = node
+                yield node
+
+    def html_comment(
+        self, line_number: int, position: int, line: str
+    ) -> Optional[DocNode]:
+        """Return the HTML comment that starts at line or None."""
+        match = self.open_comment.match(line)
+        if not match or not self.comments_can_close:
+            return None
+        first = line.rstrip("\n")
+        begin = match.end() - len("<!--")
+        if first.endswith("-->") and len(first) - 3 >= match.end():
+            return DocNode.from_scan(
+                ntype=NodeType.HTML_COMMENT,
+                startpos=position,
+                endpos=position + len(first),
+                line=line_number,
+                end_line=line_number,
+                payload=first[begin:],
+            )
+        consumed = []
+        for item in self.reader:
+            consumed.append(item)
+            body = item[2].rstrip("\n")
+            if body.endswith("-->"):
+                inner = "".join(c[2] for c in consumed[:-1])
+                return DocNode.from_scan(
+                    ntype=NodeType.HTML_COMMENT,
+                    startpos=position,
+                    endpos=item[1] + len(body),
+                    line=line_number,
+                    end_line=item[0],
+                    payload=first[begin:] + "\n" + inner + body,
+                )
+        # No line after this one ends with -->. No later comment can close.
+        self.comments_can_close = False
+        self.reader.push_back(consumed)
+        return None
+
+    def fenced_code_block(
+        self, line_number: int, position: int, line: str
+    ) -> Optional[DocNode]:
+        """Return the fenced code block that starts at line or None."""
+        match = self.open_fence.fullmatch(line)
+        if not match:
+            return None
+        fence = match["fence"]
+        close_fence = re.compile(r" {0,3}" + re.escape(fence) + fence[0] + r"*\n?")
+        contents = []
+        for item in self.reader:
+            if close_fence.fullmatch(item[2]):
+                end_line, endpos = item[0], item[1] + len(item[2].rstrip("\n"))
+                break
+            contents.append(item[2])
+        else:
+            # Without a closing fence the block extends to the end of the document.
+            end_line, endpos = self.reader.line_number, self.reader.position
+        payload = "".join(contents)
+        if match["indent"]:
+            payload = DocNode.dedent(match["indent"], payload)
+        return DocNode.from_scan(
+            ntype=NodeType.FENCED_CODE_BLOCK,
+            startpos=position,
+            endpos=endpos,
+            line=line_number,
+            end_line=end_line,
+            payload=payload,
+            info_string=match["info_string"].strip(),
+        )
+
+    def blank_line(
+        self, line_number: int, position: int, line: str
+    ) -> Optional[DocNode]:
+        """Return a blank line node if line is blank and directly after a comment."""
+        body = line.rstrip("\n")
+        previous = self.previous
+        if (
+            previous is None
+            or previous.ntype != NodeType.HTML_COMMENT
+            or previous.end_line + 1 != line_number
+            or body.strip(" \t")
+        ):
+            return None
+        return DocNode.from_scan(
+            ntype=NodeType.BLANK_LINE,
+            startpos=position,
+            endpos=position + len(body),
+            line=line_number,
+            end_line=line_number,
+        )
+
+
+def scan_markdown(markdown_path: Path) -> List[DocNode]:
+    """From Markdown return list of FCB and HTML comment DocNode.
+
+    Blank line DocNodes are only present directly after an HTML comment.
+    The Markdown is read line by line, so the whole text is never in memory.
+    """
+    with open(markdown_path, encoding="utf-8") as f:
+        nodes = list(MarkdownScanner(f).scan())
+
+    # throw out the trailing blank lines.
+    while nodes and nodes[-1].ntype == NodeType.BLANK_LINE:
+        _ = nodes.pop()
+
+    for node in nodes:
+        post(node)
+    return nodes
+
+
 def fcb_nodes(markdown_filename: str) -> List[DocNode]:
     """From Markdown return list of the DocNode of type NodeType.FENCED_CODE_BLOCK."""
     fcbs = []
-    for node in read_markdown(Path(markdown_filename)):
+    for node in scan_markdown(Path(markdown_filename)):
         if node.ntype == NodeType.FENCED_CODE_BLOCK:
             fcbs.append(node)
     return fcbs
@@ -1,9 +1,10 @@
 """Identify/select/deselect FCBs per info string, test groups and directives."""
 
 import argparse
+import copy
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, MutableMapping, Set, Tuple
+from typing import Iterable, List, Mapping, MutableMapping, Optional, Set, Tuple
 
 import phmutest.fenced
 import phmutest.reader
@@ -52,7 +53,7 @@ def apply_skips(skips: List[str], blocks: List[FencedBlock]) -> None:
 
 def configure_block_roles(skips: List[str], markdown_file: Path) -> List[FencedBlock]:
     """Find markdown blocks and pair up code and output blocks."""
-    docnodes = phmutest.reader.read_markdown(markdown_file)
+    docnodes = phmutest.reader.scan_markdown(markdown_file)
     blocks = phmutest.fenced.convert(docnodes)
     docnodes.clear()
     identify_output_blocks(blocks)
@@ -104,6 +105,29 @@ def select_blocks(
     return selected_blocks
 
 
+def select_through_line(
+    blocks: List[FencedBlock],
+    last_line: int,
+    built_from: str,
+    deselected: List[str],
+) -> List[FencedBlock]:
+    """Deselect blocks after last_line except for setup and teardown blocks.
+
+    Append the names of deselected blocks to deselected.
+    """
+    selected_blocks = []
+    for block in blocks:
+        if (
+            block.line <= last_line
+            or block.has_directive(Marker.SETUP)
+            or block.has_directive(Marker.TEARDOWN)
+        ):
+            selected_blocks.append(block)
+        else:
+            deselected.append(f"{built_from}:{block.line}")
+    return selected_blocks
+
+
 @dataclass
 class FileBlocks:
     """Fenced code blocks selected for testing, all FCBs, .md filename."""
@@ -129,8 +153,15 @@ class BlockStore:
     copied to the FileBlocks.selected list.
     """
 
-    def __init__(self, args: argparse.Namespace):
-        """Configure Python example blocks from each file. Select/deselect."""
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        last_lines: Optional[Mapping[Path, int]] = None,
+    ):
+        """Configure Python example blocks from each file. Select/deselect.
+
+        last_lines maps a file to the line of its last block that needs testing.
+        """
         self._block_store: MutableMapping[Path, FileBlocks] = {}
         self.deselected_names: List[str] = []
         for path in args.files:
@@ -141,6 +172,10 @@ class BlockStore:
             else:
                 blocks = [b for b in all_blocks if b.role == Role.CODE]
             selected = select_blocks(args, blocks, built_from, self.deselected_names)
+            if last_lines and path in last_lines:
+                selected = select_through_line(
+                    selected, last_lines[path], built_from, self.deselected_names
+                )
             fileblocks = FileBlocks(path, built_from, selected, all_blocks)
             self._block_store[path] = fileblocks
 
@@ -148,6 +183,17 @@ class BlockStore:
         """Return blocks for Markdown file at path."""
         return self._block_store[path]
 
+    def subset(self, paths: Iterable[Path]) -> "BlockStore":
+        """Return a BlockStore with only the blocks of the files at paths.
+
+        It has no deselected block locations. It is pickled and passed to
+        a subinterpreter by --engine interpreters.
+        """
+        store = copy.copy(self)
+        store._block_store = {path: self._block_store[path] for path in paths}
+        store.deselected_names = []
+        return store
+
     def get_contents_and_role(self, built_from: str, line: int) -> Tuple[str, Role]:
         """Return contents of block in file whose open fence is at line."""
         fileblocks = self.get_blocks(Path(built_from))
@@ -4,6 +4,7 @@ import argparse
 import doctest
 import itertools
 import sys
+import time
 import traceback
 import typing
 from dataclasses import dataclass
@@ -11,10 +12,13 @@ from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import phmutest.cases
+import phmutest.fixturescope
 import phmutest.globs
 import phmutest.importer
 import phmutest.printer
+import phmutest.profiling
 import phmutest.select
+import phmutest.stream
 import phmutest.subtest
 import phmutest.summary
 import phmutest.syntax
@@ -34,13 +38,45 @@ class ExampleOutcomeRunner(doctest.DocTestRunner):
         self.phm_error_reasons: Dict[int, ReasonType] = {}
         self.phm_number_of_failures = 0
         self.phm_number_of_errors = 0
+        self.phm_trace_memory = False
+        self.phm_memory_start = 0
+        self.phm_memory_log: List[Tuple[int, List[str]]] = []
+        self.phm_stream: Optional[phmutest.stream.ResultStream] = None
+        self.phm_start_time = 0.0
+
+    def phm_log_memory(self, test, example) -> None:  # type: ignore
+        """Save the memory allocated by the Example when tracing memory."""
+        if self.phm_trace_memory:
+            line_number = example.lineno + 1
+            location = f"{test.name}:{line_number}"
+            entry = phmutest.printer.make_memory_entry(location, self.phm_memory_start)
+            self.phm_memory_log.append((line_number, entry))
+
+    def phm_write_record(  # type: ignore
+        self, test, example, result, reason=""
+    ) -> None:
+        """Write a record of the Example result when --jsonl or --junitxml."""
+        if self.phm_stream is not None:
+            location = f"{test.name}:{example.lineno + 1}"
+            duration = time.perf_counter() - self.phm_start_time
+            self.phm_stream.write(location, result, reason, duration)
+
+    def report_start(self, out, test, example):  # type: ignore
+        if self.phm_trace_memory:
+            self.phm_memory_start = phmutest.printer.start_memory_trace()
+        super().report_start(out, test, example)
+        self.phm_start_time = time.perf_counter()
 
     def report_success(self, out, test, example, got):  # type: ignore
+        self.phm_log_memory(test, example)
+        self.phm_write_record(test, example, "pass")
         line_number = example.lineno + 1
         self.phm_outcomes[line_number] = "pass"
         super().report_success(out, test, example, got)
 
     def report_failure(self, out, test, example, got):  # type: ignore
+        self.phm_log_memory(test, example)
+        self.phm_write_record(test, example, "failed")
         line_number = example.lineno + 1
         self.phm_outcomes[line_number] = "failed"
         self.phm_number_of_failures += 1
@@ -48,12 +84,14 @@ class ExampleOutcomeRunner(doctest.DocTestRunner):
         super().report_failure(out, test, example, got)
 
     def report_unexpected_exception(self, out, test, example, exc_info):  # type: ignore
+        self.phm_log_memory(test, example)
         line_number = example.lineno + 1
         self.phm_outcomes[line_number] = "error"
         self.phm_number_of_errors += 1
         exception_class = phmutest.printer.get_exception_description(
             exc_info[0], exc_info[1]
         )
+        self.phm_write_record(test, example, "error", exception_class)
         self.phm_error_reasons[line_number] = (
             exception_class,
             line_number,
@@ -83,6 +121,13 @@ def skip_block(block: FencedBlock, built_from: str) -> Optional[Tuple[int, List[
     return details
 
 
+def write_skip_record(log_entry: List[str]) -> None:
+    """Write a record for a skipped block when --jsonl or --junitxml."""
+    if phmutest.printer.Printer.stream is not None:
+        location, result, reason = log_entry
+        phmutest.printer.Printer.stream.write(location, result, reason, 0.0)
+
+
 def get_result(block_outcomes: List[str]) -> str:
     """Determine pass/failed/error result from the block Example outcomes."""
     assert block_outcomes, "Should not be empty since SESSION starts with >>>."
@@ -108,12 +153,15 @@ class SessionResult:
 
 # This is a designated patch point. Developers: Please treat this as if it were an API.
 # Use this to access the internally generated docstring in --replmode.
+# When testing it is called with the session text of each block, not the
+# text of the whole file. With --generate it is called once with the text
+# of the whole file.
 # To patch:
 # - Create a new function to replace modify_docstring().
 # - with mock.patch("phmutest.session.modify_docstring", <the new instance>):
 # - See example in tests/test_patching.py.
 def modify_docstring(text: str) -> str:
-    """Use mock.patch to access/modify the file docstring."""
+    """Use mock.patch to access/modify the block or file docstring."""
     return text
 
 
@@ -135,93 +183,149 @@ def run_one_file(
     for block in fileblocks.selected:
         if details := skip_block(block, fileblocks.built_from):
             lineno_log.append(details)
+            write_skip_record(details[1])
         else:
             tested_blocks.append(block)
 
-    # Generate docstring from the remaining blocks.
-    # The fences of the FCB are not included in the range.
-    text = fileblocks.path.read_text(encoding="utf-8")
-    line_ranges = [range(b.line + 1, b.end_line) for b in tested_blocks]
-    keeplines = set(itertools.chain(*line_ranges))
-    docstring_lines = []
-    for num, line in enumerate(text.splitlines(), start=1):
-        if num in keeplines:
-            docstring_lines.append(line)
-        else:
-            docstring_lines.append("")
+    if args.generate:
+        docstring = modify_docstring(make_docstring(fileblocks, tested_blocks))
+        return SessionResult([[]], 0, 0, docstring)
 
-    # The extractor instruments the docstring to discover the assignments.
+    # Make one doctest from the Examples of the remaining blocks.
+    # block_numbers maps an Example line number to its index in tested_blocks.
+    parser = doctest.DocTestParser()
+    examples: List[doctest.Example] = []
+    block_numbers: Dict[int, int] = {}
+    for number, block in enumerate(tested_blocks):
+        for example in block_examples(parser, block, fileblocks.built_from):
+            examples.append(example)
+            block_numbers[example.lineno + 1] = number
+
+    # The extractor Examples discover the assignments made by the blocks.
     # It implements the --share-across-files feature.
+    extra_globs = {}
     if extractor is not None:
-        assert docstring_lines[0] == ""
-        assert docstring_lines[-1] == ""
-        docstring_lines[0] = ">>> _phm_extract.start(locals().keys())"
-        docstring_lines[-1] = ">>> _phm_extract.finish(locals())"
-        extra_globs = {"_phm_extract": extractor}
-    else:
-        extra_globs = None
-    docstring = "\n".join(docstring_lines)
-    docstring = modify_docstring(docstring)
-    if args.generate:
-        return SessionResult([[]], 0, 0, docstring)
+        end_line = tested_blocks[-1].end_line if tested_blocks else 0
+        examples.insert(0, doctest.Example("_phm_extract.start(locals().keys())", ""))
+        examples.append(
+            doctest.Example("_phm_extract.finish(locals())", "", lineno=end_line)
+        )
+        extra_globs["_phm_extract"] = extractor
+    namespace = dict(globs) if globs is not None else {}
+    namespace.update(extra_globs)
+    namespace.setdefault("__name__", "__main__")
+    test = doctest.DocTest(examples, namespace, fileblocks.built_from, None, None, None)
 
     # Run doctests.
-    finder = doctest.DocTestFinder()
-    tests = finder.find(
-        docstring, name=fileblocks.built_from, globs=globs, extraglobs=extra_globs
-    )
-    assert len(tests) == 1, f"expect only one test, got {len(tests)}."
     runner = ExampleOutcomeRunner(verbose=False, optionflags=optionflags)  # type:ignore
-    runner.run(tests[0])
-
-    # Determine each overall block result for the log from the file's Example outcomes.
-    runner_lineno = set(runner.phm_outcomes)
-    for block, line_range in zip(tested_blocks, line_ranges):
-        block_lineno = set(line_range) & runner_lineno
-        if block_outcomes := [runner.phm_outcomes[line] for line in block_lineno]:
-            # Note- If there is a fail-fast there will be no outcomes for a
-            #       later block.
-            result = get_result(block_outcomes)
-            doc_location = phmutest.subtest.make_location_string(
-                block, fileblocks.built_from
-            )
-            description, lineno = get_runner_reason(runner, line_range, result)
-            # block.line is the start of the FCB.
-            # lineno is the line associated with the result
-            details = (
-                block.line,
-                [doc_location, result, description, str(block.line), str(lineno)],
-            )
-            lineno_log.append(details)
+    runner.phm_trace_memory = args.trace_memory
+    runner.phm_stream = phmutest.printer.Printer.stream
+    runner.run(test)
+
+    lineno_log.extend(
+        block_log_entries(runner, tested_blocks, block_numbers, fileblocks.built_from)
+    )
 
+    # Memory log entries follow the block's log entry since the
+    # Example line numbers are after the FCB open fence line number.
+    lineno_log.extend(runner.phm_memory_log)
     lineno_log.sort()
     log = [entry for _, entry in lineno_log]
     return SessionResult(
-        log, runner.phm_number_of_failures, runner.phm_number_of_errors, docstring
+        log, runner.phm_number_of_failures, runner.phm_number_of_errors
     )
 
 
-def get_runner_reason(
-    runner: ExampleOutcomeRunner, line_range: range, result: str
-) -> ReasonType:
-    """From the runner, get first of (description, line number) for the line range."""
+def block_examples(
+    parser: doctest.DocTestParser, block: FencedBlock, built_from: str
+) -> List[doctest.Example]:
+    """Parse the Examples in the session block. They have Markdown line numbers."""
+    examples = parser.get_examples(modify_docstring(block.contents), built_from)
+    for example in examples:
+        # The first line of the block contents follows the open fence.
+        example.lineno += block.line
+    return examples
+
+
+def content_lines(block: FencedBlock) -> range:
+    """Markdown line numbers of the block contents. The fences are not included.
+
+    The contents of a block left unclosed at the end of the file end there.
+    """
+    first = block.line + 1
+    return range(first, first + len(block.contents.splitlines()))
+
+
+def make_docstring(
+    fileblocks: phmutest.select.FileBlocks, tested_blocks: List[FencedBlock]
+) -> str:
+    """Return text of the Markdown file with lines not in tested_blocks blanked.
+
+    The fences of the FCB are not included. Written by --generate.
+    """
+    text = fileblocks.path.read_text(encoding="utf-8")
+    keeplines = set(itertools.chain(*[content_lines(b) for b in tested_blocks]))
+    docstring_lines = []
+    for num, line in enumerate(text.splitlines(), start=1):
+        if num in keeplines:
+            docstring_lines.append(line)
+        else:
+            docstring_lines.append("")
+    return "\n".join(docstring_lines)
+
+
+def block_log_entries(
+    runner: ExampleOutcomeRunner,
+    tested_blocks: List[FencedBlock],
+    block_numbers: Dict[int, int],
+    built_from: str,
+) -> List[Tuple[int, List[str]]]:
+    """Determine each block result for the log from the file's Example outcomes.
+
+    block_numbers maps an Example line number to its index in tested_blocks.
+    Returns [block line number, log entry] for each block that has outcomes.
+    If there is a fail-fast there will be no outcomes for a later block.
+    """
+    block_outcomes: Dict[int, List[str]] = {}
+    for line, outcome in runner.phm_outcomes.items():
+        if line in block_numbers:
+            block_outcomes.setdefault(block_numbers[line], []).append(outcome)
     # For failed assert statements and raised exceptions in the block report
     # log the reason saved by the test runner. Reports the first problem
     # in the FCB, there may be more unless fail-fast.
-    if result == "failed":
-        reason_map = runner.phm_failed_reasons
-    elif result == "error":
-        reason_map = runner.phm_error_reasons
-    else:
-        return ("", 0)
+    reasons = {
+        "failed": first_reasons(runner.phm_failed_reasons, block_numbers),
+        "error": first_reasons(runner.phm_error_reasons, block_numbers),
+    }
+    entries = []
+    for number, outcomes in block_outcomes.items():
+        block = tested_blocks[number]
+        result = get_result(outcomes)
+        doc_location = phmutest.subtest.make_location_string(block, built_from)
+        description, lineno = reasons.get(result, {}).get(number, ("", 0))
+        # block.line is the start of the FCB.
+        # lineno is the line associated with the result
+        entries.append(
+            (
+                block.line,
+                [doc_location, result, description, str(block.line), str(lineno)],
+            )
+        )
+    return entries
+
+
+def first_reasons(
+    reason_map: Dict[int, ReasonType], block_numbers: Dict[int, int]
+) -> Dict[int, ReasonType]:
+    """Return the first reason of each block keyed by its index in the tested blocks.
 
-    reason_lineno = set(reason_map)
-    lineno = set(line_range) & reason_lineno
-    reasons: List[ReasonType] = []
-    for line in line_range:
-        if line in lineno:
-            reasons.append(reason_map[line])
-    return reasons[0]
+    The runner saved the reasons in the order the Examples ran.
+    """
+    reasons: Dict[int, ReasonType] = {}
+    for line, reason in reason_map.items():
+        if line in block_numbers:
+            _ = reasons.setdefault(block_numbers[line], reason)
+    return reasons
 
 
 def generate(args: argparse.Namespace, block_store: phmutest.select.BlockStore) -> None:
@@ -239,8 +343,8 @@ def null_cleanup() -> None:
     pass
 
 
-UserFixtureInfo = Tuple[Optional[Dict[str, Any]], Callable[[], None], bool]
-"""Function return type [globs, cleanup function, success]."""
+UserFixtureInfo = Tuple[Optional[Dict[str, Any]], Callable[[], None], bool, str]
+"""Function return type [globs, cleanup function, success, scope]."""
 
 
 def process_user_fixture(
@@ -248,9 +352,12 @@ def process_user_fixture(
 ) -> UserFixtureInfo:
     globs: Optional[Dict[str, Any]] = {}
     cleanup_function = null_cleanup
-    f = phmutest.importer.fixture_function_importer(args.fixture.name)
+    scope = phmutest.fixturescope.SESSION
+    function = phmutest.importer.fixture_function_importer(args.fixture.name)
     try:
-        user_fixture = f(log=log, is_replmode=True)
+        user_fixture = phmutest.fixturescope.call_fixture(
+            args.fixture.name, function, log, is_replmode=True
+        )
     except Exception:
         print("-" * 60)
         print(f"Caught an exception in --fixture {args.fixture}...")
@@ -258,21 +365,43 @@ def process_user_fixture(
         # since the doctest failure printing is to stdout.
         traceback.print_exc(file=sys.stdout)
         # Expecting caller to ignore the first two items of the returned tuple.
-        return {}, null_cleanup, False
+        return {}, null_cleanup, False, scope
 
     if user_fixture:
+        scope = user_fixture.scope
         if user_fixture.globs is not None:
             # Make the fixture's MutableMapping type look like a Dict for doctest.
             globs = typing.cast(Optional[Dict[str, Any]], user_fixture.globs)
 
-        if user_fixture.repl_cleanup is not None:
+        # A reused fixture's repl_cleanup is called when Python exits.
+        if user_fixture.repl_cleanup is not None and not (
+            phmutest.fixturescope.is_reused(args.fixture.name)
+        ):
             cleanup_function = user_fixture.repl_cleanup
 
         # When --sharing is ".", and the fixture returned some globs, show them.
         if globs and phmutest.cases.is_verbose_sharing(args, Path("placeholder")):
             glob_names = ", ".join(globs.keys())
             print(f"{args.fixture} is sharing: {glob_names}")
-    return globs, cleanup_function, True
+    return globs, cleanup_function, True, scope
+
+
+def refresh_fixture(
+    args: argparse.Namespace,
+    log: List[List[str]],
+    globs: Optional[Dict[str, Any]],
+    cleanup_function: Callable[[], None],
+) -> UserFixtureInfo:
+    """Call a file or block scope fixture function again before the next file.
+
+    The new globs are added to globs which may have names shared across files.
+    """
+    cleanup_function()
+    new_globs, cleanup_function, success, scope = process_user_fixture(args, log)
+    merged_globs = dict(globs) if globs is not None else {}
+    if new_globs is not None:
+        merged_globs.update(new_globs)
+    return merged_globs, cleanup_function, success, scope
 
 
 def update_globs_show_sharing(
@@ -294,6 +423,38 @@ def update_globs_show_sharing(
         extractor.assignments.clear()
 
 
+def run_and_share(
+    args: argparse.Namespace,
+    fileblocks: phmutest.select.FileBlocks,
+    optionflags: int,
+    globs: Optional[Dict[str, Any]],
+) -> SessionResult:
+    """Run doctests on a file, show progress, and share names across files."""
+    # Create object to get assignments by the blocks under test.
+    if fileblocks.path in args.share_across_files:
+        extractor = phmutest.globs.AssignmentExtractor()
+    else:
+        extractor = None
+
+    # The doctest runner has no per block hook so profile the whole file.
+    with phmutest.profiling.stage(
+        phmutest.printer.Printer.profiler, fileblocks.built_from
+    ):
+        result = run_one_file(args, fileblocks, optionflags, globs, extractor)
+
+    if args.progress:
+        null_highlighter = phmutest.syntax.Highlighter()
+        null_highlighter.disable()
+        phmutest.summary.show_log(
+            log=result.log,
+            highighter=null_highlighter,
+            use_color=args.color,
+        )
+
+    update_globs_show_sharing(args, globs, fileblocks, extractor)
+    return result
+
+
 DoctestGlobs = Optional[Dict[str, Any]]
 """Type globs compatible with Python standard library doctest globs."""
 
@@ -313,8 +474,9 @@ def run_repl(
     cleanup_function = null_cleanup
     log: List[List[str]] = []
     number_of_errors = 0
+    scope = phmutest.fixturescope.SESSION
     if args.fixture:
-        globs, cleanup_function, success = process_user_fixture(args, log)
+        globs, cleanup_function, success, scope = process_user_fixture(args, log)
         if not success:
             phm_result = phmutest.summary.EMPTY_PHMRESULT
             phm_result.metrics.number_of_files = len(args.files)
@@ -324,28 +486,17 @@ def run_repl(
             return phm_result
 
     try:
-        for path in args.files:
-            fileblocks = block_store.get_blocks(path)
-
-            # Create object to get assignments by the blocks under test.
-            if fileblocks.path in args.share_across_files:
-                extractor = phmutest.globs.AssignmentExtractor()
-            else:
-                extractor = None
-
-            result = run_one_file(args, fileblocks, optionflags, globs, extractor)
-
-            if args.progress:
-                null_highlighter = phmutest.syntax.Highlighter()
-                null_highlighter.disable()
-                phmutest.summary.show_log(
-                    log=result.log,
-                    highighter=null_highlighter,
-                    use_color=args.color,
+        for index, path in enumerate(args.files):
+            if index and scope != phmutest.fixturescope.SESSION:
+                globs, cleanup_function, success, scope = refresh_fixture(
+                    args, log, globs, cleanup_function
                 )
-
-            update_globs_show_sharing(args, globs, fileblocks, extractor)
-
+                if not success:
+                    log.append([str(args.fixture), "error", ""])
+                    number_of_errors += 1
+                    break
+            fileblocks = block_store.get_blocks(path)
+            result = run_and_share(args, fileblocks, optionflags, globs)
             log.extend(result.log)
             number_of_errors += result.number_of_errors
             if (optionflags & doctest.FAIL_FAST) and (
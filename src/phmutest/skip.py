@@ -1,6 +1,7 @@
 """Process skip directives."""
 
 import argparse
+import sys
 from dataclasses import dataclass
 from typing import MutableMapping, Optional
 
@@ -94,3 +95,18 @@ def skipper(
                 minor_version = int(directive.value)
                 skip_info = skipif(minor_version, doc_location, args.progress)
     return skip_info
+
+
+def skip_reason(block: FencedBlock) -> Optional[str]:
+    """Return why the block is skipped when run by this Python, otherwise None."""
+    if block.skip_patterns:
+        return "--skip " + ", ".join(block.skip_patterns)
+    directive = block.get_directive(Marker.SKIP, Marker.SKIPIF_PYVERSION)
+    if directive is None:
+        return None
+    if directive.type == Marker.SKIP:
+        return directive.literal[4:-3]  # lose the directive <!-- and -->.
+    minor_version = int(directive.value)
+    if sys.version_info < (3, minor_version):
+        return f"requires Python >= 3.{minor_version}"
+    return None
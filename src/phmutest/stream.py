@@ -0,0 +1,179 @@
+"""Write a record for each block result while the tests are running.
+
+Records are written for --jsonl as JSON lines and for --junitxml as
+JUnit XML testcase elements.
+"""
+
+import argparse
+import json
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+from xml.sax.saxutils import quoteattr
+
+import phmutest.subtest
+
+RESULTS = ["pass", "failed", "error", "skip"]
+"""Log entry results that are written as records."""
+
+
+@dataclass
+class Record:
+    """Result of testing a block or an Example in --replmode."""
+
+    location: str
+    result: str
+    reason: str
+    duration: float  # seconds
+    file: str  # Markdown file
+    line: int  # Markdown line number. 0 if not known.
+
+
+def make_record(location: str, result: str, reason: str, duration: float) -> Record:
+    """Create record. Get the Markdown file and line number from the location."""
+    if ":" in location:
+        built_from, line = phmutest.subtest.decode_location_string(location)
+    else:
+        built_from, line = location, 0  # For example the --fixture.
+    return Record(location, result, reason, duration, built_from, line)
+
+
+def close_outfile(outfile: TextIO) -> None:
+    """Close outfile unless it is stdout, which is what - on the command line gives."""
+    if outfile is sys.stdout:
+        outfile.flush()
+    else:
+        outfile.close()
+
+
+class JsonlWriter:
+    """Write each record as a JSON object on its own line."""
+
+    def __init__(self, outfile: TextIO):
+        self.outfile = outfile
+
+    def write(self, record: Record) -> None:
+        self.outfile.write(json.dumps(asdict(record)) + "\n")
+        self.outfile.flush()
+
+    def close(self) -> None:
+        close_outfile(self.outfile)
+
+
+class JunitXmlWriter:
+    """Write each record as a JUnit XML testcase element.
+
+    The testsuite element has no test and failure counts since they are
+    not known until the end of the run.
+    """
+
+    elements = {"failed": "failure", "error": "error", "skip": "skipped"}
+
+    def __init__(self, outfile: TextIO):
+        self.outfile = outfile
+        self.outfile.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self.outfile.write('<testsuites>\n<testsuite name="phmutest">\n')
+        self.outfile.flush()
+
+    def write(self, record: Record) -> None:
+        attributes = " ".join(
+            [
+                f"classname={quoteattr(record.file)}",
+                f"name={quoteattr(record.location)}",
+                f"file={quoteattr(record.file)}",
+                f'line="{record.line}"',
+                f'time="{record.duration:.6f}"',
+            ]
+        )
+        element = self.elements.get(record.result)
+        if element is None:
+            self.outfile.write(f"<testcase {attributes}/>\n")
+        else:
+            message = quoteattr(record.reason)
+            self.outfile.write(
+                f"<testcase {attributes}><{element} message={message}/></testcase>\n"
+            )
+        self.outfile.flush()
+
+    def close(self) -> None:
+        self.outfile.write("</testsuite>\n</testsuites>\n")
+        close_outfile(self.outfile)
+
+
+Writer = Union[JsonlWriter, JunitXmlWriter]
+
+
+class ResultStream:
+    """Send records to the writers for --jsonl and --junitxml."""
+
+    def __init__(self, writers: List[Writer]):
+        self.writers = writers
+        self.local = threading.local()
+        """Logs of the thread with the index of the next entry to write."""
+        self.lock = threading.Lock()
+
+    def write(self, location: str, result: str, reason: str, duration: float) -> None:
+        """Write a record to each writer."""
+        record = make_record(location, result, reason, duration)
+        with self.lock:
+            for writer in self.writers:
+                writer.write(record)
+
+    def positions(self) -> Dict[int, Tuple[List[List[str]], int]]:
+        """Return the calling thread's logs and next positions keyed by log id.
+
+        The log is kept with its position so its id is not reused.
+        """
+        try:
+            positions: Dict[int, Tuple[List[List[str]], int]] = self.local.positions
+        except AttributeError:
+            positions = {}
+            self.local.positions = positions
+        return positions
+
+    def catch_up(self, log: List[List[str]], duration: float = 0.0) -> None:
+        """Write log entries added since the last call.
+
+        The generated testfile logs skipped blocks directly to the log.
+        They get written here, with zero duration, before the next
+        block result. The duration is for the last entry in the log.
+        Threads running files with --threads each have their own log.
+        """
+        positions = self.positions()
+        _, position = positions.get(id(log), (log, 0))
+        entries = log[position:]
+        positions[id(log)] = (log, len(log))
+        last = len(entries) - 1
+        for index, entry in enumerate(entries):
+            if len(entry) >= 3 and entry[1] in RESULTS:
+                seconds = duration if index == last else 0.0
+                self.write(entry[0], entry[1], entry[2], seconds)
+
+    def finish(self, log: List[List[str]]) -> None:
+        """Write the entries left in log. Stop keeping track of it."""
+        self.catch_up(log)
+        del self.positions()[id(log)]
+
+    def skip_written(self, log: List[List[str]]) -> None:
+        """Don't write the entries now in log. They were written from another log.
+
+        Called after the log of a file run on a thread is added to log.
+        """
+        self.positions()[id(log)] = (log, len(log))
+
+    def close(self) -> None:
+        for writer in self.writers:
+            writer.close()
+
+
+def open_stream(args: argparse.Namespace) -> Optional[ResultStream]:
+    """Return a ResultStream if --jsonl or --junitxml, otherwise None."""
+    writers: List[Writer] = []
+    if args.jsonl:
+        writers.append(JsonlWriter(args.jsonl))
+    if args.junitxml:
+        writers.append(JunitXmlWriter(args.junitxml))
+    if writers:
+        return ResultStream(writers)
+    return None
@@ -1,9 +1,11 @@
 """Generate code to test Python FCBs."""
 
 import argparse
+import ast
 import re
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+import phmutest.expected
 import phmutest.fillin
 import phmutest.printer
 import phmutest.select
@@ -64,25 +66,92 @@ $output
 '''  # noqa: E501
 
 
+# Expected output longer than phmutest.expected.INLINE_LIMIT is loaded
+# when it is checked instead of being written into the testfile.
+reference_output_form = """\
+        $subtestcontext
+            $skip
+            with _phmPrinter(_phm_log, "$location", flags=$flags, testfile_lineno=0) as _phm_printer:
+                $code
+                # line $outline
+                _phm_expected_str = _phm_expected_output("$builtfrom", $outline)
+                _phm_printer.cancel_print_capture_on_error()
+                _phm_testcase.assertEqual(_phm_expected_str, _phm_printer.stdout())
+"""  # noqa: E501
+
+
+skipif_reference_output_form = """\
+        $subtestcontext
+            $skip
+            else:
+                with _phmPrinter(_phm_log, "$location", flags=$flags, testfile_lineno=0) as _phm_printer:
+                    $code
+                    # line $outline
+                    _phm_expected_str = _phm_expected_output("$builtfrom", $outline)
+                    _phm_printer.cancel_print_capture_on_error()
+                    _phm_testcase.assertEqual(_phm_expected_str, _phm_printer.stdout())
+"""  # noqa: E501
+
+
+REFERENCE_FORMS = {
+    expected_output_form: reference_output_form,
+    skipif_expected_output_form: skipif_reference_output_form,
+}
+"""Form that refers to the expected output for each form that inlines it."""
+
+
+def async_form(form: str) -> str:
+    """Make a form that runs the with _phmPrinter statement in a coroutine.
+
+    For a block with the async directive so it can use top level await.
+    The names the block assigns are declared nonlocal in the coroutine so the
+    later blocks see them. The annotations $asyncnames make them local to the
+    test method which nonlocal requires. Local annotations are not evaluated.
+    """
+    lines = form.splitlines()
+    index = next(i for i, line in enumerate(lines) if "with _phmPrinter(" in line)
+    indent = lines[index][: len(lines[index]) - len(lines[index].lstrip())]
+    head = [
+        indent + "$asyncnames",
+        indent + "async def _phm_async_block():",
+        indent + "    $nonlocalnames",
+    ]
+    # Lines in column 1 are in the expected output string literal.
+    body = ["    " + line if line.startswith(" ") else line for line in lines[index:]]
+    tail = [indent + "_phm_async_run(_phm_async_block(), shared=True)"]
+    return "\n".join(lines[:index] + head + body + tail) + "\n"
+
+
+ASYNC_FORMS = {
+    form: async_form(form)
+    for form in [
+        no_output_form,
+        skipif_form,
+        expected_output_form,
+        skipif_expected_output_form,
+        reference_output_form,
+        skipif_reference_output_form,
+    ]
+}
+"""Form that runs the code in a coroutine for each form that can run code."""
+
+
 def render_code_block(
     args: argparse.Namespace,
     block: FencedBlock,
     doc_location: str,
     nosubtest: bool,
+    is_async: bool = False,
 ) -> str:
     """Generate source to test a Python fenced code block."""
 
     # nosubtest=True means don't wrap block with self.subTest so that
     # failures in blocks rendered in setUpClass don't abort the entire file.
+    # is_async=True means run the block in a coroutine on the event loop.
     template = None
     replacements = {}
     replacements["location"] = doc_location
-    flag_bits = 0
-    if args.progress:
-        flag_bits |= phmutest.printer.SHOW_PROGRESS
-    if args.stdout:
-        flag_bits |= phmutest.printer.SHOW_STDOUT
-    replacements["flags"] = hex(flag_bits)
+    replacements["flags"] = hex(printer_flags(args))
     if nosubtest:
         replacements["subtestcontext"] = "if True:"
     else:
@@ -97,6 +166,11 @@ def render_code_block(
     # and nothing more. So use the unconditional_skip_form and
     # don't put in any of the caller's code block.
     template = select_template_form(block, skipinfo, skipping_output)
+    if template in REFERENCE_FORMS and has_referenced_output(block):
+        template = REFERENCE_FORMS[template]
+    if is_async and template in ASYNC_FORMS:
+        template = ASYNC_FORMS[template]
+        replacements.update(async_replacements(template, block))
 
     if skipinfo:
         replacements["skip"] = phmutest.fillin.justify(template, "$skip", skipinfo.code)
@@ -109,12 +183,57 @@ def render_code_block(
 
         if block.output and not skipping_output:
             replacements["outline"] = str(block.output.line)
-            expected_output = block.get_output_contents()
-            replacements["output"] = phmutest.fillin.chop_final_newline(expected_output)
+            if template in REFERENCE_FORMS.values():
+                built_from, _ = decode_location_string(doc_location)
+                replacements["builtfrom"] = built_from
+            else:
+                expected_output = block.get_output_contents()
+                replacements["output"] = phmutest.fillin.chop_final_newline(
+                    expected_output
+                )
 
     return phmutest.fillin.fill_in(template, replacements)
 
 
+def async_replacements(template: str, block: FencedBlock) -> Dict[str, str]:
+    """Replacements for the keys an async form adds for the names block assigns."""
+    names = nonlocal_names(block.contents)
+    if not names:
+        return {}
+    annotations = "\n".join(f"{name}: object" for name in names)
+    return dict(
+        asyncnames=phmutest.fillin.justify(template, "$asyncnames", annotations),
+        nonlocalnames="nonlocal " + ", ".join(names),
+    )
+
+
+def printer_flags(args: argparse.Namespace) -> int:
+    """Return the Printer flags bits set by the command line args."""
+    flag_bits = 0
+    if args.progress:
+        flag_bits |= phmutest.printer.SHOW_PROGRESS
+    if args.stdout:
+        flag_bits |= phmutest.printer.SHOW_STDOUT
+    if args.trace_memory:
+        flag_bits |= phmutest.printer.TRACE_MEMORY
+    return flag_bits
+
+
+def expected_output(block: FencedBlock) -> Optional[str]:
+    """Return the expected output to check or None if there is nothing to check."""
+    if block.output is None or block.output.has_directive(Marker.SKIP):
+        return None
+    output = phmutest.fillin.chop_final_newline(block.get_output_contents())
+    return output + "\n"
+
+
+def has_referenced_output(block: FencedBlock) -> bool:
+    """Return True if the testfile refers to the block's expected output."""
+    if block.output is None or block.output.has_directive(Marker.SKIP):
+        return False
+    return phmutest.expected.is_referenced(block.get_output_contents())
+
+
 def select_template_form(
     block: FencedBlock,
     skipinfo: Optional[phmutest.skip.SkipInfo],
@@ -179,26 +298,115 @@ def format_code_blocks(
     code_blocks = []
     for block in fileblocks.selected:
         # Exclude setup and teardown blocks since they get handled elsewhere.
-        if not (
-            block.has_directive(Marker.SETUP) or block.has_directive(Marker.TEARDOWN)
-        ):
+        if is_code_block(block):
             code_blocks.append(block)
     for block in code_blocks:
-        doc_location = make_location_string(block, fileblocks.built_from)
-        comment = make_comment_string(doc_location)
-        parts.append(comment)
-        parts.append(
-            render_code_block(
-                args,
-                block,
-                doc_location,
-                nosubtest=False,
-            )
-        )
+        parts.append(format_code_block(args, fileblocks, block))
         parts.append("")
     return "\n".join(parts)
 
 
+def format_code_block(
+    args: argparse.Namespace,
+    fileblocks: phmutest.select.FileBlocks,
+    block: FencedBlock,
+    in_coroutine: bool = False,
+) -> str:
+    """Generate source for one Python example code FCB and its comment line.
+
+    in_coroutine=True means the caller renders the block in a coroutine.
+    Otherwise a block with the async directive is run in its own coroutine.
+    """
+    doc_location = make_location_string(block, fileblocks.built_from)
+    parts = [make_comment_string(doc_location)]
+    parts.append(
+        render_code_block(
+            args,
+            block,
+            doc_location,
+            nosubtest=False,
+            is_async=block.has_directive(Marker.ASYNC) and not in_coroutine,
+        )
+    )
+    return "\n".join(parts)
+
+
+def is_code_block(block: FencedBlock) -> bool:
+    """Return True if the FCB is not a setup or teardown block."""
+    return not (
+        block.has_directive(Marker.SETUP) or block.has_directive(Marker.TEARDOWN)
+    )
+
+
+NESTED_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+# Capture patterns of the match statement. Present in Python 3.10 and later.
+MATCH_CAPTURES = tuple(
+    getattr(ast, name) for name in ["MatchAs", "MatchStar"] if hasattr(ast, name)
+)
+
+
+def bound_names(node: ast.AST) -> List[str]:
+    """Names bound or deleted in the current scope by the AST node."""
+    if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+        return [node.id]
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return [alias.asname or alias.name.split(".")[0] for alias in node.names]
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [node.name]
+    if isinstance(node, (ast.ExceptHandler,) + MATCH_CAPTURES) and node.name:
+        return [node.name]
+    return []
+
+
+def assigned_names(code: str) -> List[str]:
+    """Names assigned or deleted by the top level code of a block.
+
+    These are the names a --block-methods test method declares global.
+    Names in annotated assignments are left out since they can't be declared
+    global. Return an empty list if the code is not valid Python.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    names: Set[str] = set()
+    annotated: Set[str] = set()
+    nodes: List[ast.AST] = [tree]
+    while nodes:
+        node = nodes.pop()
+        for child in ast.iter_child_nodes(node):
+            names.update(bound_names(child))
+            if isinstance(child, ast.AnnAssign) and isinstance(child.target, ast.Name):
+                annotated.add(child.target.id)
+            if isinstance(child, COMPREHENSIONS):
+                # Only an assignment expression binds a name outside a comprehension.
+                for n in ast.walk(child):
+                    if isinstance(n, ast.NamedExpr) and isinstance(n.target, ast.Name):
+                        names.add(n.target.id)
+            elif not isinstance(child, NESTED_SCOPES):
+                nodes.append(child)
+    return sorted(names - annotated - {"*"})
+
+
+def nonlocal_names(code: str) -> List[str]:
+    """Names assigned by the top level code of an async block less its globals.
+
+    These are the names the coroutine that runs the block declares nonlocal.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    declared = {
+        name
+        for node in tree.body
+        if isinstance(node, ast.Global)
+        for name in node.names
+    }
+    return [name for name in assigned_names(code) if name not in declared]
+
+
 def format_setup_blocks(
     args: argparse.Namespace,
     fileblocks: phmutest.select.FileBlocks,
@@ -18,6 +18,9 @@ from phmutest.printer import (
     DIFFS,
     DOC_LOCATION,
     FRAME,
+    MEMORY,
+    NET_MEMORY,
+    PEAK_MEMORY,
     REASON,
     RESULT,
     STDOUT,
@@ -185,6 +188,23 @@ def show_skips(log: Log) -> None:
         show_table(cells)
 
 
+def show_memory(log: Log) -> None:
+    """Print table of memory allocated by blocks, largest peak first."""
+    entries = [item for item in log if item[RESULT] == MEMORY]
+    entries.sort(key=lambda item: int(item[PEAK_MEMORY]), reverse=True)
+    if entries:
+        cells = [["location|label", "peak bytes", "net bytes"]]
+        for item in entries:
+            cells.append([item[DOC_LOCATION], item[PEAK_MEMORY], item[NET_MEMORY]])
+        # right justify the number columns
+        for column in [1, 2]:
+            width = max(len(row[column]) for row in cells)
+            for row in cells:
+                row[column] = row[column].rjust(width)
+        print()
+        show_table(cells)
+
+
 def format_arg(value: object) -> str:
     """Return representation of the value. Show files in posix."""
     if isinstance(value, Path):
@@ -208,13 +228,27 @@ def show_args(args: argparse.Namespace) -> None:
         "fixture",
         "config",
         "replmode",
+        "engine",
+        "block_methods",
+        "threads",
         "color",
         "style",
         "generate",  # When True main.generate_and_run() returns without showing args.
+        "generate_dir",
         "progress",
         "log",
         "summary",
         "stdout",
+        "diff_lines",
+        "full_diff",
+        "trace_memory",
+        "profile",
+        "jsonl",
+        "junitxml",
+        "last_failed",
+        "failed_first",
+        "cache_dir",
+        "bytecode_cache",
         "report",
     ]
 
@@ -240,6 +274,8 @@ def show_log(
     log: Log, highighter: phmutest.syntax.Highlighter, use_color: bool = False
 ) -> None:
     """Print a table of the log entries."""
+    # Remove entries for RESULT values that aren't displayed.
+    log = [entry for entry in log if entry[RESULT] not in [TRACE, FRAME, DIFFS, MEMORY]]
     if log:
         empty_3rd_col = not any([entry[REASON] for entry in log])
         column_title = "location|label"
@@ -249,11 +285,7 @@ def show_log(
             log3 = log2
         else:
             log2 = [[column_title, "result", "reason"]]
-            # Remove entries for RESULT values that aren't displayed.
-            log2a = [
-                entry for entry in log if entry[RESULT] not in [TRACE, FRAME, DIFFS]
-            ]
-            log2.extend(log2a)
+            log2.extend(log)
             # Remove the remaining columns, if present.
             log3 = [row[0:3] for row in log2]
 
@@ -304,6 +336,8 @@ def show_results(
             print()
         show_metrics(phmresult.metrics)
         show_skips(phmresult.log)
+        if args.trace_memory:
+            show_memory(phmresult.log)
 
     if args.log and phmresult.log:
         print()
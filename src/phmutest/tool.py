@@ -1,15 +1,28 @@
 """General purpose tools get fenced code blocks from Markdown."""
 
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import phmutest.direct
 import phmutest.reader
 import phmutest.select
 from phmutest.direct import Marker
 
+NGRAM = 3
+"""Length of the substrings in the FCBChooser contains index."""
+
+MAX_CHOOSERS = 32
+"""Number of FCBChooser instances kept by get_chooser()."""
+
+choosers: "OrderedDict[Tuple[Path, int], FCBChooser]" = OrderedDict()
+"""FCBChooser instances keyed by resolved path and modification time."""
+
+choosers_lock = threading.Lock()
+"""Serializes changes to choosers by get_chooser() calls in different threads."""
+
 
 class FCBChooser:
     """Choose Markdown FCBs matching criteria."""
@@ -24,6 +37,31 @@ class FCBChooser:
         self.all_blocks = phmutest.select.configure_block_roles(
             skips=[], markdown_file=Path(markdown_filename)
         )
+        # Indexes map a label, an info string, or a substring of
+        # NGRAM characters to the positions in all_blocks of the blocks that have it.
+        self.label_index: Dict[str, Set[int]] = {}
+        self.info_string_index: Dict[str, Set[int]] = {}
+        self.ngram_index: Optional[Dict[str, Set[int]]] = None
+        """Built by the first select() with contains."""
+        for position, block in enumerate(self.all_blocks):
+            for directive in block.directives:
+                if directive.type == Marker.LABEL:
+                    self.label_index.setdefault(directive.value, set()).add(position)
+            self.info_string_index.setdefault(block.info_string, set()).add(position)
+
+    def get_ngram_index(self) -> Dict[str, Set[int]]:
+        """Return the NGRAM substrings index. Build it the first time."""
+        if self.ngram_index is None:
+            ngram_index: Dict[str, Set[int]] = {}
+            for position, block in enumerate(self.all_blocks):
+                contents = block.contents
+                for start in range(len(contents) - NGRAM + 1):
+                    ngram = contents[start : start + NGRAM]
+                    ngram_index.setdefault(ngram, set()).add(position)
+            # A chooser kept by get_chooser() may be used by more than one thread.
+            # Assign the finished index so no thread sees a partial one.
+            self.ngram_index = ngram_index
+        return self.ngram_index
 
     def select(
         self, *, label: str = "", info_string: Optional[str] = None, contains: str = ""
@@ -48,26 +86,31 @@ class FCBChooser:
             Empty list if no matches are found.
             Fenced code block strings typically end with a newline.
         """
-        label_blocks = self.all_blocks
-        info_blocks = self.all_blocks
-        contains_blocks = self.all_blocks
+        matches: List[Set[int]] = []
         if label:
-            label_blocks = []
-            for block in self.all_blocks:
-                for directive in block.directives:
-                    if directive.type == Marker.LABEL and directive.value == label:
-                        label_blocks.append(block)
-
+            matches.append(self.label_index.get(label, set()))
         if info_string is not None:
-            info_blocks = [b for b in self.all_blocks if info_string == b.info_string]
-
+            matches.append(self.info_string_index.get(info_string, set()))
         if contains:
-            contains_blocks = [b for b in self.all_blocks if contains in b.contents]
-
-        satisfies_all = set(label_blocks) & set(info_blocks) & set(contains_blocks)
-        selected = list(satisfies_all)
-        selected.sort(key=attrgetter("line"))
-        return [b.contents for b in selected]
+            # Blocks with every NGRAM of contains are candidates.
+            ngrams = {
+                contains[start : start + NGRAM]
+                for start in range(len(contains) - NGRAM + 1)
+            }
+            ngram_index = self.get_ngram_index()
+            matches.extend(ngram_index.get(ngram, set()) for ngram in ngrams)
+        if not matches:
+            positions: Iterable[int] = range(len(self.all_blocks))
+        else:
+            matches.sort(key=len)  # Intersect starting with the fewest blocks.
+            positions = sorted(matches[0].intersection(*matches[1:]))
+        # Check contains for substrings shorter than NGRAM and for
+        # candidates that have the NGRAMs in a different order.
+        return [
+            self.all_blocks[position].contents
+            for position in positions
+            if contains in self.all_blocks[position].contents
+        ]
 
     def contents(self, label: str = "") -> str:
         """Return contents of the labeled fenced code block with label.
@@ -83,8 +126,34 @@ class FCBChooser:
             or empty string if the label is not found. Fenced code block
             strings typically end with a newline.
         """
-        blocks = self.select(label=label)
-        return blocks[0] if blocks else ""
+        positions = self.label_index.get(label)
+        if not positions:
+            return ""
+        return self.all_blocks[min(positions)].contents
+
+
+def get_chooser(markdown_filename: str) -> FCBChooser:
+    """Return a FCBChooser for the Markdown file, reusing a recent one.
+
+    The most recently used choosers are kept. A kept chooser is
+    reused when the file has not been modified since it was created.
+
+    Args:
+        markdown_filename:
+            Path to the Markdown file as a string.
+    """
+    path = Path(markdown_filename).resolve()
+    key = (path, path.stat().st_mtime_ns)
+    with choosers_lock:
+        chooser = choosers.pop(key, None)
+    if chooser is None:
+        chooser = FCBChooser(markdown_filename)  # Parse outside of the lock.
+    with choosers_lock:
+        choosers.pop(key, None)
+        if len(choosers) == MAX_CHOOSERS:
+            choosers.popitem(last=False)  # Discard the least recently used.
+        choosers[key] = chooser
+    return chooser
 
 
 @dataclass
@@ -152,3 +221,49 @@ def fenced_code_blocks(markdown_filename: str) -> List[str]:
     """
     fcbnodes = phmutest.reader.fcb_nodes(markdown_filename)
     return [node.payload for node in fcbnodes]
+
+
+def labeled_fenced_code_blocks_in_files(
+    paths: Iterable[str],
+) -> Iterator[Tuple[str, LabeledFCB]]:
+    """Generate (path, LabeledFCB) for the labeled blocks of many Markdown files.
+
+    Each file is parsed when the generator gets to it. Results are
+    generated in the order of paths and in file order within a file.
+    A file kept by get_chooser() is not parsed again. The files parsed
+    here are not kept so a large batch doesn't discard the kept files.
+
+    Args:
+        paths
+            Markdown file paths or glob patterns relative to the
+            current working directory. A file is only parsed once.
+
+    Returns:
+        Generator of tuples of the Markdown file path as a string
+        and a LabeledFCB. The LabeledFCB is the same as one returned by
+        labeled_fenced_code_blocks().
+    """
+    filenames: Dict[str, None] = {}
+    for pattern in paths:
+        if any(c in pattern for c in "*?["):
+            matches = sorted(p.as_posix() for p in Path(".").glob(pattern))
+        else:
+            matches = [pattern]
+        filenames.update(dict.fromkeys(matches))
+
+    for filename in filenames:
+        path = Path(filename).resolve()
+        with choosers_lock:
+            chooser = choosers.get((path, path.stat().st_mtime_ns))
+        if chooser is None:
+            chooser = FCBChooser(filename)
+        for block in chooser.all_blocks:
+            labels = [d for d in block.directives if d.type == Marker.LABEL]
+            if labels:
+                directive = labels[0]  # Directives are in file order.
+                labeled = LabeledFCB(
+                    label=directive.value,
+                    line=str(directive.line),
+                    contents=block.contents,
+                )
+                yield filename, labeled
@@ -2,12 +2,12 @@
 import unittest
 
 from phmutest.globs import Globals as _phmGlobals
+from phmutest.outputcheck import OutputChecker as _phmOutputChecker
 from phmutest.printer import Printer as _phmPrinter
 from phmutest.systool import sys_tool as _phm_sys
 
 _phm_globals = None
-_phm_testcase = unittest.TestCase()
-_phm_testcase.maxDiff = None
+_phm_testcase = _phmOutputChecker()
 _phm_log = []
 _phmPrinter.testfile_name = None
 
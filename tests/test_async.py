@@ -0,0 +1,128 @@
+"""Test blocks that use top level await enabled by the async directive."""
+
+import phmutest.main
+import phmutest.summary
+
+share1 = """\
+<!--phmutest-async-->
+```python
+import asyncio
+
+loop = asyncio.get_running_loop()
+future = loop.create_future()
+```
+"""
+
+share2 = """\
+<!--phmutest-async-->
+```python
+loop.call_soon(future.set_result, "done")
+print(await future)
+```
+
+```
+done
+```
+"""
+
+
+def test_async_blocks():
+    """Blocks in the file run in a coroutine on an event loop."""
+    phmresult = phmutest.main.command("tests/md/async.md --log")
+    want = phmutest.summary.Metrics(
+        number_blocks_run=3,
+        passed=3,
+        failed=0,
+        skipped=0,
+        suite_errors=0,
+        number_of_files=1,
+        files_with_no_blocks=0,
+        number_of_deselected_blocks=0,
+    )
+    assert want == phmresult.metrics
+    assert phmresult.is_success is True
+
+
+def test_generate(tmp_path):
+    """Each async block is a coroutine run by phmutest.asyncrun."""
+    outfile = tmp_path / "test_async.py"
+    assert phmutest.main.command(f"tests/md/async.md --generate {outfile}") is None
+    text = outfile.read_text(encoding="utf-8")
+    assert "from phmutest.asyncrun import run as _phm_async_run\n" in text
+    assert "        self.addCleanup(_phm_async_close)\n" in text
+    assert text.count("            async def _phm_async_block():\n") == 3
+    assert "                nonlocal asyncio, fetch\n" in text
+    assert text.count("_phm_async_run(_phm_async_block(), shared=True)\n") == 3
+
+
+mixed = """\
+```python
+import asyncio
+
+
+async def double(value):
+    await asyncio.sleep(0)
+    return value * 2
+
+
+print(asyncio.run(double(1)))
+```
+
+```
+2
+```
+
+<!--phmutest-async-->
+```python
+doubled = await double(2)
+print(doubled)
+```
+
+```
+4
+```
+
+```python
+assert asyncio.run(double(doubled)) == 8
+```
+"""
+
+
+def test_sync_blocks_not_on_loop(tmp_path):
+    """Only async blocks run on the event loop. Others can call asyncio.run()."""
+    path = tmp_path / "mixed.md"
+    path.write_text(mixed, encoding="utf-8")
+    for engine in ["unittest", "direct"]:
+        phmresult = phmutest.main.command(f"{path} --engine {engine} --log")
+        assert phmresult.is_success is True
+        assert phmresult.metrics.passed == 3
+    phmresult = phmutest.main.command(f"{path} --block-methods --log")
+    assert phmresult.is_success is True
+    assert phmresult.metrics.passed == 3
+
+
+def test_share_across_files(tmp_path):
+    """Files that share names across files run on the same event loop."""
+    path1 = tmp_path / "share1.md"
+    path1.write_text(share1, encoding="utf-8")
+    path2 = tmp_path / "share2.md"
+    path2.write_text(share2, encoding="utf-8")
+    line = f"{path1} {path2} --share-across-files {path1} --log"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success is True
+    assert phmresult.metrics.passed == 2
+
+
+def test_separate_loops(tmp_path):
+    """Without sharing each file gets a new event loop."""
+    path1 = tmp_path / "loop1.md"
+    path1.write_text(share1 + "\n" + share2, encoding="utf-8")
+    path2 = tmp_path / "loop2.md"
+    path2.write_text(
+        "<!--phmutest-async-->\n```python\nimport asyncio\n"
+        "assert asyncio.get_running_loop().is_running()\n```\n",
+        encoding="utf-8",
+    )
+    phmresult = phmutest.main.command(f"{path1} {path2} --log")
+    assert phmresult.is_success is True
+    assert phmresult.metrics.passed == 3
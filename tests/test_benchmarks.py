@@ -0,0 +1,63 @@
+"""Smoke test the benchmarks on a tiny synthetic corpus."""
+
+import copy
+import json
+from pathlib import Path
+
+import benchmarks.bench
+import benchmarks.memory
+import phmutest.reader
+from benchmarks.corpus import CorpusShape, write_corpus
+from phmutest.fenced import Role
+from phmutest.reader import NodeType
+
+
+def test_corpus(tmp_path):
+    """Check the corpus has the requested blocks and directives."""
+    shape = CorpusShape(files=2, blocks=6, directive_density=1.0)
+    paths = write_corpus(shape, tmp_path)
+    assert len(paths) == 2
+    pipeline = benchmarks.bench.make_pipeline(paths)
+    for path in paths:
+        fileblocks = pipeline.block_store.get_blocks(path)
+        assert len(fileblocks.selected) == 6
+        assert all(b.directives for b in fileblocks.selected)
+        assert all(b.role == Role.CODE for b in fileblocks.selected)
+
+
+def test_run_and_compare(tmp_path, capsys):
+    """Time every stage and write JSON. Slowed down results are regressions."""
+    outfile = tmp_path / "results.json"
+    argv = ["--files", "2", "--blocks", "3", "--repeat", "1", "--json", str(outfile)]
+    assert benchmarks.bench.main(argv) == 0
+    results = json.loads(Path(outfile).read_text(encoding="utf-8"))
+    assert list(results["stages"]) == list(benchmarks.bench.STAGES)
+    assert results["corpus"]["files"] == 2
+    assert results["repeat"] == 1
+    output = capsys.readouterr().out
+    assert "phmutest.main.command" in output
+
+    assert benchmarks.bench.compare(results, results, tolerance=0.0) == []
+    slower = copy.deepcopy(results)
+    slower["stages"]["phmutest.cases.testfile"]["best"] *= 2.0
+    regressions = benchmarks.bench.compare(slower, results, tolerance=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("phmutest.cases.testfile")
+
+
+def test_memory(tmp_path, capsys):
+    """Scanning uses less memory than reading all nodes. Classes are slotted."""
+    outfile = tmp_path / "memory.json"
+    argv = ["--files", "2", "--blocks", "40", "--json", str(outfile)]
+    assert benchmarks.memory.main(argv) == 0
+    results = json.loads(Path(outfile).read_text(encoding="utf-8"))
+    peaks = results["peak_bytes"]
+    assert peaks["phmutest.select.BlockStore"] < peaks["read_markdown + fenced.convert"]
+    assert set(results["instance_bytes"]) == {
+        "phmutest.reader.DocNode",
+        "phmutest.fenced.FencedBlock",
+        "phmutest.direct.Directive",
+    }
+    assert "peak bytes" in capsys.readouterr().out
+    node = phmutest.reader.DocNode.from_scan(NodeType.BLANK_LINE, 0, 0, 1, 1)
+    assert not hasattr(node, "__dict__")
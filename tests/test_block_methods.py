@@ -0,0 +1,120 @@
+"""Test --block-methods generates a test method for each code block."""
+
+import contextlib
+import io
+
+import pytest
+
+import phmutest.main
+import phmutest.subtest
+from phmutest.printer import RESULT
+
+RESULTS = ["pass", "failed", "error", "skip", "noblocks"]
+
+
+def run_quietly(line):
+    """Run phmutest command line. Discard what is printed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            return phmutest.main.command(line)
+
+
+def results(phmresult):
+    """Location and result of the block log entries."""
+    return [entry[:2] for entry in phmresult.log if entry[RESULT] in RESULTS]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "--config tests/toml/project.toml",
+        "tests/md/tracer.md",
+        "tests/md/directive1.md tests/md/directive2.md",
+        "tests/md/async.md",
+        "--config tests/toml/acrossfiles.toml",
+        "docs/share/file1.md docs/share/file2.md docs/share/file3.md"
+        " --share-across-files docs/share/file1.md docs/share/file2.md",
+        "docs/fix/code/globdemo.md --fixture docs.fix.code.globdemo.init_globals",
+        "tests/md/project.md --fixture tests.test_fixturescope.block_fixture",
+    ],
+)
+def test_same_results(line):
+    """The metrics and block results are the same as with one tests method."""
+    want = run_quietly(line)
+    got = run_quietly(line + " --block-methods")
+    assert got.metrics == want.metrics
+    assert results(got) == results(want)
+
+
+def test_methods(tmp_path):
+    """Each block is a test. Names carry over to later blocks but not other files."""
+    path1 = tmp_path / "file1.md"
+    path1.write_text(
+        "```python\n"
+        "import os.path\n"
+        "x = 1\n"
+        "```\n"
+        "\n"
+        "```python\n"
+        "x = x + 1\n"
+        "del os\n"
+        "```\n"
+        "\n"
+        "```python\n"
+        "assert x == 2\n"
+        "```\n",
+        encoding="utf-8",
+    )
+    path2 = tmp_path / "file2.md"
+    path2.write_text("```python\nassert 'x' not in globals()\n```\n", encoding="utf-8")
+    phmresult = run_quietly(f"{path1} {path2} --block-methods")
+    assert phmresult.is_success
+    assert phmresult.metrics.passed == 4
+    assert phmresult.test_program.result.testsRun == 4
+
+
+def test_generated_method(tmp_path):
+    """The method declares the assigned names global and keeps track of them."""
+    path = tmp_path / "example.md"
+    path.write_text("```python\nvalue = 3\n```\n", encoding="utf-8")
+    outfile = tmp_path / "gencode.py"
+    phmutest.main.command(f"{path} --block-methods --generate {outfile}")
+    testfile = outfile.read_text(encoding="utf-8")
+    assert "    def test_1(self):\n        global value\n" in testfile
+    assert 'self.global_names.update_assigned(["value"], built_from=' in testfile
+    assert "def tests(self)" not in testfile
+
+
+def test_assigned_names():
+    """Names bound by the top level code of a block."""
+    code = (
+        "import os.path, sys as system\n"
+        "from json import dumps as d\n"
+        "counter: int = 0\n"
+        "for i in range(3):\n"
+        "    squares = [k * k for k in range(i) if (last := k)]\n"
+        "def f(arg):\n"
+        "    local = 1\n"
+        "class C:\n"
+        "    attribute = 2\n"
+        "try:\n"
+        "    pass\n"
+        "except ValueError as e:\n"
+        "    pass\n"
+        "del gone\n"
+        "a.b, c[0] = 1, 2\n"
+        "print(await g())\n"
+    )
+    assert phmutest.subtest.assigned_names(code) == [
+        "C",
+        "d",
+        "e",
+        "f",
+        "gone",
+        "i",
+        "last",
+        "os",
+        "squares",
+        "system",
+    ]
+    assert phmutest.subtest.assigned_names("x = (") == []
@@ -0,0 +1,200 @@
+"""Test --last-failed and --failed-first using the failures saved in the cache."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import phmutest.cache
+import phmutest.main
+from phmutest.printer import DOC_LOCATION, RESULT
+
+
+@pytest.fixture()
+def cache_dir(tmp_path, monkeypatch):
+    """Put the .phmutest_cache directory made by the test in a temporary directory."""
+    directory = tmp_path / ".phmutest_cache"
+    monkeypatch.setattr(phmutest.cache, "CACHE_DIR", directory)
+    return directory
+
+
+def files_in_log(phmresult):
+    """Markdown files in the order they appear in the log."""
+    files = []
+    for entry in phmresult.log:
+        built_from = entry[DOC_LOCATION].split(":")[0]
+        if built_from not in files:
+            files.append(built_from)
+    return files
+
+
+def test_save_last_failed(cache_dir):
+    """Failed and error block lines are saved. The cache is ignored by git."""
+    _ = phmutest.main.command("tests/md/example1.md tests/md/tracer.md --failed-first")
+    saved = json.loads((cache_dir / "lastfailed.json").read_text(encoding="utf-8"))
+    assert saved == {"tests/md/tracer.md": [57, 71, 90, 101]}
+    assert (cache_dir / ".gitignore").read_text(encoding="utf-8") == "*\n"
+
+    # Failures of files not tested are kept. A passing file is removed.
+    _ = phmutest.main.command("tests/md/directive1.md --last-failed")
+    saved = json.loads((cache_dir / "lastfailed.json").read_text(encoding="utf-8"))
+    assert list(saved) == ["tests/md/directive1.md", "tests/md/tracer.md"]
+    failures = phmutest.cache.read_last_failed(cache_dir)
+    assert failures["tests/md/directive1.md"] == [50]
+
+
+def test_nothing_to_save(cache_dir):
+    """The cache is not created when nothing failed."""
+    line = "tests/md/example1.md --engine direct --last-failed"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert not cache_dir.exists()
+
+
+def test_not_saved_without_option(cache_dir):
+    """Without --last-failed, --failed-first, or --bytecode-cache nothing is written."""
+    phmresult = phmutest.main.command("tests/md/tracer.md")
+    assert not phmresult.is_success
+    assert not cache_dir.exists()
+
+
+def test_cache_not_writable(tmp_path, monkeypatch, capsys):
+    """The run still returns its result when the failures can't be saved."""
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("", encoding="utf-8")
+    monkeypatch.setattr(phmutest.cache, "CACHE_DIR", not_a_dir / ".phmutest_cache")
+    line = "tests/md/tracer.md --engine direct --last-failed"
+    phmresult = phmutest.main.command(line)
+    assert not phmresult.is_success
+    assert "Failed blocks not saved for --last-failed." in capsys.readouterr().err
+
+
+def test_last_failed(cache_dir):
+    """Only the file with failures is tested up to its last failed block."""
+    _ = phmutest.main.command("tests/md/example1.md tests/md/tracer.md --last-failed")
+    line = "tests/md/example1.md tests/md/tracer.md --last-failed"
+    phmresult = phmutest.main.command(line)
+    assert files_in_log(phmresult) == ["tests/md/tracer.md"]
+    assert phmresult.metrics.number_blocks_run == 7
+    assert phmresult.metrics.number_of_deselected_blocks == 0
+
+
+def test_last_failed_deselects_later_blocks(cache_dir):
+    """Blocks after the last failed block are deselected."""
+    phmutest.cache.cache_path(cache_dir, phmutest.cache.LAST_FAILED).write_text(
+        '{"tests/md/tracer.md": [57]}', encoding="utf-8"
+    )
+    phmresult = phmutest.main.command("tests/md/tracer.md --last-failed")
+    results = [entry[RESULT] for entry in phmresult.log if len(entry) >= 3]
+    assert results[:3] == ["pass", "pass", "failed"]
+    assert phmresult.metrics.number_of_deselected_blocks == 4
+
+
+def test_last_failed_none_failed(cache_dir):
+    """All files are tested when nothing failed in the last run."""
+    _ = phmutest.main.command("tests/md/example1.md --last-failed")
+    phmresult = phmutest.main.command("tests/md/example1.md --last-failed")
+    assert phmresult.is_success
+    assert files_in_log(phmresult) == ["tests/md/example1.md"]
+
+
+def test_failed_first(cache_dir):
+    """The file with failures is tested first."""
+    _ = phmutest.main.command("tests/md/example1.md tests/md/tracer.md --failed-first")
+    line = "tests/md/example1.md tests/md/tracer.md --failed-first"
+    phmresult = phmutest.main.command(line)
+    assert files_in_log(phmresult) == ["tests/md/tracer.md", "tests/md/example1.md"]
+
+
+def test_last_failed_keeps_sharing_files(cache_dir):
+    """Files sharing names to a failed file are kept and not reordered."""
+    files = [Path("docs/share/file1.md"), Path("docs/share/file2.md")]
+    files.append(Path("docs/share/file3.md"))
+    phmutest.cache.cache_path(cache_dir, phmutest.cache.LAST_FAILED).write_text(
+        '{"docs/share/file2.md": [10]}', encoding="utf-8"
+    )
+    parser = phmutest.main.main_argparser()
+    argv = [str(f) for f in files] + ["--last-failed", "--failed-first"]
+    argv += ["--share-across-files"] + [str(f) for f in files]
+    args = parser.parse_args(argv)
+    last_lines = phmutest.cache.select_files(args)
+    assert args.files == files[:2]
+    assert args.share_across_files == files[:2]
+    assert last_lines == {files[1]: 10}
+
+
+def test_compile_cached(cache_dir, monkeypatch):
+    """Code compiled once is loaded from the cache with the new filename."""
+    bytecode = phmutest.cache.BytecodeCache(cache_dir / "bytecode")
+    source = "\n\nclass Test001:\n    def tests(self):\n        return 1\n"
+    code = bytecode.compile(source, "first.py")
+    assert code.co_filename == "first.py"
+    assert len(list((cache_dir / "bytecode").glob("*.bin"))) == 1
+    assert (cache_dir / ".gitignore").read_text(encoding="utf-8") == "*\n"
+
+    def no_compile(*args):  # pragma: no cover
+        raise AssertionError("compile() not expected")
+
+    monkeypatch.setattr(phmutest.cache, "compile", no_compile, raising=False)
+    cached = bytecode.compile(source, "second.py")
+    namespace = {}
+    exec(cached, namespace)
+    method = namespace["Test001"].tests
+    assert method.__code__.co_filename == "second.py"
+    assert method.__code__.co_firstlineno == 4
+    assert method(None) == 1
+
+
+def test_compile_cached_corrupt(cache_dir):
+    """A corrupt cache file is replaced."""
+    bytecode = phmutest.cache.BytecodeCache(cache_dir / "bytecode")
+    source = "x = 1\n"
+    _ = bytecode.compile(source, "a.py")
+    path = next((cache_dir / "bytecode").glob("*.bin"))
+    path.write_bytes(b"\xff")
+    code = bytecode.compile(source, "b.py")
+    assert code.co_filename == "b.py"
+    namespace = {}
+    exec(code, namespace)
+    assert namespace["x"] == 1
+
+
+def test_prune(cache_dir, monkeypatch):
+    """Least recently used code over the limit is removed when the run is done."""
+    monkeypatch.setattr(phmutest.cache, "BYTECODE_ENTRIES", 2)
+    bytecode = phmutest.cache.BytecodeCache(cache_dir / "bytecode")
+    paths = []
+    for number in range(3):
+        _ = bytecode.compile(f"x = {number}\n", "a.py")
+        for path in (cache_dir / "bytecode").glob("*.bin"):
+            if path not in paths:
+                paths.append(path)
+                os.utime(path, (number, number))  # Older than the next entry.
+    assert len(list((cache_dir / "bytecode").glob("*.bin"))) == 3
+    bytecode.prune()
+    remaining = list((cache_dir / "bytecode").glob("*.bin"))
+    assert len(remaining) == 2
+    assert paths[0] not in remaining
+
+
+def test_cache_dir_option(tmp_path, cache_dir):
+    """--cache-dir sets the directory. --bytecode-cache keeps compiled code there."""
+    directory = tmp_path / "other" / "cache"
+    line = f"tests/md/tracer.md --cache-dir {directory} --last-failed"
+    _ = phmutest.main.command(line)
+    assert (directory / "lastfailed.json").exists()
+    assert not (directory / "bytecode").exists()
+    _ = phmutest.main.command(line + " --bytecode-cache")
+    assert list((directory / "bytecode").glob("*.bin"))
+    assert not cache_dir.exists()
+
+
+def test_bytecode_not_writable(tmp_path):
+    """Test classes are compiled when the cache can't be written."""
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("", encoding="utf-8")
+    bytecode = phmutest.cache.BytecodeCache(not_a_dir / "cache" / "bytecode")
+    code = bytecode.compile("x = 1\n", "a.py")
+    assert code.co_filename == "a.py"
+    assert bytecode.directory is None
@@ -8,6 +8,7 @@ import unittest
 import phmutest.cases
 import phmutest.fillin
 import phmutest.main
+import phmutest.select
 import phmutest.subtest
 import phmutest.summary
 
@@ -331,3 +332,32 @@ def test_progress_option():
         assert "tearDownModule()..." in lines[4]
         assert "leaving tearDownModule." in lines[5]
     err.close()
+
+
+def test_lazy_testfile():
+    """Test classes generated one at a time make the same text as testfile()."""
+    line = "tests/md/project.md tests/md/example1.md --fixture tests.fixture.x"
+    known_args = phmutest.main.main_argparser().parse_known_args(line.split())
+    args = known_args[0]
+    block_store = phmutest.select.BlockStore(args)
+    text, markdown_map = phmutest.cases.testfile(args, block_store)
+    lazy = phmutest.cases.LazyTestfile(args, block_store)
+    lazy_text = lazy.header
+    for name in lazy.class_names:
+        _, class_text = lazy.render_class(name)
+        lazy_text += class_text
+    assert lazy_text == text + "\n"
+    assert lazy.markdown_map.ranges() == markdown_map.ranges()
+
+
+def test_write_testfile(tmp_path):
+    """Streaming the testfile to a file writes the same text as testfile()."""
+    args = phmutest.main.main_argparser().parse_args(["tests/md/project.md"])
+    block_store = phmutest.select.BlockStore(args)
+    text, markdown_map = phmutest.cases.testfile(args, block_store)
+    path = tmp_path / "testfile.py"
+    with open(path, "w", encoding="utf-8") as f:
+        written_map = phmutest.cases.write_testfile(args, block_store, f)
+    assert path.read_text(encoding="utf-8") == text
+    assert not text.endswith("\n\n")
+    assert written_map.ranges() == markdown_map.ranges()
@@ -394,3 +394,60 @@ def test_style_override():
     assert len(args.files) == 2
     assert args.style == "dracula"
     settings = get_settings(commandline_args)
+
+
+def test_walk_globs_matches_path_glob():
+    """A single walk selects the same files as Path.glob() for each glob."""
+    include_globs = ["docs/**/*.md", "tests/md/[!a-m]*.md", "*.md"]
+    exclude_globs = ["tests/md/unexpected_*.md", "docs/fix/**/*"]
+    walk = phmutest.config.walk_globs(include_globs, exclude_globs)
+    working_directory = Path(".")
+    excluded = set()
+    for glob in exclude_globs:
+        excluded.update(working_directory.glob(glob))
+    want = []
+    for glob in include_globs:
+        want.extend(p for p in working_directory.glob(glob) if p not in excluded)
+    assert sorted(walk.files) == sorted(want)
+    # Files are grouped by the first include glob they match.
+    docs = [p for p in walk.files if p.parts[0] == "docs"]
+    assert walk.files[: len(docs)] == docs
+    # Only the directories that could hold a selected file were walked.
+    assert "./docs/fix" not in walk.directories
+    assert "./src" not in walk.directories
+    assert "./tests/md" in walk.directories
+
+
+def test_select_files_reuses_walk(tmp_path, monkeypatch):
+    """The recorded walk is reused until a file is added."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.md").write_text("# a\n", encoding="utf-8")
+    (tmp_path / "pyproject.toml").write_text(
+        '[tool.phmutest]\ninclude-globs = ["*.md", "*.md"]\n', encoding="utf-8"
+    )
+    parser = phmutest.main.main_argparser()
+    args = parser.parse_args(["--config", "pyproject.toml"])
+    toml = phmutest.config.ConfigSection(args)
+    assert toml.select_files() == [Path("a.md")]
+    walk = next(w for k, w in phmutest.config.walks.items() if k[0] == str(tmp_path))
+    assert toml.select_files() == [Path("a.md")]  # A file is only selected once.
+    assert walk.is_current()
+    (tmp_path / "b.md").write_text("# b\n", encoding="utf-8")
+    assert not walk.is_current()
+    assert toml.select_files() == [Path("a.md"), Path("b.md")]
+
+
+@pytest.mark.parametrize("ignore_case", [False, True])
+def test_walk_globs_case(tmp_path, monkeypatch, ignore_case):
+    """Globs match case insensitively where file names are, like on Windows."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Docs").mkdir()
+    (tmp_path / "Docs" / "Guide.MD").write_text("# guide\n", encoding="utf-8")
+    (tmp_path / "README.md").write_text("# readme\n", encoding="utf-8")
+    if ignore_case:
+        monkeypatch.setattr(phmutest.config.os.path, "normcase", str.lower)
+    walk = phmutest.config.walk_globs(["docs/*.md", "readme.md"], ["DOCS/x*"])
+    if ignore_case:
+        assert walk.files == [Path("Docs/Guide.MD"), Path("README.md")]
+    else:
+        assert walk.files == []
@@ -0,0 +1,129 @@
+"""Test --engine direct runs the blocks the same as the generated testfile."""
+
+import contextlib
+import io
+
+import pytest
+
+import phmutest.main
+from phmutest.printer import (
+    DOC_LOCATION,
+    EXCEPTION_LINE,
+    FRAME,
+    RESULT,
+    TESTFILE_BLOCK_START_LINE,
+)
+from tests.test_fixturescope import block_md, locations
+
+RESULTS = ["pass", "failed", "error", "skip", "noblocks"]
+
+
+def run_quietly(line):
+    """Run phmutest command line. Discard what is printed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            return phmutest.main.command(line)
+
+
+def results(phmresult):
+    """Location and result of the block log entries."""
+    return [entry[:2] for entry in phmresult.log if entry[RESULT] in RESULTS]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "--config tests/toml/project.toml",
+        "tests/fail/raiser.md",
+        "tests/fail/raiser.md -f",
+        "tests/md/directive1.md tests/md/directive2.md",
+        "tests/md/optionflags.md --skip floor",
+        "tests/md/async.md",
+        "--config tests/toml/acrossfiles.toml",
+        "docs/share/file1.md docs/share/file2.md docs/share/file3.md"
+        " --share-across-files docs/share/file1.md docs/share/file2.md",
+        "docs/fix/code/globdemo.md --fixture docs.fix.code.globdemo.init_globals",
+        "tests/md/project.md --fixture tests.test_errors.badfixture",
+    ],
+)
+def test_same_as_unittest(line):
+    """The metrics and block results are the same as with the generated testfile."""
+    want = run_quietly(line)
+    got = run_quietly(line + " --engine direct")
+    assert got.test_program is None
+    assert got.metrics == want.metrics
+    assert got.is_success == want.is_success
+    assert results(got) == results(want)
+
+
+def test_markdown_line_numbers():
+    """Exception line numbers in the log are Markdown line numbers."""
+    phmresult = run_quietly("tests/fail/raiser.md --engine direct")
+    error = [entry for entry in phmresult.log if entry[RESULT] == "error"][0]
+    assert error[DOC_LOCATION] == "tests/fail/raiser.md:28"
+    assert error[TESTFILE_BLOCK_START_LINE] == "28"
+    assert error[EXCEPTION_LINE] == "29"
+    # The expected output check is after the last line of the block.
+    failed = [entry for entry in phmresult.log if entry[RESULT] == "failed"][0]
+    assert failed[DOC_LOCATION] == "tests/fail/raiser.md:42 o"
+    assert failed[EXCEPTION_LINE] == "44"
+
+
+def test_frames_and_syntax_error(tmp_path, capsys):
+    """A deeper frame is logged at its block. A syntax error is one block's error."""
+    path = tmp_path / "frames.md"
+    path.write_text(
+        "```python\n"
+        "def add_a(x):\n"
+        '    return x + "a"\n'
+        "```\n"
+        "\n"
+        "```python\n"
+        "y = add_a(1)\n"
+        "```\n"
+        "\n"
+        "```python\n"
+        "y = (\n"
+        "```\n"
+        "\n"
+        "```python\n"
+        "z = 1\n"
+        "```\n",
+        encoding="utf-8",
+    )
+    phmresult = phmutest.main.command(f"{path} --engine direct")
+    location = path.as_posix()
+    assert results(phmresult) == [
+        [f"{location}:1", "pass"],
+        [f"{location}:6", "error"],
+        [f"{location}:10", "error"],
+        [f"{location}:14", "pass"],
+    ]
+    assert [f"{location}:1", FRAME, "", "1", "3"] in phmresult.log
+    assert phmresult.metrics.suite_errors == 2
+    # Tracebacks show the Markdown file.
+    assert f'File "{path}", line 7, in <module>' in capsys.readouterr().err
+
+
+def test_file_scope_fixture(tmp_path):
+    """A file scope fixture is called again before the second file."""
+    path1 = tmp_path / "file1.md"
+    path1.write_text(block_md.format(1), encoding="utf-8")
+    path2 = tmp_path / "file2.md"
+    path2.write_text(block_md.format(2), encoding="utf-8")
+    line = (
+        f"{path1} {path2} --fixture tests.test_fixturescope.file_fixture"
+        " --engine direct"
+    )
+    phmresult = run_quietly(line)
+    assert phmresult.is_success
+    assert locations(phmresult) == [
+        "setUpModule",
+        "fixture call",
+        f"{path1.as_posix()}:1 o",
+        "fixture cleanup",
+        "fixture call",
+        f"{path2.as_posix()}:1 o",
+        "tearDownModule",
+        "fixture cleanup",
+    ]
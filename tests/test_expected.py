@@ -0,0 +1,137 @@
+"""Test expected output loaded by reference instead of written into the testfile."""
+
+import contextlib
+import io
+import os
+from unittest import mock
+
+import pytest
+
+import phmutest.expected
+import phmutest.main
+import phmutest.reader
+from phmutest.printer import RESULT
+from tests.test_generate import run_generated_modules
+
+RESULTS = ["pass", "failed", "error", "skip", "noblocks"]
+
+
+def run_quietly(line):
+    """Run phmutest command line. Discard what is printed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            return phmutest.main.command(line)
+
+
+def results(phmresult):
+    """Location and result of the block log entries."""
+    return [entry[:2] for entry in phmresult.log if entry[RESULT] in RESULTS]
+
+
+def write_big_output(path, printed_rows):
+    """Write Markdown with a block that prints more than INLINE_LIMIT characters."""
+    rows = "".join(f"row {n:05d} " + "x" * 40 + "\n" for n in range(200))
+    path.write_text(
+        "```python\n"
+        f"for n in range({printed_rows}):\n"
+        "    print(f'row {n:05d} ' + 'x' * 40)\n"
+        "```\n"
+        "```\n"
+        f"{rows}"
+        "```\n",
+        encoding="utf-8",
+    )
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "tests/md/project.md",
+        "tests/md/directive1.md",
+        "tests/md/cases.md",
+        "tests/md/directive1.md --block-methods",
+        "--config tests/toml/acrossfiles.toml",
+    ],
+)
+def test_same_results(line):
+    """Results are the same when every expected output is loaded by reference."""
+    want = run_quietly(line)
+    with mock.patch("phmutest.expected.INLINE_LIMIT", 0):
+        got = run_quietly(line)
+    assert phmutest.expected.block_store is None
+    assert got.metrics == want.metrics
+    assert results(got) == results(want)
+
+
+def test_big_output(tmp_path):
+    """Big expected output is checked but not written into the testfile."""
+    path = tmp_path / "big.md"
+    write_big_output(path, printed_rows=200)
+    phmresult = run_quietly(f"{path}")
+    assert phmresult.is_success
+    assert phmresult.metrics.passed == 1
+
+    outfile = tmp_path / "gencode.py"
+    phmutest.main.command(f"{path} --generate {outfile}")
+    testfile = outfile.read_text(encoding="utf-8")
+    assert "row 00000" not in testfile
+    assert f'_phm_expected_output("{path.as_posix()}", 5)' in testfile
+
+    write_big_output(path, printed_rows=199)
+    phmresult = run_quietly(f"{path}")
+    assert phmresult.metrics.failed == 1
+
+
+def test_generated_module_reads_markdown(tmp_path):
+    """A generated module run later reads the expected output from the Markdown."""
+    path = tmp_path / "big.md"
+    write_big_output(path, printed_rows=200)
+    gendir = tmp_path / "gen"
+    assert phmutest.main.command(f"{path} --generate-dir {gendir}") is None
+    result = run_generated_modules(gendir)
+    assert result.wasSuccessful()
+    assert result.testsRun == 1
+
+
+def test_not_a_block(tmp_path):
+    """The Markdown file no longer has a block at the line."""
+    path = tmp_path / "big.md"
+    write_big_output(path, printed_rows=200)
+    assert phmutest.expected.expected_output(path.as_posix(), 5).startswith("row 0")
+    with pytest.raises(ValueError, match="is not a fenced code block"):
+        _ = phmutest.expected.expected_output(path.as_posix(), 6)
+
+
+def test_each_file_read_once(tmp_path):
+    """Looking up output blocks of files in turn reads each file once."""
+    paths = [tmp_path / "big1.md", tmp_path / "big2.md"]
+    for path in paths:
+        write_big_output(path, printed_rows=200)
+    fcb_nodes = mock.Mock(wraps=phmutest.reader.fcb_nodes)
+    with mock.patch("phmutest.reader.fcb_nodes", fcb_nodes):
+        for _ in range(3):
+            for path in paths:
+                assert phmutest.expected.expected_output(path.as_posix(), 5)
+    assert fcb_nodes.call_count == 2
+
+
+def test_edited_file_read_again(tmp_path):
+    """A Markdown file changed since it was read is read again."""
+    path = tmp_path / "big.md"
+    write_big_output(path, printed_rows=200)
+    assert phmutest.expected.expected_output(path.as_posix(), 5).startswith("row 0")
+    text = path.read_text(encoding="utf-8")
+    path.write_text(text.replace("row", "ROW"), encoding="utf-8")
+    os.utime(path, ns=(0, 0))
+    assert phmutest.expected.expected_output(path.as_posix(), 5).startswith("ROW 0")
+
+
+def test_markdown_files_limit(tmp_path, monkeypatch):
+    """Only the most recently read Markdown files are kept."""
+    monkeypatch.setattr(phmutest.expected, "MARKDOWN_FILES", 2)
+    monkeypatch.setattr(phmutest.expected, "_markdown_fcbs", {})
+    paths = [tmp_path / f"big{n}.md" for n in range(3)]
+    for path in paths:
+        write_big_output(path, printed_rows=200)
+        _ = phmutest.expected.expected_output(path.as_posix(), 5)
+    assert list(phmutest.expected._markdown_fcbs) == [p.as_posix() for p in paths[1:]]
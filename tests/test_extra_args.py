@@ -2,7 +2,11 @@
 
 import pytest
 
+import phmutest.cases
+import phmutest.code
+import phmutest.config
 import phmutest.main
+import phmutest.select
 import phmutest.summary
 
 
@@ -181,3 +185,19 @@ def test_replmode_failfast():
     )
     assert want == phmresult.metrics
     assert phmresult.is_success is False
+
+
+def test_failfast():
+    """unittest -f stops before test classes for later files are generated."""
+    parser = phmutest.main.main_argparser()
+    line = "tests/md/unexpected_output.md tests/md/project.md -f"
+    known_args = parser.parse_known_args(line.split())
+    settings = phmutest.config.get_settings(known_args)
+    block_store = phmutest.select.BlockStore(settings.args)
+    testfile = phmutest.cases.LazyTestfile(settings.args, block_store)
+    phmresult = phmutest.code.run_code(settings, testfile)
+    assert phmresult.metrics.failed == 1
+    assert phmresult.metrics.number_blocks_run == 1
+    # Only the first file's test class was generated.
+    rendered = set(testfile.markdown_map.filenames)
+    assert rendered == {"tests/md/unexpected_output.md"}
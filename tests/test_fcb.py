@@ -157,3 +157,33 @@ def test_repl_end_of_statement():
         contents=contents, role=Role.SESSION, open_fence=0, broken_code_line=9
     )
     assert end_line3 == 10
+
+
+def test_map_ranges():
+    """One range per FCB and expected output check. Lines are found by bisect."""
+    known_args = phmutest.main.main_argparser().parse_known_args(
+        ["tests/md/project.md"]
+    )
+    block_store = phmutest.select.BlockStore(known_args[0])
+    text, markdown_map = phmutest.cases.testfile(known_args[0], block_store)
+    lines = text.splitlines()
+    with_line = 1 + next(i for i, t in enumerate(lines) if "with _phmPrinter(" in t)
+    check_line = 1 + next(i for i, t in enumerate(lines) if "assertEqual(" in t)
+    assert markdown_map.ranges()[:2] == [
+        (with_line + 1, 5, "tests/md/project.md", 11),
+        (check_line, 0, "tests/md/project.md", 11),
+    ]
+    assert len(markdown_map.ranges()) == 3
+    assert markdown_map.filenames == ["tests/md/project.md"]
+    get = markdown_map.get
+    assert get(with_line) == phmutest.fcb.FcbCodeLine("", 0, 0)
+    assert get(with_line + 1) == phmutest.fcb.FcbCodeLine("tests/md/project.md", 11, 12)
+    assert get(with_line + 5) == phmutest.fcb.FcbCodeLine("tests/md/project.md", 11, 16)
+    assert get(with_line + 6) == phmutest.fcb.FcbCodeLine("", 0, 0)
+    assert get(check_line) == phmutest.fcb.FcbCodeLine("tests/md/project.md", 11, 0)
+    assert get(check_line + 1) == phmutest.fcb.FcbCodeLine("", 0, 0)
+
+    # Ranges added out of testfile line order are kept sorted.
+    markdown_map.add_range(3, 2, "other.md", 40)
+    assert markdown_map.ranges()[0] == (3, 2, "other.md", 40)
+    assert get(4) == phmutest.fcb.FcbCodeLine("other.md", 40, 42)
@@ -0,0 +1,194 @@
+"""Test --fixture scope and reuse set by the returned Fixture."""
+
+import unittest
+
+import pytest
+
+import phmutest.fixturescope
+import phmutest.main
+from phmutest.fixture import Fixture
+from tests.test_generate import run_generated_modules
+
+block_md = """\
+```python
+print(calls)
+```
+
+```
+{}
+```
+"""
+
+session_md = """\
+```py
+>>> calls
+{}
+```
+"""
+
+
+def count_calls(log):
+    """Number of times a fixture below was called, including this call."""
+    log.append(["fixture call", "", ""])
+    return len([entry for entry in log if entry[0] == "fixture call"])
+
+
+def file_fixture(**kwargs):
+    """Fixture called before each file."""
+    log = kwargs["log"]
+    calls = count_calls(log)
+    if not kwargs["is_replmode"]:
+        unittest.addModuleCleanup(log.append, ["fixture cleanup", "", ""])
+    return Fixture(globs={"calls": calls}, scope="file")
+
+
+def block_fixture(**kwargs):
+    """Fixture called before each block."""
+    return Fixture(globs={"calls": count_calls(kwargs["log"])}, scope="block")
+
+
+def reused_fixture(**kwargs):
+    """Fixture kept for later runs."""
+    return Fixture(globs={"calls": count_calls(kwargs["log"])}, reuse=True)
+
+
+def bad_scope_fixture(**kwargs):
+    """Fixture with a misspelled scope."""
+    return Fixture(scope="module")
+
+
+@pytest.fixture()
+def no_reused(monkeypatch):
+    """Forget reused fixtures when the test is done."""
+    monkeypatch.setattr(phmutest.fixturescope, "reused", {})
+
+
+def locations(phmresult):
+    """First item of each log entry."""
+    return [entry[0] for entry in phmresult.log]
+
+
+def test_file_scope(tmp_path):
+    """The fixture is called again before the second file after cleanups."""
+    path1 = tmp_path / "file1.md"
+    path1.write_text(block_md.format(1), encoding="utf-8")
+    path2 = tmp_path / "file2.md"
+    path2.write_text(block_md.format(2), encoding="utf-8")
+    line = f"{path1} {path2} --fixture tests.test_fixturescope.file_fixture --log"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert locations(phmresult) == [
+        "setUpModule",
+        "fixture call",
+        f"{path1.as_posix()}:1 o",
+        "fixture cleanup",
+        "fixture call",
+        f"{path2.as_posix()}:1 o",
+        "tearDownModule",
+        "fixture cleanup",
+    ]
+
+
+def test_block_scope(tmp_path):
+    """The fixture is called again before the second block."""
+    path = tmp_path / "blocks.md"
+    path.write_text(block_md.format(1) + "\n" + block_md.format(2), encoding="utf-8")
+    line = f"{path} --fixture tests.test_fixturescope.block_fixture --log"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert phmresult.metrics.passed == 2
+
+
+def test_file_scope_replmode(tmp_path):
+    """In --replmode the fixture is called again before the second file."""
+    path1 = tmp_path / "session1.md"
+    path1.write_text(session_md.format(1), encoding="utf-8")
+    path2 = tmp_path / "session2.md"
+    path2.write_text(session_md.format(2), encoding="utf-8")
+    line = (
+        f"{path1} {path2} --fixture tests.test_fixturescope.file_fixture "
+        "--replmode --log"
+    )
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert phmresult.metrics.passed == 2
+
+
+def test_reuse(tmp_path, no_reused):
+    """A reused fixture is not called by the second run."""
+    path = tmp_path / "reuse.md"
+    path.write_text(block_md.format(1), encoding="utf-8")
+    line = f"{path} --fixture tests.test_fixturescope.reused_fixture --log"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert "fixture call" in locations(phmresult)
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert "fixture call" not in locations(phmresult)
+    assert ["tests.test_fixturescope.reused_fixture", "", "reused"] in phmresult.log
+
+
+def test_bad_scope(tmp_path):
+    """An unknown scope is an error."""
+    path = tmp_path / "bad.md"
+    path.write_text(block_md.format(1), encoding="utf-8")
+    line = f"{path} --fixture tests.test_fixturescope.bad_scope_fixture"
+    phmresult = phmutest.main.command(line)
+    assert not phmresult.is_success
+    assert phmresult.metrics.suite_errors == 1
+
+
+def reused_cleanup_fixture(**kwargs):
+    """Reused fixture that releases its resource with a module cleanup."""
+    log = kwargs["log"]
+    unittest.addModuleCleanup(log.append, ["fixture cleanup", "", ""])
+    return Fixture(globs={"calls": count_calls(log)}, reuse=True)
+
+
+def test_reuse_module_cleanup(tmp_path, no_reused, monkeypatch):
+    """Module cleanups of a reused fixture run when Python exits."""
+    exit_functions = []
+    monkeypatch.setattr(
+        phmutest.fixturescope.atexit,
+        "register",
+        lambda function, *args: exit_functions.append((function, args)),
+    )
+    path = tmp_path / "reuse.md"
+    path.write_text(block_md.format(1), encoding="utf-8")
+    line = f"{path} --fixture tests.test_fixturescope.reused_cleanup_fixture --log"
+    for _ in range(2):
+        phmresult = phmutest.main.command(line)
+        assert phmresult.is_success
+        assert "fixture cleanup" not in locations(phmresult)
+    assert len(exit_functions) == 1
+    function, args = exit_functions[0]
+    log = []
+    function([(log.append, (["cleaned up"],), {})])
+    assert log == [["cleaned up"]]
+    assert function is phmutest.fixturescope.run_cleanups
+    assert args[0][0][1] == (["fixture cleanup", "", ""],)
+
+
+@pytest.mark.parametrize("fixture", ["block_fixture", "reused_fixture"])
+def test_generated_classes_unchanged(tmp_path, fixture, no_reused):
+    """The test classes don't call the fixture scope. The Printer does."""
+    path = tmp_path / "blocks.md"
+    path.write_text(block_md.format(1) + "\n" + block_md.format(2), encoding="utf-8")
+    outfile = tmp_path / "test_blocks.py"
+    line = f"{path} --fixture tests.test_fixturescope.{fixture} --generate {outfile}"
+    _ = phmutest.main.command(line)
+    text = outfile.read_text(encoding="utf-8")
+    assert "_phm_fixture_scope.enter" not in text
+    assert text.count("_phm_fixture_scope") == 2
+
+
+def test_block_scope_generate_dir(tmp_path):
+    """The fixture is called again before each block of a generated module."""
+    path = tmp_path / "blocks.md"
+    path.write_text(block_md.format(1) + "\n" + block_md.format(2), encoding="utf-8")
+    gendir = tmp_path / "gen"
+    line = f"{path} --fixture tests.test_fixturescope.block_fixture"
+    assert phmutest.main.command(f"{line} --generate-dir {gendir}") is None
+    result = run_generated_modules(gendir)
+    assert result.wasSuccessful()
+    assert result.testsRun == 1
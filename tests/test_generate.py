@@ -1,6 +1,8 @@
 """Check handling of --generate command line option."""
 
+import io
 import os
+import sys
 import unittest
 import unittest.main
 from contextlib import ExitStack
@@ -8,7 +10,11 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 from typing import List
 
+import pytest
+
+import phmutest.gendir
 import phmutest.main
+import phmutest.select
 import tests.py.generated_project
 
 
@@ -78,3 +84,83 @@ def test_unittest_args(capsys):
         module=tests.py.generated_project, argv=unittest_args, exit=False
     )
     assert testprog.result.wasSuccessful() is True
+
+
+def run_generated_modules(directory):
+    """Run the test modules in directory with unittest. Forget the modules after."""
+    names = set(sys.modules)
+    try:
+        suite = unittest.TestLoader().discover(str(directory))
+        return unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+    finally:
+        sys.path.remove(str(directory))
+        for name in set(sys.modules) - names:
+            del sys.modules[name]
+
+
+def test_generate_dir(tmp_path):
+    """Write a module for each file. Only changed modules are written again."""
+    gendir = tmp_path / "gen"
+    line = f"tests/md/project.md tests/md/async.md --generate-dir {gendir}"
+    assert phmutest.main.command(line) is None
+    names = sorted(p.name for p in gendir.iterdir())
+    assert names == ["test_tests_md_async.py", "test_tests_md_project.py"]
+    project = (gendir / "test_tests_md_project.py").read_text(encoding="utf-8")
+    assert "class Test001(unittest.TestCase):" in project
+    result = run_generated_modules(gendir)
+    assert result.wasSuccessful()
+    assert result.testsRun == 2
+
+    args = phmutest.main.main_argparser().parse_args(line.split())
+    block_store = phmutest.select.BlockStore(args)
+    assert phmutest.gendir.write_modules(args, block_store) == []
+    # A module for a file that is no longer given is removed.
+    args.files.pop()
+    assert phmutest.gendir.write_modules(args, block_store) == []
+    assert [p.name for p in gendir.iterdir()] == ["test_tests_md_project.py"]
+
+
+def test_generate_dir_shared_module(tmp_path):
+    """The fixture and across-file setup are in the shared module."""
+    line = (
+        "tests/md/setupnoteardown.md tests/md/project.md"
+        " --setup-across-files tests/md/setupnoteardown.md"
+        " --fixture tests.test_fixturescope.block_fixture"
+        f" --generate-dir {tmp_path}"
+    )
+    assert phmutest.main.command(line) is None
+    shared = (tmp_path / "_phm_shared.py").read_text(encoding="utf-8")
+    assert "def setUpModule():" in shared
+    assert "tests/md/setupnoteardown.md:11 setup" in shared
+    module = (tmp_path / "test_tests_md_project.py").read_text(encoding="utf-8")
+    assert "import _phm_shared as _phm_shared" in module
+    assert "_phm_shared.setUpModule()" in module
+    result = run_generated_modules(tmp_path)
+    assert result.wasSuccessful()
+
+
+def test_generate_dir_share_across(tmp_path):
+    """Names can't be shared across separate modules."""
+    line = (
+        "docs/share/file1.md docs/share/file2.md"
+        f" --share-across-files docs/share/file1.md --generate-dir {tmp_path}"
+    )
+    with pytest.raises(ValueError, match="--share-across-files"):
+        phmutest.main.command(line)
+
+
+def test_generate_dir_replmode(tmp_path):
+    """No modules are written for --replmode."""
+    line = f"tests/md/replerror.md --replmode --generate-dir {tmp_path}"
+    with pytest.raises(ValueError, match="--replmode"):
+        phmutest.main.command(line)
+    assert not list(tmp_path.iterdir())
+
+
+def test_generate_dir_and_generate(tmp_path, capsys):
+    """Only one of --generate and --generate-dir can be given."""
+    outfile = tmp_path / "test_project.py"
+    line = f"tests/md/project.md --generate {outfile} --generate-dir {tmp_path}"
+    with pytest.raises(SystemExit):
+        phmutest.main.command(line)
+    assert "not allowed with argument" in capsys.readouterr().err
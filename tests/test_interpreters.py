@@ -0,0 +1,99 @@
+"""Test --engine interpreters runs each file in its own subinterpreter."""
+
+import pickle
+import sys
+
+import pytest
+
+import phmutest.main
+import phmutest.select
+from tests.test_engine import results, run_quietly
+
+needs_interpreters = pytest.mark.skipif(
+    sys.version_info < (3, 14), reason="needs Python 3.14 or later"
+)
+
+
+@needs_interpreters
+@pytest.mark.parametrize(
+    "line",
+    [
+        "--config tests/toml/project.toml",
+        "tests/fail/raiser.md",
+        "tests/fail/raiser.md -f",
+        "tests/md/directive1.md tests/md/directive2.md",
+        "tests/md/optionflags.md --skip floor",
+        "tests/md/async.md",
+        "docs/setup/across1.md docs/setup/across2.md"
+        " --setup-across-files docs/setup/across1.md",
+        "docs/fix/code/globdemo.md --fixture docs.fix.code.globdemo.init_globals",
+        "tests/md/project.md --fixture tests.test_errors.badfixture",
+    ],
+)
+def test_same_as_direct(line):
+    """The metrics and block results are the same as with --engine direct."""
+    want = run_quietly(line + " --engine direct")
+    got = run_quietly(line + " --engine interpreters --threads 2")
+    assert got.metrics == want.metrics
+    assert got.is_success == want.is_success
+    assert sorted(results(got)) == sorted(results(want))
+
+
+@needs_interpreters
+def test_isolated(tmp_path):
+    """A module changed by one file is not changed in the next file."""
+    first = tmp_path / "first.md"
+    first.write_text("```python\nimport json\njson.leak = 1\n```\n", encoding="utf-8")
+    second = tmp_path / "second.md"
+    second.write_text(
+        "```python\nimport json\nassert not hasattr(json, 'leak')\n```\n",
+        encoding="utf-8",
+    )
+    line = f"{first} {second} --engine interpreters --threads 1"
+    phmresult = run_quietly(line)
+    assert phmresult.is_success
+    assert phmresult.metrics.passed == 2
+
+
+@needs_interpreters
+def test_share_across_files():
+    """Names can't be shared across subinterpreters."""
+    line = (
+        "docs/share/file1.md docs/share/file2.md --engine interpreters"
+        " --share-across-files docs/share/file1.md"
+    )
+    with pytest.raises(ValueError, match="can't be used with --share-across-files"):
+        _ = phmutest.main.command(line)
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 14), reason="Python has subinterpreters")
+def test_needs_python():
+    """The public concurrent.interpreters module needs Python 3.14."""
+    with pytest.raises(ValueError, match="needs Python 3.14 or later"):
+        _ = phmutest.main.command("tests/md/project.md --engine interpreters")
+
+
+def test_subset():
+    """The blocks of some of the files are pickled for a subinterpreter."""
+    args = phmutest.main.main_argparser().parse_args(
+        ["tests/md/project.md", "tests/md/directive1.md", "--skip", "floor"]
+    )
+    block_store = phmutest.select.BlockStore(args)
+    subset = pickle.loads(pickle.dumps(block_store.subset(args.files[1:])))
+    fileblocks = subset.get_blocks(args.files[1])
+    want = block_store.get_blocks(args.files[1])
+    assert fileblocks.built_from == want.built_from
+    assert [b.line for b in fileblocks.selected] == [b.line for b in want.selected]
+    assert [b.contents for b in fileblocks.selected] == [
+        b.contents for b in want.selected
+    ]
+    with pytest.raises(KeyError):
+        _ = subset.get_blocks(args.files[0])
+
+
+def test_threads_validated():
+    """The number of subinterpreters that run at once is 1 or more."""
+    with pytest.raises(SystemExit):
+        _ = phmutest.main.main_argparser().parse_args(
+            ["tests/md/project.md", "--engine", "interpreters", "--threads", "-1"]
+        )
@@ -0,0 +1,130 @@
+"""Test the size capped diff of long mismatched expected output."""
+
+import contextlib
+import io
+import unittest
+
+import pytest
+
+import phmutest.main
+import phmutest.outputcheck
+from phmutest.outputcheck import OutputChecker, capped_diff
+from phmutest.printer import DIFFS, RESULT
+
+
+def numbered(count, changed=()):
+    """Lines of text. The line numbers in changed end with changed."""
+    return "".join(
+        f"line {n:06d}{' changed' if n in changed else ''}\n" for n in range(count)
+    )
+
+
+def failure_message(expected, printed):
+    """Message of the AssertionError raised by OutputChecker.assertEqual()."""
+    with pytest.raises(AssertionError) as exc_info:
+        OutputChecker().assertEqual(expected, printed)
+    return str(exc_info.value)
+
+
+def test_one_line_changed():
+    """The hunk is at the changed line and line numbers are in the whole output."""
+    lines = capped_diff(numbered(100000), numbered(100000, [5000]), max_lines=40)
+    assert lines == [
+        "Expected output and printed output differ at line 5001 column 12.",
+        "Expected 100000 lines, printed 100000 lines.",
+        "--- expected",
+        "+++ printed",
+        "@@ -4998,7 +4998,7 @@",
+        " line 004997",
+        " line 004998",
+        " line 004999",
+        "-line 005000",
+        "+line 005000 changed",
+        " line 005001",
+        " line 005002",
+        " line 005003",
+    ]
+
+
+def test_capped():
+    """At most max_lines differing lines are shown from each output."""
+    printed = numbered(100000, range(1000, 100000))
+    lines = capped_diff(numbered(100000), printed, max_lines=10)
+    assert sum(1 for line in lines if line.startswith("-line")) == 10 + 3
+    assert sum(1 for line in lines if line.startswith("+line")) == 10 + 3
+    assert lines[-1] == (
+        "... 98990 more differing expected lines and"
+        " 98990 more differing printed lines not shown."
+    )
+
+
+def test_final_newline():
+    """A missing final newline is found."""
+    expected = numbered(1000)
+    lines = capped_diff(expected, expected.rstrip("\n"), max_lines=40)
+    assert (
+        lines[0] == "Expected output and printed output differ at line 1000 column 12."
+    )
+
+
+def test_long_line_clipped():
+    """Long lines are shown starting shortly before the first differing column."""
+    expected = "x" * 20000 + "a" + "x" * 20000 + "\n"
+    printed = "x" * 20000 + "b" + "x" * 20000 + "\n"
+    message = failure_message(expected, printed)
+    assert "differ at line 1 column 20001" in message
+    assert len(message) < 3 * phmutest.outputcheck.LINE_WIDTH
+    assert "-..." + "x" * 100 + "a" in message
+    assert "+..." + "x" * 100 + "b" in message
+
+
+def test_short_output():
+    """Short outputs have the same message as unittest."""
+    testcase = unittest.TestCase()
+    testcase.maxDiff = None
+    with pytest.raises(AssertionError) as exc_info:
+        testcase.assertEqual("one\ntwo\n", "one\nthree\n")
+    assert failure_message("one\ntwo\n", "one\nthree\n") == str(exc_info.value)
+    OutputChecker().assertEqual(numbered(1000), numbered(1000))
+
+
+@pytest.mark.parametrize("engine", ["unittest", "direct"])
+def test_full_diff(tmp_path, engine):
+    """The shown diff is capped and the full diff is written to --full-diff."""
+    path = tmp_path / "big.md"
+    path.write_text(
+        "```python\n"
+        "for n in range(2000):\n"
+        "    print(f'line {n:06d} changed')\n"
+        "```\n"
+        "```\n" + numbered(2000) + "```\n",
+        encoding="utf-8",
+    )
+    full = tmp_path / "full.diff"
+    line = f"{path} --engine {engine} --diff-lines 5 --full-diff {full}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            phmresult = phmutest.main.command(line)
+    assert phmresult.metrics.failed == 1
+    if engine == "unittest":
+        diffs = [entry for entry in phmresult.log if entry[RESULT] == DIFFS]
+        reason = diffs[0][2]
+        assert reason.count("\n-line") == 5 + 3
+        assert reason.endswith(f"Full diff 1 is in {full}.")
+    text = full.read_text(encoding="utf-8")
+    assert text.startswith("=== diff 1 ===\n--- expected\n+++ printed\n")
+    assert text.count("\n-line") == 2000
+    assert OutputChecker.max_lines == 5
+    phmutest.main.command(f"{path} --report")
+    assert OutputChecker.max_lines == phmutest.outputcheck.DIFF_LINES
+    assert OutputChecker.full_diff_path is None
+
+
+@pytest.mark.parametrize("value", ["-1", "five"])
+def test_diff_lines_not_negative(value, capsys):
+    """--diff-lines must be a non-negative int."""
+    parser = phmutest.main.main_argparser()
+    with pytest.raises(SystemExit):
+        _ = parser.parse_args(["--diff-lines", value])
+    assert "--diff-lines" in capsys.readouterr().err
+    assert parser.parse_args(["--diff-lines", "0"]).diff_lines == 0
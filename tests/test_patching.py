@@ -3,6 +3,7 @@
 import copy
 import doctest
 from contextlib import ExitStack
+from pathlib import Path
 from unittest import mock
 
 import phmutest.direct
@@ -195,6 +196,23 @@ def test_modify_docstring_patch():
     assert phmresult2.is_success is False
 
 
+def test_modify_docstring_per_block():
+    """When testing the patch is called with the text of each session block."""
+    docstrings = []
+
+    def record_docstring(text: str) -> str:
+        docstrings.append(text)
+        return text
+
+    line = "tests/md/optionflags.md --replmode"
+    with mock.patch("phmutest.session.modify_docstring", record_docstring):
+        _ = phmutest.main.command(line)
+    fileblocks = phmutest.select.BlockStore(
+        phmutest.main.main_argparser().parse_args(line.split())
+    ).get_blocks(Path("tests/md/optionflags.md"))
+    assert docstrings == [b.contents for b in fileblocks.selected]
+
+
 class OptionflagRunner(phmutest.session.ExampleOutcomeRunner):
     """Doctest Runner to set optionflags."""
 
@@ -0,0 +1,54 @@
+"""Tests --profile feature."""
+
+import pstats
+
+import phmutest.main
+import phmutest.printer
+
+
+def test_code_blocks(tmp_path, capsys):
+    """Write merged stats, print per stage and per block breakdown."""
+    outfile = tmp_path / "phm.pstats"
+    line = f"tests/md/project.md --profile {outfile}"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert phmutest.printer.Printer.profiler is None  # removed when done
+
+    stats = pstats.Stats(str(outfile))
+    functions = [function for _, _, function in stats.stats]  # type: ignore
+    assert "markdown_file" in functions  # generates a test class
+    assert "greeting" in functions  # defined and called by the Markdown blocks
+
+    output = capsys.readouterr().out
+    assert "\nprofile:\nstage|location" in output
+    for label in [
+        "phmutest.select.BlockStore",
+        "phmutest.cases.testfile",
+        "tests/md/project.md:11",
+        "tests/md/project.md:29",
+    ]:
+        assert "\n" + label + " " in output
+
+
+def test_replmode(tmp_path, capsys):
+    """In --replmode each Markdown file is profiled."""
+    outfile = tmp_path / "phm.pstats"
+    line = f"tests/md/project.md tests/md/example1.md --replmode --profile {outfile}"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert outfile.exists()
+    output = capsys.readouterr().out
+    assert "\ntests/md/project.md " in output
+    assert "\ntests/md/example1.md " in output
+    assert "phmutest.cases.testfile" not in output
+
+
+def test_generate(tmp_path, capsys):
+    """Profile generating a testfile."""
+    outfile = tmp_path / "phm.pstats"
+    genfile = tmp_path / "gen.py"
+    line = f"tests/md/project.md --generate {genfile} --profile {outfile}"
+    assert phmutest.main.command(line) is None
+    assert genfile.exists()
+    assert outfile.exists()
+    assert "\nphmutest.cases.testfile " in capsys.readouterr().out
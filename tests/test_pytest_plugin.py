@@ -0,0 +1,134 @@
+"""Test the pytest plugin that collects Python FCBs from Markdown files."""
+
+from pathlib import Path
+
+pytest_plugins = ["pytester"]
+
+
+markdown = """\
+# Blocks for the pytest plugin
+
+<!--phmutest-setup-->
+```python
+base = 10
+```
+
+```python
+a = base + 1
+print(a)
+```
+
+```
+11
+```
+
+<!--phmutest-label second-->
+```python
+b = a + 1
+assert b == 13
+```
+
+<!--phmutest-skip-->
+```python
+raise RuntimeError
+```
+
+```python
+print("wrong")
+```
+
+```
+right
+```
+
+<!--phmutest-teardown-->
+```python
+print("teardown", base)
+```
+"""
+
+
+def test_one_item_per_block(pytester):
+    """Each code block is an item. Setup and teardown blocks are not items."""
+    pytester.makefile(".md", doc=markdown)
+    result = pytester.runpytest("--phmutest", "-v")
+    result.assert_outcomes(passed=1, failed=2, skipped=1)
+    result.stdout.fnmatch_lines(
+        [
+            "doc.md::line8 PASSED*",
+            "doc.md::second FAILED*",
+            "doc.md::line24 SKIPPED*",
+            "doc.md::line28 FAILED*",
+        ]
+    )
+    # Traceback shows the line in the Markdown file.
+    result.stdout.fnmatch_lines(["doc.md:20: in <module>", "    assert b == 13"])
+    result.stdout.fnmatch_lines(
+        [
+            "doc.md:28 expected output at line 32",
+            "- right",
+            "+ wrong",
+            "*Captured stdout teardown*",
+            "teardown 10",
+        ]
+    )
+
+
+def test_keyword_runs_earlier_blocks(pytester):
+    """A block selected by -k sees names assigned by earlier blocks."""
+    pytester.makefile(".md", doc=markdown.replace("b == 13", "b == 12"))
+    result = pytester.runpytest("--phmutest", "-k", "second")
+    result.assert_outcomes(passed=1, deselected=3)
+
+
+def test_not_enabled(pytester):
+    """Markdown files are not collected without --phmutest."""
+    pytester.makefile(".md", doc=markdown)
+    result = pytester.runpytest("doc.md")
+    assert result.ret == 4 or result.ret == 5  # usage error or no tests collected
+
+
+def test_project_file(pytester):
+    """All the blocks in a phmutest example Markdown file pass."""
+    text = (Path(__file__).parent / "md" / "project.md").read_text(encoding="utf-8")
+    pytester.makefile(".md", project=text)
+    result = pytester.runpytest("--phmutest")
+    result.assert_outcomes(passed=2)
+
+
+def test_async_file(pytester):
+    """The blocks of a file with the async directive can use top level await."""
+    text = (Path(__file__).parent / "md" / "async.md").read_text(encoding="utf-8")
+    pytester.makefile(".md", doc=text)
+    result = pytester.runpytest("--phmutest")
+    result.assert_outcomes(passed=3)
+
+
+def test_same_file_name(pytester):
+    """Files with the same name in different directories get their own module."""
+    for directory in ["a", "b"]:
+        pytester.mkpydir(directory)
+        path = pytester.path / directory / "README.md"
+        path.write_text(
+            "```python\n"
+            "import sys\n"
+            "assert sys.modules[__name__].__file__ == __file__\n"
+            "print(__name__)\n"
+            "```\n"
+            "```\n"
+            f"_phm_{directory}_README_md\n"
+            "```\n",
+            encoding="utf-8",
+        )
+    result = pytester.runpytest("--phmutest")
+    result.assert_outcomes(passed=2)
+
+
+def test_earlier_block_raised(pytester):
+    """An error in a block run before the selected block is a setup error."""
+    pytester.makefile(".md", doc=markdown.replace("a = base + 1", "a = base + z"))
+    result = pytester.runpytest("--phmutest", "-k", "second")
+    result.assert_outcomes(errors=1, deselected=3)
+    result.stdout.fnmatch_lines(
+        ["*Block doc.md:8 run before this block raised NameError*"]
+    )
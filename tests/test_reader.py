@@ -2,6 +2,7 @@
 
 from pathlib import Path
 
+import phmutest.direct
 import phmutest.reader
 from phmutest.reader import NodeType
 
@@ -139,3 +140,69 @@ def test_getline_position_0():
     """Position 0 should be line number 1."""
     line_getter = phmutest.reader.PositionToLineNumber("hello world")
     assert line_getter.get_line(position=0) == 1
+
+
+def node_key(node):
+    return (
+        node.ntype,
+        node.line,
+        node.end_line,
+        node.startpos,
+        node.endpos,
+        node.payload,
+        node.info_string,
+    )
+
+
+def directive_keys(nodes):
+    keys = []
+    for node in nodes:
+        if node.ntype == NodeType.FENCED_CODE_BLOCK:
+            directives = phmutest.direct.get_directives(node)
+            keys.append([(d.type, d.line, d.value) for d in directives])
+    return keys
+
+
+def check_scan_matches_read(path):
+    """scan_markdown() finds the same FCBs, comments, and directives."""
+    read_nodes = phmutest.reader.read_markdown(path)
+    scan_nodes = phmutest.reader.scan_markdown(path)
+    read_keys = [node_key(n) for n in read_nodes if n.ntype != NodeType.BLANK_LINE]
+    scan_keys = [node_key(n) for n in scan_nodes if n.ntype != NodeType.BLANK_LINE]
+    assert scan_keys == read_keys
+    assert directive_keys(scan_nodes) == directive_keys(read_nodes)
+    return scan_nodes
+
+
+def test_scan_markdown_all_files():
+    """Scan every Markdown file in the repository."""
+    paths = sorted(Path(".").glob("*.md")) + sorted(Path("docs").glob("**/*.md"))
+    paths += sorted(Path("tests").glob("**/*.md"))
+    assert len(paths) > 50
+    for path in paths:
+        check_scan_matches_read(path)
+
+
+def test_scan_markdown_blank_lines():
+    """Only blank lines directly after a HTML comment are scanned."""
+    nodes = phmutest.reader.scan_markdown(Path("tests/md/directive1.md"))
+    blanks = [n for n in nodes if n.ntype == NodeType.BLANK_LINE]
+    assert blanks
+    for node in blanks:
+        assert node.backlink is not None
+        assert node.backlink.ntype == NodeType.HTML_COMMENT
+
+
+def test_scan_markdown_edge_cases(tmp_path):
+    """Multi-line and unclosed comments, unclosed fences, no final newline."""
+    path = tmp_path / "edge.md"
+    texts = [
+        "<!--phmutest-label a\n-->\n\n```python\nx = 1\n```",
+        "<!-- a --> b\n<!--phmutest-skip-->\n```py\n```\n",
+        "<!-- never closed\n<!--phmutest-skip-->\n```python\n",
+        "  ```python\n  y = 2\n\n   ```\n<!--->\n~~~\n",
+        "<!-- c -->\n\n\n```python\n```\n\n",
+    ]
+    for text in texts:
+        path.write_text(text, encoding="utf-8")
+        check_scan_matches_read(path)
@@ -178,3 +178,30 @@ def test_repl_still_cleans_up(capsys):
             _ = phmutest.main.main(args)
         assert "Most definitely cleaning up here!" in capsys.readouterr().out
         assert "Bad phmutest REPL logic." in str(exc_info.value)
+
+
+def test_blocks_share_names(tmp_path):
+    """Each block is its own result. Names defined by a block are in later blocks."""
+    path = tmp_path / "repl.md"
+    path.write_text(
+        "```python\n"
+        ">>> def double(x):\n"
+        "...     return 2 * x\n"
+        "```\n"
+        "Prose.\n"
+        "```python\n"
+        ">>> double(2)\n"
+        "5\n"
+        "```\n"
+        "```python\n"
+        ">>> double(3)\n"
+        "6\n",
+        encoding="utf-8",
+    )
+    phmresult = phmutest.main.command(f"{path} --replmode --log")
+    entries = [entry[:2] for entry in phmresult.log]
+    assert entries == [
+        [f"{path.as_posix()}:1", "pass"],
+        [f"{path.as_posix()}:6", "failed"],
+        [f"{path.as_posix()}:10", "pass"],
+    ]
@@ -0,0 +1,96 @@
+"""Test --jsonl and --junitxml result records written while testing."""
+
+import io
+import json
+from xml.etree import ElementTree
+
+import phmutest.main
+import phmutest.printer
+import phmutest.stream
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_code_mode(tmp_path):
+    """A record for each code block including the skipped block."""
+    jsonl = tmp_path / "results.jsonl"
+    xml = tmp_path / "results.xml"
+    line = f"tests/md/directive1.md --jsonl {jsonl} --junitxml {xml}"
+    phmresult = phmutest.main.command(line)
+    assert not phmresult.is_success
+    records = read_jsonl(jsonl)
+    assert [(r["line"], r["result"]) for r in records] == [
+        (16, "skip"),
+        (25, "pass"),
+        (50, "failed"),
+        (64, "pass"),
+    ]
+    assert records[0]["reason"] == "phmutest-skip"
+    assert records[0]["duration"] == 0.0
+    assert records[1]["duration"] > 0.0
+    assert records[2]["location"] == "tests/md/directive1.md:50 expected-failed o"
+    assert all(r["file"] == "tests/md/directive1.md" for r in records)
+
+    testsuite = ElementTree.parse(xml).getroot().find("testsuite")
+    testcases = testsuite.findall("testcase")
+    assert [t.get("line") for t in testcases] == ["16", "25", "50", "64"]
+    assert testcases[0].find("skipped").get("message") == "phmutest-skip"
+    assert testcases[1].find("*") is None
+    assert testcases[2].find("failure") is not None
+    assert phmutest.printer.Printer.stream is None
+
+
+def test_errors(tmp_path):
+    """The exception is the reason for an error record."""
+    jsonl = tmp_path / "results.jsonl"
+    xml = tmp_path / "results.xml"
+    line = f"tests/md/tracer.md --jsonl {jsonl} --junitxml {xml}"
+    _ = phmutest.main.command(line)
+    records = read_jsonl(jsonl)
+    errors = [r for r in records if r["result"] == "error"]
+    assert errors[0]["line"] == 71
+    assert errors[0]["reason"].startswith("AttributeError:")
+    testcases = ElementTree.parse(xml).getroot().iter("testcase")
+    elements = [t.find("error") for t in testcases]
+    messages = [e.get("message") for e in elements if e is not None]
+    assert messages == [r["reason"] for r in errors]
+
+
+def test_replmode(tmp_path):
+    """A record for each Example and for each skipped block."""
+    jsonl = tmp_path / "results.jsonl"
+    line = f"tests/md/replerror.md --replmode --skip MYSKIPPATTERN --jsonl {jsonl}"
+    _ = phmutest.main.command(line)
+    records = read_jsonl(jsonl)
+    skips = [(r["line"], r["reason"]) for r in records if r["result"] == "skip"]
+    assert skips == [
+        (26, "phmutest-skip"),
+        (40, "--skip MYSKIPPATTERN"),
+        (49, "requires >=py3.9999"),
+    ]
+    results = {r["line"]: r["result"] for r in records}
+    assert results[4] == "pass"
+    assert results[34] == "error"
+    assert results[58] == "pass"
+
+
+def test_merged_logs():
+    """Entries copied from a finished log are written once. No log is kept."""
+    outfile = io.StringIO()
+    stream = phmutest.stream.ResultStream([phmutest.stream.JsonlWriter(outfile)])
+    log = [["a.md:1", "pass", ""]]
+    stream.catch_up(log)
+    file_log = [["b.md:1", "pass", ""]]
+    stream.catch_up(file_log)
+    file_log.append(["b.md:5", "skip", "phmutest-skip"])
+    stream.finish(file_log)
+    log.append(["a.md:9", "skip", "phmutest-skip"])
+    stream.catch_up(log)
+    log.extend(file_log)
+    stream.skip_written(log)
+    stream.catch_up(log)
+    records = [json.loads(line) for line in outfile.getvalue().splitlines()]
+    assert [r["location"] for r in records] == ["a.md:1", "b.md:1", "b.md:5", "a.md:9"]
+    assert list(stream.positions().values()) == [(log, 4)]
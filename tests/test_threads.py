@@ -0,0 +1,177 @@
+"""Test --threads runs the files on a thread pool with thread-aware capture."""
+
+import contextlib
+import io
+import json
+import sys
+import threading
+
+import pytest
+
+import phmutest.capture
+import phmutest.main
+
+barrier = threading.Barrier(3)
+"""Blocks in three files wait here. They pass only if the files run together."""
+
+
+def run_capture_stdout(line):
+    """Run phmutest command line. Return the result and what is printed to stdout."""
+    with contextlib.redirect_stdout(io.StringIO()) as stdout:
+        with contextlib.redirect_stderr(io.StringIO()):
+            return phmutest.main.command(line), stdout.getvalue()
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "--config tests/toml/project.toml",
+        "tests/fail/raiser.md tests/md/directive1.md tests/md/directive2.md",
+        "tests/md/optionflags.md tests/md/async.md --skip floor",
+        "--config tests/toml/acrossfiles.toml",
+        "docs/share/file1.md docs/share/file2.md docs/share/file3.md"
+        " --share-across-files docs/share/file1.md docs/share/file2.md",
+        "docs/fix/code/globdemo.md tests/md/project.md"
+        " --fixture docs.fix.code.globdemo.init_globals",
+    ],
+)
+def test_same_as_one_thread(line):
+    """The log and what the blocks print are the same as without --threads."""
+    line += " --engine direct --stdout"
+    want, want_stdout = run_capture_stdout(line)
+    got, got_stdout = run_capture_stdout(line + " --threads 4")
+    assert got.metrics == want.metrics
+    assert got.is_success == want.is_success
+    assert got.log == want.log
+    assert got_stdout == want_stdout
+    assert not phmutest.capture.is_installed()
+
+
+def test_files_run_together(tmp_path, capsys):
+    """Each file's blocks and output stay together while the files run at once."""
+    paths = []
+    for number in range(3):
+        path = tmp_path / f"file{number}.md"
+        path.write_text(
+            "```python\n"
+            "import tests.test_threads\n"
+            f"print('file{number} before')\n"
+            "tests.test_threads.barrier.wait(timeout=10)\n"
+            f"print('file{number} after')\n"
+            "```\n"
+            "```\n"
+            f"file{number} before\n"
+            f"file{number} after\n"
+            "```\n",
+            encoding="utf-8",
+        )
+        paths.append(str(path))
+    line = " ".join(paths) + " --engine direct --threads 3 --progress"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert phmresult.metrics.passed == 3
+    assert [entry[0] for entry in phmresult.log] == [f"{path}:1 o" for path in paths]
+    progress = capsys.readouterr().err.splitlines()
+    assert progress[:3] == [f"{path}:1 ... pass" for path in paths]
+
+
+def test_thread_stream():
+    """Each thread writes to its own capture. Others write to the replaced stream."""
+    outer = io.StringIO()
+    captures = [io.StringIO() for _ in range(4)]
+
+    def write(capture, text):
+        with phmutest.capture.redirect(capture, capture):
+            print(text)
+            print(text, file=sys.stderr)
+
+    with contextlib.redirect_stdout(outer):
+        with phmutest.capture.installed():
+            assert phmutest.capture.is_installed()
+            threads = [
+                threading.Thread(target=write, args=(capture, f"thread {n}"))
+                for n, capture in enumerate(captures)
+            ]
+            for thread in threads:
+                thread.start()
+            print("main")
+            for thread in threads:
+                thread.join()
+        assert not phmutest.capture.is_installed()
+    assert outer.getvalue() == "main\n"
+    for n, capture in enumerate(captures):
+        assert capture.getvalue() == f"thread {n}\nthread {n}\n"
+
+
+def test_jsonl(tmp_path):
+    """Each block result is written once when files run on threads."""
+    records = []
+    for threads in ["1", "4"]:
+        outfile = tmp_path / f"threads{threads}.jsonl"
+        line = (
+            "--config tests/toml/project.toml --engine direct"
+            f" --threads {threads} --jsonl {outfile}"
+        )
+        _ = run_capture_stdout(line)
+        lines = outfile.read_text(encoding="utf-8").splitlines()
+        records.append(sorted(json.loads(line)["location"] for line in lines))
+    assert len(records[0]) == 7
+    assert records[1] == records[0]
+
+
+file0_done = threading.Event()
+"""The failing block waits until a later file running on another thread passes."""
+
+
+def test_failfast(tmp_path):
+    """Nothing from the files after the file that failed is added to the log."""
+    failing = tmp_path / "failing.md"
+    failing.write_text(
+        "```python\n"
+        "import tests.test_threads\n"
+        "assert tests.test_threads.file0_done.wait(timeout=10)\n"
+        "assert False\n"
+        "```\n",
+        encoding="utf-8",
+    )
+    paths = [str(failing)]
+    for number in range(4):
+        path = tmp_path / f"file{number}.md"
+        path.write_text(
+            "```python\n"
+            "import tests.test_threads\n"
+            f"print('file{number}')\n"
+            "tests.test_threads.file0_done.set()\n"
+            "```\n",
+            encoding="utf-8",
+        )
+        paths.append(str(path))
+    file0_done.clear()
+    line = " ".join(paths) + " --engine direct --threads 2 --stdout -f"
+    phmresult, stdout = run_capture_stdout(line)
+    assert not phmresult.is_success
+    assert [entry[0] for entry in phmresult.log] == [f"{failing}:1"]
+    assert "file" not in stdout
+
+
+@pytest.mark.parametrize(
+    "line, match",
+    [
+        ("tests/md/project.md --threads 2", "--threads can't be used"),
+        ("tests/md/project.md --engine unittest --threads 2", "--threads can't"),
+        ("tests/md/project.md --engine direct --block-methods", "--block-methods"),
+    ],
+)
+def test_engine_options(line, match):
+    """Options the engine doesn't use are rejected."""
+    with pytest.raises(ValueError, match=match):
+        _ = phmutest.main.command(line)
+
+
+@pytest.mark.parametrize("value", ["0", "-1", "two"])
+def test_threads_positive(value, capsys):
+    """--threads must be an int of 1 or more."""
+    parser = phmutest.main.main_argparser()
+    with pytest.raises(SystemExit):
+        _ = parser.parse_args(["--threads", value])
+    assert "--threads" in capsys.readouterr().err
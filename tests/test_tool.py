@@ -1,5 +1,8 @@
 """Test tool.py"""
 
+import collections
+import os
+
 import phmutest.tool
 
 
@@ -150,3 +153,102 @@ class TestSelect:
         """Call with explicitly stated default argument values."""
         selected = self.chooser.select(label="", info_string=None, contains="")
         assert len(selected) == 8
+
+    def test_contains_ngrams(self):
+        """Substrings shorter than, equal to, and longer than NGRAM."""
+        assert self.chooser.select(contains="b") == [
+            "b = 10\nprint(b.as_integer_ratio())\n"
+        ]
+        assert len(self.chooser.select(contains="ls ")) == 2
+        assert self.chooser.select(contains="integer_ratio") == [
+            "b = 10\nprint(b.as_integer_ratio())\n"
+        ]
+        # All the NGRAMs are present, but not in this order.
+        assert self.chooser.select(contains="ratio()print(b") == []
+
+    def test_ngram_index_lazy(self):
+        """The substring index is built by the first query with contains."""
+        assert self.chooser.ngram_index is None
+        _ = self.chooser.contents(label="one-label-many-blocks")
+        _ = self.chooser.select(label="one-label-many-blocks", info_string="python")
+        assert self.chooser.ngram_index is None
+        _ = self.chooser.select(contains="b = ")
+        index = self.chooser.ngram_index
+        assert index is not None
+        _ = self.chooser.select(contains="print")
+        assert self.chooser.ngram_index is index
+
+
+def test_get_chooser(tmp_path):
+    """A chooser is reused until the file is modified."""
+    path = tmp_path / "doc.md"
+    path.write_text("<!--phmutest-label x-->\n```\none\n```\n", encoding="utf-8")
+    chooser = phmutest.tool.get_chooser(str(path))
+    assert phmutest.tool.get_chooser(str(path)) is chooser
+    assert chooser.contents("x") == "one\n"
+
+    path.write_text("<!--phmutest-label x-->\n```\ntwo\n```\n", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    chooser2 = phmutest.tool.get_chooser(str(path))
+    assert chooser2 is not chooser
+    assert chooser2.contents("x") == "two\n"
+
+
+def test_get_chooser_evicts(tmp_path, monkeypatch):
+    """The least recently used chooser is discarded."""
+    monkeypatch.setattr(phmutest.tool, "choosers", collections.OrderedDict())
+    monkeypatch.setattr(phmutest.tool, "MAX_CHOOSERS", 2)
+    paths = []
+    for number in range(3):
+        path = tmp_path / f"doc{number}.md"
+        path.write_text("```\ntext\n```\n", encoding="utf-8")
+        paths.append(str(path))
+    first = phmutest.tool.get_chooser(paths[0])
+    _ = phmutest.tool.get_chooser(paths[1])
+    assert phmutest.tool.get_chooser(paths[0]) is first  # most recently used
+    _ = phmutest.tool.get_chooser(paths[2])  # discards paths[1]
+    assert len(phmutest.tool.choosers) == 2
+    assert phmutest.tool.get_chooser(paths[0]) is first
+
+
+def test_labeled_fcbs_in_files():
+    """Batch results agree with labeled_fenced_code_blocks()."""
+    paths = [
+        "tests/md/more_directives.md",
+        "tests/md/multi_label.md",
+        "tests/md/dir*.md",
+    ]
+    got = list(phmutest.tool.labeled_fenced_code_blocks_in_files(paths))
+    want = []
+    for filename in [
+        "tests/md/more_directives.md",
+        "tests/md/multi_label.md",
+        "tests/md/directive1.md",
+        "tests/md/directive2.md",
+        "tests/md/directives.md",
+    ]:
+        for labeled in phmutest.tool.labeled_fenced_code_blocks(filename):
+            want.append((filename, labeled))
+    assert got == want
+
+
+def test_labeled_fcbs_in_files_uses_kept_choosers(monkeypatch):
+    """Kept choosers are used. Files parsed by the batch are not kept."""
+    monkeypatch.setattr(phmutest.tool, "choosers", collections.OrderedDict())
+    kept = phmutest.tool.get_chooser("tests/md/multi_label.md")
+    parsed = []
+    chooser_class = phmutest.tool.FCBChooser
+
+    def new_chooser(markdown_filename):
+        parsed.append(markdown_filename)
+        return chooser_class(markdown_filename)
+
+    monkeypatch.setattr(phmutest.tool, "FCBChooser", new_chooser)
+    paths = ["tests/md/more_directives.md", "tests/md/more_directives.md"]
+    paths.append("tests/md/multi_label.md")
+    got = list(phmutest.tool.labeled_fenced_code_blocks_in_files(paths))
+    want = phmutest.tool.labeled_fenced_code_blocks("tests/md/more_directives.md")
+    assert [path for path, _ in got].count("tests/md/more_directives.md") == len(want)
+    assert parsed == ["tests/md/more_directives.md"]  # The file is parsed once.
+    assert list(phmutest.tool.choosers.values()) == [kept]
@@ -0,0 +1,70 @@
+"""Tests --trace-memory feature."""
+
+import phmutest.main
+import phmutest.printer
+from phmutest.printer import DOC_LOCATION, NET_MEMORY, PEAK_MEMORY, RESULT
+
+
+def memory_entries(log):
+    """Return the MEMORY log entries."""
+    return [entry for entry in log if entry[RESULT] == phmutest.printer.MEMORY]
+
+
+def test_code_blocks(capsys):
+    """Each code block gets a memory log entry. Table is ordered by peak."""
+    line = "tests/md/memory.md --trace-memory --summary"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert phmresult.metrics.number_blocks_run == 3
+    entries = memory_entries(phmresult.log)
+    locations = [entry[DOC_LOCATION] for entry in entries]
+    assert locations == [
+        "tests/md/memory.md:5",
+        "tests/md/memory.md:12",
+        "tests/md/memory.md:18",
+    ]
+    peaks = [int(entry[PEAK_MEMORY]) for entry in entries]
+    nets = [int(entry[NET_MEMORY]) for entry in entries]
+    assert peaks[1] > 7_000_000  # the list of 1,000,000 references
+    assert nets[1] < peaks[1]  # the list was deleted
+    assert nets[2] > 90_000  # the bytearray is still referenced
+
+    output = capsys.readouterr().out
+    # The table is ordered by the peak, largest first.
+    table_start = output.index("peak bytes  net bytes")
+    assert output.index(":12", table_start) < output.index(":18", table_start)
+    assert output.index(":18", table_start) < output.index(":5 ", table_start)
+
+
+def test_log_option_hides_memory_entries(capsys):
+    """The --log table does not show the memory log entries."""
+    line = "tests/md/memory.md --trace-memory --log"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    output = capsys.readouterr().out
+    assert phmutest.printer.MEMORY not in output
+    assert "peak bytes" not in output  # no --summary
+
+
+def test_no_trace_memory():
+    """There are no memory log entries without --trace-memory."""
+    phmresult = phmutest.main.command("tests/md/memory.md")
+    assert phmresult.is_success
+    assert not memory_entries(phmresult.log)
+
+
+def test_replmode_examples():
+    """Each doctest Example gets a memory log entry after the block's entry."""
+    line = "tests/md/memory.md --replmode --trace-memory"
+    phmresult = phmutest.main.command(line)
+    assert phmresult.is_success
+    assert phmresult.log[0][DOC_LOCATION] == "tests/md/memory.md:24"
+    assert phmresult.log[0][RESULT] == "pass"
+    entries = memory_entries(phmresult.log)
+    locations = [entry[DOC_LOCATION] for entry in entries]
+    assert locations == [
+        "tests/md/memory.md:25",
+        "tests/md/memory.md:26",
+        "tests/md/memory.md:27",
+    ]
+    assert int(entries[1][PEAK_MEMORY]) > 7_000_000